@@ -0,0 +1,72 @@
+"""Add current services and unique version indexes
+
+Revision ID: 9d4e2f7a61c3
+Revises: 1b5bd8a97b9f
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4e2f7a61c3'
+down_revision: Union[str, None] = '1b5bd8a97b9f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Merge duplicates left by concurrent deploys, which the unique indexes reject
+    op.execute("""
+        UPDATE services SET deployment_id = duplicates.keep_id
+        FROM (
+            SELECT id, MIN(id) OVER (PARTITION BY user_id, git_hash) AS keep_id
+            FROM deployments
+        ) AS duplicates
+        WHERE services.deployment_id = duplicates.id
+            AND duplicates.id <> duplicates.keep_id
+    """)
+    op.execute("""
+        DELETE FROM deployments USING deployments AS kept
+        WHERE deployments.user_id = kept.user_id
+            AND deployments.git_hash = kept.git_hash
+            AND deployments.id > kept.id
+    """)
+    op.execute("""
+        DELETE FROM services USING services AS kept
+        WHERE services.deployment_id = kept.deployment_id
+            AND services.name = kept.name
+            AND services.id > kept.id
+    """)
+    op.create_unique_constraint('uq_deployments_user_id_git_hash', 'deployments', ['user_id', 'git_hash'])
+    op.create_unique_constraint('uq_services_deployment_id_name', 'services', ['deployment_id', 'name'])
+
+    op.create_table('current_services',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('service_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['service_id'], ['services.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'name')
+    )
+    op.create_index(op.f('ix_current_services_service_id'), 'current_services', ['service_id'], unique=False)
+    # Each service starts out pointing at its most recent deployment
+    op.execute("""
+        INSERT INTO current_services (user_id, name, service_id)
+        SELECT DISTINCT ON (deployments.user_id, services.name)
+            deployments.user_id, services.name, services.id
+        FROM services JOIN deployments ON deployments.id = services.deployment_id
+        ORDER BY deployments.user_id, services.name,
+            deployments.created_at DESC, services.id DESC
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_current_services_service_id'), table_name='current_services')
+    op.drop_table('current_services')
+    op.drop_constraint('uq_services_deployment_id_name', 'services', type_='unique')
+    op.drop_constraint('uq_deployments_user_id_git_hash', 'deployments', type_='unique')
@@ -26,6 +26,8 @@ source $VENV_DIR/bin/activate
 pip install --upgrade pip pip-tools uv
 uv pip compile $API_DIR/requirements.in -o $API_DIR/requirements.txt
 uv pip install -r $API_DIR/requirements.txt
+# The API shares naming and handler templates with the pare package in this repo
+uv pip install -e .
 
 if [ ! -d /home/ec2-user/pare-scripts ]; then
   mkdir /home/ec2-user/pare-scripts
@@ -0,0 +1,48 @@
+"""Block or unblock a user.
+
+    cd api && python -m scripts.block_user USERNAME [--unblock]
+
+Blocking also drops the user's cached invoke resolutions, which API workers
+would otherwise keep using until they expire. API workers only hear about it
+when PARE_RESOLUTION_CACHE_REDIS_URL is set, which is why they don't cache
+resolutions without it unless PARE_RESOLUTION_CACHE_TTL is set.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy import select
+from src.core.resolution import invalidate_resolutions
+from src.db import AsyncSessionLocal
+from src.models import User
+
+
+async def set_blocked(username: str, blocked: bool) -> bool:
+    async with AsyncSessionLocal() as session:
+        user = (
+            await session.execute(select(User).where(User.username == username))
+        ).scalar()
+        if user is None:
+            return False
+        user.is_blocked = blocked  # type: ignore
+        await session.commit()
+        invalidate_resolutions(user.id)  # type: ignore
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("username")
+    parser.add_argument("--unblock", action="store_true")
+    args = parser.parse_args()
+    if not asyncio.run(set_blocked(args.username, not args.unblock)):
+        print(f"User '{args.username}' not found")
+        sys.exit(1)
+    print(f"User '{args.username}' {'unblocked' if args.unblock else 'blocked'}")
+
+
+if __name__ == "__main__":
+    main()
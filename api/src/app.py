@@ -1,13 +1,30 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 
 from src import middleware
 from src.auth.routes import router as auth_router
+from src.aws import close_aws, get_aws
+from src.core.resolution import start_invalidation_listener
 from src.deploy.routes import router as deploy_router
 from src.manage.routes import router as manage_router
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Create the AWS clients before the first request, rather than during it
+    get_aws()
+    listener = start_invalidation_listener()
+    yield
+    if listener is not None:
+        listener.stop()
+    close_aws()
+
+
+app = FastAPI(lifespan=lifespan)
 
 middleware.apply_middleware(app)
 
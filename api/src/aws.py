@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+import boto3
+from botocore.config import Config
+from typing_extensions import ParamSpec
+
+from src import settings
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+class AWSClients:
+    """The boto3 clients shared by every request handled by this API worker.
+
+    Creating a client loads its service model and opens new connections, which
+    costs more than a fast Lambda invocation, so clients are created once at
+    startup and keep their connections alive. botocore blocks, so calls run on a
+    dedicated executor with a thread per pooled connection, which also keeps
+    slow deploys from starving invocations of FastAPI's default threadpool.
+    """
+
+    def __init__(self) -> None:
+        session = boto3.session.Session(region_name=settings.AWS_DEFAULT_REGION)
+        config = Config(
+            max_pool_connections=settings.AWS_MAX_POOL_CONNECTIONS,
+            connect_timeout=settings.AWS_CONNECT_TIMEOUT,
+            tcp_keepalive=True,
+        )
+        self.lambda_client = session.client(
+            "lambda",
+            # Synchronous invocations wait for the function, which may run for up to 15 minutes
+            config=config.merge(Config(read_timeout=settings.AWS_LAMBDA_READ_TIMEOUT)),
+        )
+        self.ecr_client = session.client("ecr", config=config)
+        self.s3_client = session.client("s3", config=config)
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.AWS_MAX_POOL_CONNECTIONS, thread_name_prefix="aws"
+        )
+
+    async def call(self, func: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+        """Run a blocking client call without blocking the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+        for client in (self.lambda_client, self.ecr_client, self.s3_client):
+            client.close()
+
+
+_clients: AWSClients | None = None
+
+
+def get_aws() -> AWSClients:
+    global _clients
+    if _clients is None:
+        _clients = AWSClients()
+    return _clients
+
+
+def close_aws() -> None:
+    global _clients
+    if _clients is not None:
+        _clients.close()
+        _clients = None
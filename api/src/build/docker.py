@@ -8,7 +8,13 @@ from shutil import copytree
 from typing import TYPE_CHECKING
 
 from src import settings
-from src.transform import build_lambda_handler
+from src.transform import (
+    ENTRYPOINT_FILENAME,
+    RUNTIME_CHECK,
+    RUNTIME_MARKER_FILENAME,
+    build_lambda_entrypoint,
+    build_lambda_handler,
+)
 from src.utils import run_async_subprocess
 
 if TYPE_CHECKING:
@@ -16,6 +22,14 @@ if TYPE_CHECKING:
 
 LAMBDA_DOCKERFILE_PATH = Path(__file__).parent / "Dockerfile.py_lambda"
 
+# Appended for streaming endpoints; ENTRYPOINT resets CMD, so it is set again
+STREAMING_DOCKERFILE_LINES = f"""
+# Pare's runtime can stream responses, which the base image's runtime can't
+RUN python3 -c "{RUNTIME_CHECK}" "${{LAMBDA_TASK_ROOT}}/{RUNTIME_MARKER_FILENAME}"
+ENTRYPOINT ["/var/task/{ENTRYPOINT_FILENAME}"]
+CMD ["lambda_function.lambda_handler"]
+"""
+
 
 def build_ecr_image_name(repo_name: str, tag: str) -> str:
     return f"{settings.AWS_ACCOUNT_ID}.dkr.ecr.{settings.AWS_DEFAULT_REGION}.amazonaws.com/{repo_name}:{tag}"
@@ -39,7 +53,10 @@ async def build_and_publish_image_to_ecr(
 
         # copy dockerfile from sibling file
         dockerfile_path = tmp_dir / "Dockerfile"
-        dockerfile_path.write_text(LAMBDA_DOCKERFILE_PATH.read_text())
+        dockerfile = LAMBDA_DOCKERFILE_PATH.read_text()
+        if service_config.streaming:
+            dockerfile += STREAMING_DOCKERFILE_LINES
+        dockerfile_path.write_text(dockerfile)
 
         # copy bundle contents to build root (expected by Dockerfile)
         build_path = tmp_dir / "build-root"
@@ -47,11 +64,15 @@ async def build_and_publish_image_to_ecr(
 
         # write requirements.txt
         requirements = tmp_dir / "requirements.txt"
-        requirements.write_text("\n".join(chain(service_config.requirements, ["pare"])))
+        requirements.write_text(
+            "\n".join(chain(service_config.requirements, ["pare[codecs,compression]"]))
+        )
 
         # lambda function
         lambda_function = build_path / "lambda_function.py"
         build_lambda_handler(service_config.path, lambda_function)
+        if service_config.streaming:
+            build_lambda_entrypoint(build_path / ENTRYPOINT_FILENAME)
 
         # build and push image
         ecr_image_name = build_ecr_image_name(repo_name, tag)
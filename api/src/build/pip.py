@@ -13,7 +13,7 @@ PIP_PLATFORM = "x86_64-manylinux_2_31"
 def install_deps_to_dir(
     dependencies: list[str], python_version: str, output_dir: Path
 ) -> None:
-    dependencies.append("pare")
+    dependencies.append("pare[codecs,compression]")
     output_dir.mkdir(parents=True, exist_ok=True)
 
     pip_command = [
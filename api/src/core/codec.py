@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import base64
+import json
+import re
+from typing import Any, Iterable, Iterator
+
+from src.core.compression import IDENTITY, decompress_chunks
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+# Keys used in the Lambda event envelope (mirrors `pare.sdk.codec`)
+EVENT_CODEC_KEY = "pare_codec"
+EVENT_BODY_KEY = "body"
+EVENT_ENCODING_KEY = "pare_encoding"
+EVENT_ACCEPT_ENCODING_KEY = "pare_accept_encoding"
+EVENT_STREAM_KEY = "pare_stream"
+EVENT_BLOB_KEY = "pare_blob"
+EVENT_DEADLINE_KEY = "pare_deadline_ms"
+
+CODEC_CONTENT_TYPES = {
+    "json": JSON_CONTENT_TYPE,
+    "msgpack": MSGPACK_CONTENT_TYPE,
+}
+CONTENT_TYPE_CODECS = {
+    content_type: codec for codec, content_type in CODEC_CONTENT_TYPES.items()
+}
+# Results may also be a whole NDJSON stream, wrapped by a non-streaming handler
+RESULT_CONTENT_TYPES = {**CODEC_CONTENT_TYPES, "ndjson": NDJSON_CONTENT_TYPE}
+
+_ENVELOPE_PREFIX = b'{"' + EVENT_CODEC_KEY.encode()
+# Handlers put the body last in envelopes, so everything before it is a small head
+_ENVELOPE_BODY = re.compile(rb'"' + EVENT_BODY_KEY.encode() + rb'"\s*:\s*"')
+MAX_ENVELOPE_HEAD_SIZE = 4096
+
+
+def media_type(content_type: str | None) -> str:
+    return (content_type or JSON_CONTENT_TYPE).split(";")[0].strip().lower()
+
+
+def _add_event_fields(body: bytes, fields: dict[str, Any]) -> bytes:
+    # Splice the fields into the end of the JSON object instead of re-encoding it,
+    # so they win over any of the same keys in the body (the last duplicate wins)
+    head = body.rstrip()
+    if not fields or not head.endswith(b"}") or not body.lstrip().startswith(b"{"):
+        return body
+    head = head[:-1].rstrip()
+    separator = b"" if head.endswith(b"{") else b","
+    return head + separator + json.dumps(fields).encode()[1:]
+
+
+def build_lambda_payload(
+    body: bytes,
+    content_type: str | None,
+    accept_encoding: list[str],
+    extra_fields: dict[str, Any] | None = None,
+) -> bytes:
+    """Turn an SDK request body into a Lambda event payload.
+
+    JSON bodies are already a valid event and are passed through untouched.
+    Binary codecs are wrapped, since Lambda only accepts JSON events.
+    """
+    codec = CONTENT_TYPE_CODECS.get(media_type(content_type))
+    if codec is None:
+        raise ValueError(f"Unsupported content type: '{content_type}'")
+
+    fields: dict[str, Any] = dict(extra_fields or {})
+    if accept_encoding:
+        fields[EVENT_ACCEPT_ENCODING_KEY] = ",".join(accept_encoding)
+
+    if codec == "json":
+        if body.startswith(b'"'):
+            # Older SDKs send the arguments as a JSON-encoded string
+            body = json.loads(body).encode()
+        return _add_event_fields(body, fields)
+    return json.dumps(
+        {
+            EVENT_CODEC_KEY: codec,
+            **fields,
+            EVENT_BODY_KEY: base64.b64encode(body).decode("ascii"),
+        }
+    ).encode()
+
+
+def parse_lambda_payload(payload: bytes) -> tuple[bytes, str, str]:
+    """Extract the response body, its content type and its encoding from a Lambda result."""
+    if not payload.startswith(_ENVELOPE_PREFIX):
+        return payload, JSON_CONTENT_TYPE, IDENTITY
+    envelope = json.loads(payload)
+    if EVENT_BLOB_KEY in envelope:
+        # Spilled results are fetched by the client, not relayed through the API
+        return payload, JSON_CONTENT_TYPE, IDENTITY
+    return (
+        base64.b64decode(envelope[EVENT_BODY_KEY]),
+        RESULT_CONTENT_TYPES[envelope[EVENT_CODEC_KEY]],
+        envelope.get(EVENT_ENCODING_KEY, IDENTITY),
+    )
+
+
+def _decode_base64_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Decode a base64 JSON string, given the chunks after its opening quote."""
+    pending = b""
+    for chunk in chunks:
+        end = chunk.find(b'"')
+        pending += chunk if end < 0 else chunk[:end]
+        if end >= 0:
+            break
+        # Decode whole 4-character groups; the rest waits for the next chunk
+        cut = len(pending) - len(pending) % 4
+        if cut:
+            yield base64.b64decode(pending[:cut])
+            pending = pending[cut:]
+    if pending:
+        yield base64.b64decode(pending)
+
+
+def read_lambda_result(chunks: Iterable[bytes]) -> tuple[str, str, Iterator[bytes]]:
+    """Like `parse_lambda_payload`, for a result read in chunks.
+
+    Only the head of an envelope is parsed; its body is decoded as it streams
+    through, so that memory use doesn't grow with the size of the result.
+    """
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= len(_ENVELOPE_PREFIX):
+            break
+    if not head.startswith(_ENVELOPE_PREFIX):
+        return JSON_CONTENT_TYPE, IDENTITY, _chain(head, chunks)
+
+    match = _ENVELOPE_BODY.search(head)
+    while match is None and len(head) < MAX_ENVELOPE_HEAD_SIZE:
+        chunk = next(chunks, None)
+        if chunk is None:
+            break
+        head += chunk
+        match = _ENVELOPE_BODY.search(head)
+    if match is None:
+        # e.g. a spilled result, which has no body
+        body, content_type, encoding = parse_lambda_payload(head + b"".join(chunks))
+        return content_type, encoding, iter([body])
+
+    envelope = json.loads(head[: match.start()].rstrip().rstrip(b",") + b"}")
+    return (
+        RESULT_CONTENT_TYPES[envelope[EVENT_CODEC_KEY]],
+        envelope.get(EVENT_ENCODING_KEY, IDENTITY),
+        _decode_base64_chunks(_chain(head[match.end() :], chunks)),
+    )
+
+
+def _chain(head: bytes, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    if head:
+        yield head
+    yield from chunks
+
+
+def relay_stream_payload(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Relay the NDJSON stream returned by a Lambda function as it arrives.
+
+    Handlers on runtimes without response streaming return the whole stream at
+    once, wrapped in an envelope, which is unwrapped as it is read.
+    """
+    _, encoding, body = read_lambda_result(chunks)
+    yield from decompress_chunks(body, encoding)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import gzip
+import io
+import zlib
+from typing import IO, Any, Iterable, Iterator
+
+import zstandard
+
+IDENTITY = "identity"
+GZIP = "gzip"
+ZSTD = "zstd"
+
+SUPPORTED_ENCODINGS = (ZSTD, GZIP)
+
+# Bytes decompressed at a time, so a small input can't expand all at once
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+
+class PayloadTooLargeError(ValueError):
+    """Raised when data decompresses to more than its allowed size."""
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == GZIP:
+        return gzip.compress(data, compresslevel=5)
+    if encoding == ZSTD:
+        return zstandard.ZstdCompressor().compress(data)
+    if encoding == IDENTITY:
+        return data
+    raise ValueError(f"Unsupported encoding: '{encoding}'")
+
+
+def decompress(data: bytes, encoding: str, max_size: int | None = None) -> bytes:
+    """Decompress `data`, raising `PayloadTooLargeError` past `max_size` bytes.
+
+    Set `max_size` for anything a client sent: a small body can otherwise
+    expand to gigabytes.
+    """
+    if encoding == IDENTITY:
+        return data
+    return b"".join(decompress_chunks([data], encoding, max_size))
+
+
+def compress_chunks(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """Compress a stream without holding all of it in memory."""
+    if encoding == IDENTITY:
+        yield from chunks
+        return
+    if encoding == GZIP:
+        compressor = zlib.compressobj(5, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    elif encoding == ZSTD:
+        compressor = zstandard.ZstdCompressor().compressobj()
+    else:
+        raise ValueError(f"Unsupported encoding: '{encoding}'")
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+class _ChunkReader(io.RawIOBase):
+    """A file-like object over an iterable of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def _decompressing_reader(raw: IO[bytes], encoding: str) -> IO[bytes]:
+    if encoding == GZIP:
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    if encoding == ZSTD:
+        return zstandard.ZstdDecompressor().stream_reader(raw)
+    raise ValueError(f"Unsupported encoding: '{encoding}'")
+
+
+def decompress_chunks(
+    chunks: Iterable[bytes], encoding: str, max_size: int | None = None
+) -> Iterator[bytes]:
+    """Decompress a stream without holding all of it in memory.
+
+    Raises `PayloadTooLargeError` once the output exceeds `max_size` bytes.
+    """
+    if encoding == IDENTITY:
+        yield from chunks
+        return
+    reader = _decompressing_reader(io.BufferedReader(_ChunkReader(chunks)), encoding)
+    size = 0
+    while True:
+        chunk = reader.read(DECOMPRESS_CHUNK_SIZE)
+        if not chunk:
+            return
+        size += len(chunk)
+        if max_size is not None and size > max_size:
+            raise PayloadTooLargeError(
+                f"Decompressed data exceeds the limit of {max_size} bytes"
+            )
+        yield chunk
+
+
+def parse_accept_encoding(header: str | None) -> list[str]:
+    if not header:
+        return []
+    return [
+        encoding
+        for encoding in (part.strip().lower() for part in header.split(","))
+        if encoding in SUPPORTED_ENCODINGS
+    ]
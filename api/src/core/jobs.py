@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import time
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import urlparse
+
+from botocore.exceptions import ClientError
+
+from src import settings
+from src.aws import get_aws
+
+PENDING = "pending"
+DONE = "done"
+UNKNOWN = "unknown"
+EXPIRED = "expired"
+
+# Added to the Lambda event of submitted invocations (mirrors `pare.sdk.jobs`)
+EVENT_JOB_KEY = "pare_job"
+EVENT_JOB_RESULT_URL_KEY = "result_url"
+EVENT_JOB_EXPIRES_AT_KEY = "expires_at"
+
+
+class JobStore:
+    """Holds the results of submitted invocations until the client collects them.
+
+    A job is created as an empty placeholder, which the Lambda handler replaces
+    with its result by uploading to `result_url`. Placeholders outliving the
+    result URL expire, since the function can't store a result anymore (e.g. it
+    crashed or timed out).
+    """
+
+    def create(self, key: str) -> None:
+        raise NotImplementedError
+
+    def result_url(self, key: str) -> str:
+        raise NotImplementedError
+
+    def status(self, key: str) -> str:
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        raise NotImplementedError
+
+
+class S3JobStore(JobStore):
+    def __init__(self, bucket: str, prefix: str = "") -> None:
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = get_aws().s3_client
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def create(self, key: str) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=b"")  # type: ignore
+
+    def result_url(self, key: str) -> str:
+        return self.client.generate_presigned_url(  # type: ignore
+            "put_object",
+            Params={"Bucket": self.bucket, "Key": self._key(key)},
+            ExpiresIn=settings.PARE_JOB_RESULT_URL_EXPIRY,
+        )
+
+    def status(self, key: str) -> str:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=self._key(key))  # type: ignore
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):  # type: ignore
+                return UNKNOWN
+            raise
+        if response["ContentLength"]:
+            return DONE
+        return pending_status(response["LastModified"].timestamp())
+
+    def get(self, key: str) -> bytes:
+        response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))  # type: ignore
+        return response["Body"].read()
+
+
+class LocalJobStore(JobStore):
+    """Keeps results in a local directory, for development against a local Lambda."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+
+    def _path(self, key: str) -> Path:
+        return self.path / key
+
+    def create(self, key: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+
+    def result_url(self, key: str) -> str:
+        return self._path(key).resolve().as_uri()
+
+    def status(self, key: str) -> str:
+        try:
+            stat = self._path(key).stat()
+        except FileNotFoundError:
+            return UNKNOWN
+        return DONE if stat.st_size else pending_status(stat.st_mtime)
+
+    def get(self, key: str) -> bytes:
+        return self._path(key).read_bytes()
+
+
+def job_expires_at(created_at: float) -> float:
+    return created_at + settings.PARE_JOB_RESULT_URL_EXPIRY
+
+
+def pending_status(created_at: float) -> str:
+    return EXPIRED if time.time() >= job_expires_at(created_at) else PENDING
+
+
+@lru_cache(maxsize=None)
+def get_job_store() -> JobStore:
+    """The store configured by `PARE_JOB_STORE_URL`, e.g. `s3://bucket/jobs/`."""
+    url = urlparse(settings.PARE_JOB_STORE_URL)
+    if url.scheme == "s3":
+        return S3JobStore(url.netloc, prefix=url.path.lstrip("/"))
+    if url.scheme == "file":
+        return LocalJobStore(url.path)
+    if not url.scheme:
+        raise ValueError("Job submission is not configured on this server")
+    raise ValueError(f"Unsupported job store: '{settings.PARE_JOB_STORE_URL}'")
+
+
+def job_key(user_id: int, job_id: str) -> str:
+    # Keys are scoped to the user, so one user can never read another's jobs
+    return f"{user_id}/{job_id}"
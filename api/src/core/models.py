@@ -7,6 +7,8 @@ class ServiceConfig(BaseModel):
     name: str
     path: str
     requirements: list[str] = Field(default_factory=list)
+    # Generator endpoints, whose images start a runtime which can stream responses
+    streaming: bool = False
 
 
 class DeployConfig(BaseModel):
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Optional, Tuple
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import joinedload
+
+from src import settings
+from src.models import CurrentService, Deployment, Service, User
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# (API key, service name, deploy version)
+ResolutionKey = Tuple[str, str, Optional[str]]
+
+
+@dataclass(frozen=True)
+class ResolvedFunction:
+    """What an invocation needs to know about the service it targets."""
+
+    user_id: int
+    service_name: str
+    function_name: str
+
+
+class ResolutionCache:
+    """Remembers which Lambda function each API key, service and version invokes.
+
+    Entries are evicted least recently used beyond `maxsize`, and expire after
+    `ttl` seconds, which bounds how long a worker that missed an invalidation
+    keeps invoking an outdated function. Without Redis every invalidation from
+    another process is missed, so the TTL defaults to 0 (no caching) then.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Invalidations arrive on the pub/sub listener's thread
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[ResolutionKey, tuple[float, ResolvedFunction]] = (
+            OrderedDict()
+        )
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """Changes on every invalidation; pass it to `set` from before the lookup."""
+        return self._generation
+
+    def get(self, key: ResolutionKey) -> ResolvedFunction | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, resolved = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return resolved
+
+    def set(
+        self, key: ResolutionKey, resolved: ResolvedFunction, generation: int
+    ) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                # Invalidated during the lookup, so the result may already be outdated
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, resolved)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int, service_name: str | None = None) -> None:
+        """Drop the user's entries for `service_name`, or all of them."""
+        with self._lock:
+            self._generation += 1
+            for key, (_, resolved) in list(self._entries.items()):
+                if resolved.user_id == user_id and service_name in (
+                    None,
+                    resolved.service_name,
+                ):
+                    del self._entries[key]
+
+
+@lru_cache(maxsize=None)
+def get_resolution_cache() -> ResolutionCache:
+    return ResolutionCache(
+        maxsize=settings.PARE_RESOLUTION_CACHE_SIZE,
+        ttl=settings.PARE_RESOLUTION_CACHE_TTL,
+    )
+
+
+@lru_cache(maxsize=None)
+def _redis_client() -> Any:
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError(
+            "PARE_RESOLUTION_CACHE_REDIS_URL is set, but the 'redis' package is not installed"
+        )
+    return redis.Redis.from_url(settings.PARE_RESOLUTION_CACHE_REDIS_URL)
+
+
+def invalidate_resolutions(user_id: int, service_name: str | None = None) -> None:
+    """Drop cached resolutions in this worker, and publish to the others if configured.
+
+    Blocks on Redis, so call it from a worker thread.
+    """
+    get_resolution_cache().invalidate(user_id, service_name)
+    if settings.PARE_RESOLUTION_CACHE_REDIS_URL:
+        _redis_client().publish(
+            settings.PARE_RESOLUTION_CACHE_CHANNEL,
+            json.dumps({"user_id": user_id, "service_name": service_name}),
+        )
+
+
+def _on_invalidation(message: dict[str, Any]) -> None:
+    try:
+        event = json.loads(message["data"])
+        get_resolution_cache().invalidate(event["user_id"], event.get("service_name"))
+    except (ValueError, KeyError, TypeError):
+        logger.warning(
+            "Ignoring malformed resolution cache invalidation: %r",
+            message.get("data"),
+            exc_info=True,
+        )
+    except Exception:
+        # Raising would stop the listener thread, leaving every later invalidation unapplied
+        logger.exception("Could not apply resolution cache invalidation")
+
+
+def start_invalidation_listener() -> Any:
+    """Apply invalidations published by other workers, on a background thread.
+
+    Returns the listener thread, to `stop()` at shutdown, or None without Redis.
+    """
+    if not settings.PARE_RESOLUTION_CACHE_REDIS_URL:
+        return None
+    pubsub = _redis_client().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**{settings.PARE_RESOLUTION_CACHE_CHANNEL: _on_invalidation})
+    return pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+
+async def resolve_service(
+    session: AsyncSession,
+    api_key: str,
+    service_name: str,
+    deploy_version: str | None,
+) -> tuple[User | None, Service | None]:
+    """Find the user with `api_key` and the service they would invoke, in one query.
+
+    Without a `deploy_version`, this is the user's current deployment of the
+    service. The user is None for unknown API keys, and the service is None if
+    the user has no such service.
+    """
+    if deploy_version is None:
+        target = (
+            select(CurrentService.user_id, CurrentService.service_id)
+            .where(CurrentService.name == service_name)
+            .subquery()
+        )
+    else:
+        target = (
+            select(Deployment.user_id, Service.id.label("service_id"))
+            .join(Service.deployment)
+            .where(Service.name == service_name, Deployment.git_hash == deploy_version)
+            .subquery()
+        )
+    result = await session.execute(
+        select(User, Service)
+        .outerjoin(target, target.c.user_id == User.id)
+        .outerjoin(Service, Service.id == target.c.service_id)
+        .options(joinedload(Service.deployment).joinedload(Deployment.user))
+        .where(User.api_key == api_key)
+    )
+    row = result.first()
+    if row is None:
+        return None, None
+    return row[0], row[1]
+
+
+async def set_current_service(
+    session: AsyncSession, user_id: int, service: Service
+) -> None:
+    """Make `service` the version of its name that invocations reach by default."""
+    statement = insert(CurrentService).values(
+        user_id=user_id, name=service.name, service_id=service.id
+    )
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[CurrentService.user_id, CurrentService.name],
+            set_={
+                "service_id": statement.excluded.service_id,
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+async def restore_current_service(
+    session: AsyncSession, user_id: int, service_name: str
+) -> None:
+    """Point at the newest version left, if deleting the current version removed the pointer."""
+    newest = (
+        select(literal(user_id), literal(service_name), Service.id)
+        .join(Service.deployment)
+        .where(Deployment.user_id == user_id, Service.name == service_name)
+        .order_by(Deployment.created_at.desc(), Service.id.desc())
+        .limit(1)
+    )
+    await session.execute(
+        insert(CurrentService)
+        .from_select(["user_id", "name", "service_id"], newest)
+        .on_conflict_do_nothing()
+    )
@@ -4,11 +4,11 @@ import asyncio
 import json
 from typing import Any, Callable, TypeVar
 
-import boto3
 from botocore.exceptions import ClientError
 from typing_extensions import ParamSpec
 
 from src import settings
+from src.aws import get_aws
 
 
 def generate_ecr_repo_policy(function_name: str) -> dict[str, Any]:
@@ -30,11 +30,12 @@ def generate_ecr_repo_policy(function_name: str) -> dict[str, Any]:
     }
 
 
-def create_ecr_repository(repository_name: str, function_name: str) -> bool:
-    ecr_client = boto3.client("ecr", region_name=settings.AWS_DEFAULT_REGION)  # type: ignore
+async def create_ecr_repository(repository_name: str, function_name: str) -> bool:
+    aws = get_aws()
 
     try:
-        ecr_client.create_repository(  # type: ignore
+        await aws.call(
+            aws.ecr_client.create_repository,  # type: ignore
             repositoryName=repository_name,
             imageScanningConfiguration={"scanOnPush": True},
             encryptionConfiguration={"encryptionType": "AES256"},
@@ -47,7 +48,8 @@ def create_ecr_repository(repository_name: str, function_name: str) -> bool:
             print(f"An error occurred: {e}")
             return False
 
-    ecr_client.set_repository_policy(  # type: ignore
+    await aws.call(
+        aws.ecr_client.set_repository_policy,  # type: ignore
         repositoryName=repository_name,
         policyText=json.dumps(generate_ecr_repo_policy(function_name)),
     )
@@ -65,7 +67,7 @@ async def update_with_backoff(
     retries = 0
     while retries < settings.AWS_LAMBDA_UPDATE_MAX_RETRIES:
         try:
-            return update_func(*args, **kwargs)
+            return await get_aws().call(update_func, *args, **kwargs)
         except ClientError as e:
             if e.response["Error"]["Code"] == "ResourceConflictException":  # type: ignore
                 wait_time = settings.AWS_LAMBDA_UPDATE_INITIAL_BACKOFF * (2**retries)
@@ -84,21 +86,20 @@ async def deploy_python_lambda_function_from_ecr(
     image_name: str,
     environment_variables: dict[str, str],
 ):
-    # Initialize the Lambda client
-    lambda_client = boto3.client("lambda", region_name=settings.AWS_DEFAULT_REGION)  # type: ignore
+    aws = get_aws()
 
     try:
-        lambda_client.get_function(FunctionName=function_name)  # type: ignore
+        await aws.call(aws.lambda_client.get_function, FunctionName=function_name)  # type: ignore
         # If we reach here, the function exists, so we update it
         response = await update_with_backoff(  # type: ignore
-            lambda_client.update_function_code,  # type: ignore
+            aws.lambda_client.update_function_code,  # type: ignore
             FunctionName=function_name,
             ImageUri=image_name,
         )
         print(f"Updated existing Lambda function: {function_name}")
 
         await update_with_backoff(
-            lambda_client.update_function_configuration,  # type: ignore
+            aws.lambda_client.update_function_configuration,  # type: ignore
             FunctionName=function_name,
             Environment={"Variables": environment_variables},
         )
@@ -106,7 +107,8 @@ async def deploy_python_lambda_function_from_ecr(
     except ClientError as e:
         if e.response["Error"]["Code"] == "ResourceNotFoundException":  # type: ignore
             # The function doesn't exist, so we create it
-            response = lambda_client.create_function(  # type: ignore
+            response = await aws.call(
+                aws.lambda_client.create_function,  # type: ignore
                 FunctionName=function_name,
                 PackageType="Image",
                 Code={
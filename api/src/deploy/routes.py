@@ -7,14 +7,22 @@ from pathlib import Path
 from typing import TYPE_CHECKING
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
+from pare.naming import (
+    build_ecr_repo_name,
+    build_lambda_function_name,
+    build_lambda_function_name_pattern,
+)
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from typing_extensions import Annotated
 
 from src import settings
 from src.build import build_and_publish_image_to_ecr, unzip_file, write_to_zipfile
 from src.constants import API_VERSION
 from src.core.models import DeployConfig, ServiceConfig
+from src.core.resolution import invalidate_resolutions, set_current_service
 from src.db import get_db
 from src.deploy import create_ecr_repository, deploy_python_lambda_function_from_ecr
 from src.middleware import get_total_deploys_for_user, get_user
@@ -30,32 +38,20 @@ UPLOADED_BUNDLE_FILENAME = "uploaded_bundle.zip"
 UNZIPPED_BUNDLE_DIR = "unzipped_bundle"
 
 
-def build_ecr_repo_name(user: User, service_name: str) -> str:
-    return f"{user.username}_{service_name}"
-
-
-def build_lambda_function_name(repo_name: str, tag: str) -> str:
-    return f"{repo_name}_{tag}"
-
-
-# AUTH SENSITIVE!
-# This pattern is used in the ECR policy to allow Lambda to pull images
-def build_lambda_function_name_pattern(repo_name: str) -> str:
-    return f"{repo_name}_*"
-
-
 async def deploy_image(
     bundle_dir: Path,
     service_config: ServiceConfig,
     deploy_config: DeployConfig,
     user: User,
 ) -> bool:
-    repo_name = build_ecr_repo_name(user, service_config.name)
+    repo_name = build_ecr_repo_name(user.username, service_config.name)
     tag = deploy_config.git_hash
     function_name = build_lambda_function_name(repo_name, tag)
     function_name_pattern = build_lambda_function_name_pattern(repo_name)
 
-    repo_created = create_ecr_repository(repo_name, function_name=function_name_pattern)
+    repo_created = await create_ecr_repository(
+        repo_name, function_name=function_name_pattern
+    )
     if not repo_created:
         print(f"Failed to create ECR repository for {repo_name}")
         return False
@@ -99,6 +95,14 @@ async def deploy(
         raise HTTPException(status_code=422, detail="Couldn't process deployment data.")
 
     async with db as session:
+        # Concurrent deploys of the same version share the deployment
+        await session.execute(
+            insert(Deployment)
+            .values(user_id=user.id, git_hash=deploy_config.git_hash)
+            .on_conflict_do_nothing(
+                index_elements=[Deployment.user_id, Deployment.git_hash]
+            )
+        )
         deployment = (
             await session.execute(
                 select(Deployment).filter(
@@ -106,12 +110,8 @@ async def deploy(
                     Deployment.git_hash == deploy_config.git_hash,
                 )
             )
-        ).scalar()
-
-        if not deployment:
-            deployment = Deployment(user_id=user.id, git_hash=deploy_config.git_hash)
-            session.add(deployment)
-            await session.commit()
+        ).scalar_one()
+        await session.commit()
 
     with tempfile.TemporaryDirectory() as tmp_dir:
         tmp_dir = Path(tmp_dir)
@@ -142,6 +142,16 @@ async def deploy(
         for i, deploy_succeeded in enumerate(deploy_results):
             if deploy_succeeded:
                 async with db as session:
+                    await session.execute(
+                        insert(Service)
+                        .values(
+                            deployment_id=deployment.id,
+                            name=deploy_config.services[i].name,
+                        )
+                        .on_conflict_do_nothing(
+                            index_elements=[Service.deployment_id, Service.name]
+                        )
+                    )
                     service = (
                         await session.execute(
                             select(Service).filter(
@@ -149,19 +159,17 @@ async def deploy(
                                 Service.name == deploy_config.services[i].name,
                             )
                         )
-                    ).scalar()
-
-                    if not service:
-                        service = Service(
-                            deployment_id=deployment.id,
-                            name=deploy_config.services[i].name,
-                        )
-                        session.add(service)
-                        await session.commit()
+                    ).scalar_one()
+                    # Invocations without a deploy version now reach this deployment
+                    await set_current_service(session, user.id, service)  # type: ignore
+                    await session.commit()
                 succeeded.append(deploy_config.services[i].name)
             else:
                 failed.append(deploy_config.services[i].name)
 
+        for service_name in succeeded:
+            await run_in_threadpool(invalidate_resolutions, user.id, service_name)
+
         if failed:
             return JSONResponse(
                 status_code=500,
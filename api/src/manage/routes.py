@@ -1,21 +1,65 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import time
+import uuid
 from datetime import datetime
-from typing import TYPE_CHECKING, Any, List
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterable, Iterator, List
 
-import boto3
 from botocore.exceptions import ClientError
-from fastapi import APIRouter, Body, Depends, HTTPException, Path, Response
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, field_serializer
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pare.naming import build_ecr_repo_name, build_lambda_function_name
+from pydantic import BaseModel, Field, field_serializer
 from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
 from src import settings
+from src.aws import AWSClients, get_aws
 from src.constants import API_VERSION
+from src.core.codec import (
+    EVENT_DEADLINE_KEY,
+    EVENT_STREAM_KEY,
+    JSON_CONTENT_TYPE,
+    NDJSON_CONTENT_TYPE,
+    build_lambda_payload,
+    media_type,
+    parse_lambda_payload,
+    read_lambda_result,
+    relay_stream_payload,
+)
+from src.core.compression import (
+    IDENTITY,
+    PayloadTooLargeError,
+    compress,
+    compress_chunks,
+    decompress,
+    decompress_chunks,
+    parse_accept_encoding,
+)
+from src.core.jobs import (
+    EVENT_JOB_EXPIRES_AT_KEY,
+    EVENT_JOB_KEY,
+    EVENT_JOB_RESULT_URL_KEY,
+    EXPIRED,
+    PENDING,
+    UNKNOWN,
+    JobStore,
+    get_job_store,
+    job_expires_at,
+    job_key,
+)
+from src.core.resolution import (
+    ResolvedFunction,
+    get_resolution_cache,
+    invalidate_resolutions,
+    resolve_service,
+    restore_current_service,
+)
 from src.db import get_db
-from src.middleware import get_deploy_version, get_user
+from src.middleware import get_deadline, get_deploy_version, get_user
 from src.models import Deployment, Service, User
 
 if TYPE_CHECKING:
@@ -46,30 +90,6 @@ async def services_for_user_by_name(
         return list(services)
 
 
-# Used when invoking a service
-async def service_for_user_by_version_or_latest(
-    deploy_version: str | None = Depends(get_deploy_version),
-    services: list[Service] = Depends(services_for_user_by_name),
-) -> Service:
-    if deploy_version is None:
-        # If no deploy version is provided, return the latest service
-        return services[0]
-
-    matching_service: Service | None = None
-    for service in services:
-        if service.deployment.git_hash == deploy_version:
-            if matching_service:
-                raise HTTPException(status_code=500, detail="Multiple services found")
-            matching_service = service
-
-    if not matching_service:
-        raise HTTPException(
-            status_code=404, detail="Service not found for deploy version"
-        )
-
-    return matching_service
-
-
 # Used when deleting a service or getting details about a service
 async def service_for_user_by_version_or_unique_name(
     deploy_version: str | None = Depends(get_deploy_version),
@@ -100,7 +120,46 @@ async def service_for_user_by_version_or_unique_name(
 
 
 def get_lambda_function_name(service: Service) -> str:
-    return f"{service.deployment.user.username}_{service.name}_{service.deployment.git_hash}"
+    repo_name = build_ecr_repo_name(service.deployment.user.username, service.name)
+    return build_lambda_function_name(repo_name, service.deployment.git_hash)
+
+
+# Used when invoking a service; warm invocations don't query the database
+async def resolve_function(
+    request: Request,
+    service_name: str = Path(..., title="Service Name"),
+    deploy_version: str | None = Depends(get_deploy_version),
+    db: AsyncSession = Depends(get_db),
+) -> ResolvedFunction:
+    cache = get_resolution_cache()
+    key = (request.state.api_key, service_name, deploy_version)
+    resolved = cache.get(key)
+    if resolved is not None:
+        return resolved
+
+    generation = cache.generation
+    async with db as session:
+        user, service = await resolve_service(
+            session, request.state.api_key, service_name, deploy_version
+        )
+    if user is None:
+        raise HTTPException(status_code=401, detail="Unauthenticated")
+    if user.is_blocked:  # type: ignore
+        raise HTTPException(status_code=403, detail="User is blocked")
+    if service is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Service not found for deploy version"
+            if deploy_version
+            else "No services found",
+        )
+    resolved = ResolvedFunction(
+        user_id=user.id,  # type: ignore
+        service_name=service.name,  # type: ignore
+        function_name=get_lambda_function_name(service),
+    )
+    cache.set(key, resolved, generation)
+    return resolved
 
 
 class DeploymentSchema(BaseModel):
@@ -158,20 +217,31 @@ async def list_lambda_info(
 async def delete_lambda(
     service: Service = Depends(service_for_user_by_version_or_unique_name),
     db: AsyncSession = Depends(get_db),
+    aws: AWSClients = Depends(get_aws),
 ) -> Response:
-    lambda_client = boto3.client("lambda", region_name=settings.AWS_DEFAULT_REGION)  # type: ignore
-
     try:
         # Delete the Lambda function
-        response = lambda_client.delete_function(  # type: ignore
-            FunctionName=get_lambda_function_name(service)
+        response = await aws.call(
+            aws.lambda_client.delete_function,  # type: ignore
+            FunctionName=get_lambda_function_name(service),
         )
 
         # Check if the deletion was successful
         if response["ResponseMetadata"]["HTTPStatusCode"] == 204:
             async with db as session:
                 await session.delete(service)
+                await session.flush()
+                await restore_current_service(
+                    session,
+                    service.deployment.user.id,  # type: ignore
+                    service.name,  # type: ignore
+                )
                 await session.commit()
+            await run_in_threadpool(
+                invalidate_resolutions,
+                service.deployment.user.id,  # type: ignore
+                service.name,  # type: ignore
+            )
             return JSONResponse(
                 content={
                     "message": f"Lambda function '{service.name}' deleted successfully"
@@ -201,34 +271,475 @@ async def delete_lambda(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def encode_invoke_response(
+    body: bytes, encoding: str, accept_encoding: list[str]
+) -> tuple[bytes, str]:
+    """Match the response body's compression to what the client accepts."""
+    if encoding == IDENTITY:
+        if accept_encoding and len(body) >= settings.PARE_COMPRESSION_THRESHOLD:
+            return compress(body, accept_encoding[0]), accept_encoding[0]
+        return body, IDENTITY
+    if encoding in accept_encoding:
+        return body, encoding
+    return decompress(body, encoding), IDENTITY
+
+
+def encode_invoke_chunks(
+    chunks: Iterator[bytes],
+    encoding: str,
+    accept_encoding: list[str],
+    size: int | None,
+) -> tuple[Iterator[bytes], str]:
+    """Like `encode_invoke_response`, as the body streams through.
+
+    `size` is the size of the whole Lambda payload, if known, which is at least
+    the size of the body within it.
+    """
+    if encoding == IDENTITY:
+        if accept_encoding and (size or 0) >= settings.PARE_COMPRESSION_THRESHOLD:
+            return compress_chunks(chunks, accept_encoding[0]), accept_encoding[0]
+        return chunks, IDENTITY
+    if encoding in accept_encoding:
+        return chunks, encoding
+    return decompress_chunks(chunks, encoding), IDENTITY
+
+
+def lambda_client_error(e: ClientError, service_name: str) -> HTTPException:
+    error_code = e.response["Error"]["Code"]  # type: ignore
+    if error_code == "ResourceNotFoundException":
+        return HTTPException(
+            status_code=404, detail=f"Lambda function '{service_name}' not found"
+        )
+    if error_code == "TooManyRequestsException":
+        # Throttled by Lambda; clients may retry
+        return HTTPException(status_code=429, detail=str(e))
+    if error_code == "RequestTooLargeException":
+        return HTTPException(
+            status_code=413,
+            detail="Arguments exceed the Lambda payload limit. Set PARE_BLOB_STORE_URL to send large arguments through a blob store.",
+        )
+    return HTTPException(status_code=500, detail=str(e))
+
+
+async def read_request_body(
+    request: Request, max_size: int = settings.PARE_MAX_PAYLOAD_SIZE
+) -> bytes:
+    try:
+        body = await run_in_threadpool(
+            decompress,
+            await request.body(),
+            request.headers.get(settings.PARE_CONTENT_ENCODING_HEADER, IDENTITY),
+            max_size,
+        )
+    except PayloadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=f"Request body too large: {e}")
+    except Exception as e:
+        raise HTTPException(
+            status_code=400, detail=f"Could not decompress request body: {e}"
+        )
+    if len(body) > max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Request body too large: exceeds the limit of {max_size} bytes",
+        )
+    return body
+
+
+async def read_lambda_payload(
+    request: Request, extra_fields: dict[str, Any] | None = None
+) -> bytes:
+    """Build the Lambda event payload from an invoke or submit request body."""
+    body = await read_request_body(request)
+    try:
+        return build_lambda_payload(
+            body,
+            request.headers.get("Content-Type"),
+            accept_encoding=parse_accept_encoding(
+                request.headers.get(settings.PARE_ACCEPT_ENCODING_HEADER)
+            ),
+            extra_fields=extra_fields,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+
+def remaining_time(deadline: float | None) -> float | None:
+    """Seconds left before the caller's deadline, refusing calls once it has passed."""
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        # Lambda would run the function for a caller that has already given up
+        raise HTTPException(
+            status_code=504, detail="Deadline exceeded before invoking the function"
+        )
+    return remaining
+
+
+def deadline_fields(remaining: float | None) -> dict[str, Any]:
+    """Event fields telling the function how long its caller will wait."""
+    if remaining is None:
+        return {}
+    return {EVENT_DEADLINE_KEY: int(remaining * 1000)}
+
+
+async def lambda_result_response(
+    request: Request, payload: bytes, lambda_duration: float | None = None
+) -> Response:
+    # Pass the result through as-is rather than decoding and re-encoding it
+    body, media_type, encoding = parse_lambda_payload(payload)
+    body, encoding = await run_in_threadpool(
+        encode_invoke_response,
+        body,
+        encoding,
+        parse_accept_encoding(
+            request.headers.get(settings.PARE_ACCEPT_ENCODING_HEADER)
+        ),
+    )
+    headers = (
+        {settings.PARE_CONTENT_ENCODING_HEADER: encoding}
+        if encoding != IDENTITY
+        else {}
+    )
+    if lambda_duration is not None:
+        # Lets clients tell time spent in the function apart from time on the network
+        headers["Server-Timing"] = f"lambda;dur={lambda_duration * 1000:.1f}"
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def lambda_result_chunks(stream: Any) -> Iterator[bytes]:
+    try:
+        yield from stream.iter_chunks(settings.PARE_RESULT_CHUNK_SIZE)
+    finally:
+        stream.close()
+
+
+async def call_lambda(
+    aws: AWSClients,
+    target: ResolvedFunction,
+    payload: bytes,
+    deadline: float | None,
+) -> tuple[dict[str, Any], float]:
+    """Invoke the function, returning its response with the result still unread.
+
+    Failed invocations raise an HTTPException to relay to the client.
+    """
+    try:
+        started = time.monotonic()
+        # The function can't be stopped from here, but it knows its deadline;
+        # stop waiting for it once the caller no longer is
+        response = await asyncio.wait_for(
+            aws.call(
+                aws.lambda_client.invoke,  # type: ignore
+                FunctionName=target.function_name,
+                InvocationType="RequestResponse",
+                Payload=payload,
+            ),
+            timeout=remaining_time(deadline),
+        )
+        lambda_duration = time.monotonic() - started
+
+        if response.get("FunctionError") or response["StatusCode"] != 200:
+            # Reading the result blocks on the connection too
+            error: bytes = await aws.call(response["Payload"].read)  # type: ignore
+            # e.g. the result was over the Lambda payload limit, or the function timed out
+            status_code = (
+                502 if response.get("FunctionError") else response["StatusCode"]
+            )
+            raise HTTPException(status_code=status_code, detail=error.decode())
+        return response, lambda_duration  # type: ignore
+
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504, detail="Deadline exceeded while the function was running"
+        )
+    except ClientError as e:
+        raise lambda_client_error(e, target.service_name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/invoke/{service_name}/")
-def invoke_lambda(
-    request_body: Any = Body(),
-    service: Service = Depends(service_for_user_by_version_or_latest),
+async def invoke_lambda(
+    request: Request,
+    target: ResolvedFunction = Depends(resolve_function),
+    deadline: float | None = Depends(get_deadline),
+    aws: AWSClients = Depends(get_aws),
 ) -> Response:
-    lambda_client = boto3.client("lambda", region_name=settings.AWS_DEFAULT_REGION)  # type: ignore
+    payload = await read_lambda_payload(
+        request, extra_fields=deadline_fields(remaining_time(deadline))
+    )
+    response, lambda_duration = await call_lambda(aws, target, payload, deadline)
 
     try:
-        response = lambda_client.invoke(  # type: ignore
-            FunctionName=get_lambda_function_name(service),
-            InvocationType="RequestResponse",
-            Payload=request_body,
+        # Relay the result as it is read, rather than holding all of it in memory;
+        # only the head of an envelope is parsed, to learn the body's type
+        content_type, encoding, body = await aws.call(
+            read_lambda_result, lambda_result_chunks(response["Payload"])
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    size = response["ResponseMetadata"]["HTTPHeaders"].get("content-length")
+    body, encoding = encode_invoke_chunks(
+        body,
+        encoding,
+        parse_accept_encoding(
+            request.headers.get(settings.PARE_ACCEPT_ENCODING_HEADER)
+        ),
+        size=int(size) if size else None,
+    )
+    headers = {
+        # Lets clients tell time spent in the function apart from time on the network
+        "Server-Timing": f"lambda;dur={lambda_duration * 1000:.1f}",
+    }
+    if encoding != IDENTITY:
+        headers[settings.PARE_CONTENT_ENCODING_HEADER] = encoding
+    return StreamingResponse(
+        iterate_in_threadpool(body), media_type=content_type, headers=headers
+    )
+
+
+def batch_result_line(index: int, status: int, **fields: Any) -> bytes:
+    return json.dumps({"index": index, "status": status, **fields}).encode() + b"\n"
+
+
+async def invoke_batch_item(
+    aws: AWSClients,
+    target: ResolvedFunction,
+    index: int,
+    body: bytes,
+    accept_encoding: list[str],
+    deadline: float | None,
+) -> bytes:
+    try:
+        payload = build_lambda_payload(
+            body,
+            JSON_CONTENT_TYPE,
+            accept_encoding,
+            extra_fields=deadline_fields(remaining_time(deadline)),
         )
+        response, _ = await call_lambda(aws, target, payload, deadline)
+        result: bytes = await aws.call(response["Payload"].read)
+    except HTTPException as e:
+        return batch_result_line(index, e.status_code, detail=e.detail)
+    except Exception as e:
+        return batch_result_line(index, 500, detail=str(e))
+    # The result is JSON already, perhaps an envelope; embed it rather than re-encoding it
+    return b'{"index": %d, "status": 200, "result": %s}\n' % (index, result.strip())
+
+
+@router.post("/invoke-batch/{service_name}/")
+async def invoke_batch_lambda(
+    request: Request,
+    concurrency: int | None = Query(None, ge=1),
+    target: ResolvedFunction = Depends(resolve_function),
+    deadline: float | None = Depends(get_deadline),
+    aws: AWSClients = Depends(get_aws),
+) -> StreamingResponse:
+    """Invoke the function once per NDJSON line of the request body.
+
+    Each line is the JSON body of an invoke request, or the envelope an SDK sends
+    for binary codecs. Results stream back as NDJSON lines in completion order,
+    each with the `index` of its line and a `status`, and either the Lambda
+    `result` or an error `detail`. The caller's authentication and the target
+    function are resolved once for the whole batch.
+    """
+    if media_type(request.headers.get("Content-Type")) != NDJSON_CONTENT_TYPE:
+        raise HTTPException(
+            status_code=415, detail=f"Batches must be sent as {NDJSON_CONTENT_TYPE}"
+        )
+    body = await read_request_body(request, settings.PARE_BATCH_MAX_PAYLOAD_SIZE)
+    items = [line for line in body.splitlines() if line.strip()]
+    if len(items) > settings.PARE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batches are limited to {settings.PARE_BATCH_MAX_ITEMS} items",
+        )
+    # Refuse the whole batch, rather than each item, once the deadline has passed
+    remaining_time(deadline)
+    accept_encoding = parse_accept_encoding(
+        request.headers.get(settings.PARE_ACCEPT_ENCODING_HEADER)
+    )
+    semaphore = asyncio.Semaphore(
+        min(
+            concurrency or settings.PARE_BATCH_CONCURRENCY,
+            settings.PARE_BATCH_CONCURRENCY,
+        )
+    )
 
-        payload = json.loads(response["Payload"].read().decode("utf-8"))  # type: ignore
+    async def invoke(index: int, item: bytes) -> bytes:
+        async with semaphore:
+            return await invoke_batch_item(
+                aws, target, index, item, accept_encoding, deadline
+            )
 
-        # Check if the function execution was successful
-        if response["StatusCode"] == 200:
-            return JSONResponse(content=payload)
-        else:
-            raise HTTPException(status_code=response["StatusCode"], detail=payload)  # type: ignore
+    async def results() -> AsyncIterator[bytes]:
+        tasks = [asyncio.ensure_future(invoke(i, item)) for i, item in enumerate(items)]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # Stop invoking the rest if the client goes away
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type=NDJSON_CONTENT_TYPE)
+
+
+def lambda_stream_chunks(event_stream: Iterable[dict[str, Any]]) -> Iterator[bytes]:
+    for event in event_stream:
+        if "PayloadChunk" in event:
+            yield event["PayloadChunk"]["Payload"]
+        elif "InvokeComplete" in event and event["InvokeComplete"].get("ErrorCode"):
+            # Report the failure in-band, since the response has already started
+            error = event["InvokeComplete"]
+            detail = error.get("ErrorDetails") or error["ErrorCode"]
+            yield json.dumps({"status": 500, "detail": detail}).encode() + b"\n"
+
+
+@router.post("/stream/{service_name}/")
+async def stream_lambda(
+    request: Request,
+    target: ResolvedFunction = Depends(resolve_function),
+    deadline: float | None = Depends(get_deadline),
+    aws: AWSClients = Depends(get_aws),
+) -> StreamingResponse:
+    payload = await read_lambda_payload(
+        request,
+        extra_fields={
+            EVENT_STREAM_KEY: True,
+            **deadline_fields(remaining_time(deadline)),
+        },
+    )
+
+    try:
+        response = await aws.call(
+            aws.lambda_client.invoke_with_response_stream,  # type: ignore
+            FunctionName=target.function_name,
+            Payload=payload,
+        )
+    except ClientError as e:
+        raise lambda_client_error(e, target.service_name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    chunks = relay_stream_payload(lambda_stream_chunks(response["EventStream"]))  # type: ignore
+    # Read the event stream on a worker thread so chunks are relayed as they arrive
+    return StreamingResponse(
+        iterate_in_threadpool(chunks), media_type=NDJSON_CONTENT_TYPE
+    )
+
+
+def get_configured_job_store() -> JobStore:
+    try:
+        return get_job_store()
+    except ValueError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+
+def is_job_id(job_id: str) -> bool:
+    try:
+        return uuid.UUID(hex=job_id).hex == job_id
+    except ValueError:
+        return False
+
+
+@router.post("/submit/{service_name}/", status_code=202)
+async def submit_lambda(
+    request: Request,
+    target: ResolvedFunction = Depends(resolve_function),
+    store: JobStore = Depends(get_configured_job_store),
+    aws: AWSClients = Depends(get_aws),
+) -> JSONResponse:
+    job_id = uuid.uuid4().hex
+    key = job_key(target.user_id, job_id)
+    try:
+        created_at = time.time()
+        await run_in_threadpool(store.create, key)
+        result_url = await run_in_threadpool(store.result_url, key)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not create job: {e}")
+
+    payload = await read_lambda_payload(
+        request,
+        extra_fields={
+            EVENT_JOB_KEY: {
+                EVENT_JOB_RESULT_URL_KEY: result_url,
+                # Lambda may only run queued events later; skip them once expired
+                EVENT_JOB_EXPIRES_AT_KEY: job_expires_at(created_at),
+            }
+        },
+    )
 
+    try:
+        # The function stores its own result, so don't wait for it to finish
+        response = await aws.call(
+            aws.lambda_client.invoke,  # type: ignore
+            FunctionName=target.function_name,
+            InvocationType="Event",
+            Payload=payload,
+        )
     except ClientError as e:
-        if e.response["Error"]["Code"] == "ResourceNotFoundException":  # type: ignore
+        raise lambda_client_error(e, target.service_name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if response["StatusCode"] != 202:
+        raise HTTPException(
+            status_code=500, detail=f"Could not submit to '{target.service_name}'"
+        )
+    return JSONResponse(content={"job_id": job_id}, status_code=202)
+
+
+class JobStatusRequest(BaseModel):
+    job_ids: list[str] = Field(max_length=1000)
+
+
+@router.post("/jobs/")
+async def get_job_statuses(
+    body: JobStatusRequest,
+    user: User = Depends(get_user),
+    store: JobStore = Depends(get_configured_job_store),
+) -> dict[str, dict[str, str]]:
+    async def status(job_id: str) -> str:
+        if not is_job_id(job_id):
+            return UNKNOWN
+        return await run_in_threadpool(store.status, job_key(user.id, job_id))  # type: ignore
+
+    try:
+        statuses = await asyncio.gather(*(status(job_id) for job_id in body.job_ids))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"statuses": dict(zip(body.job_ids, statuses))}
+
+
+@router.get("/jobs/{job_id}/")
+async def get_job_result(
+    request: Request,
+    job_id: str,
+    user: User = Depends(get_user),
+    store: JobStore = Depends(get_configured_job_store),
+) -> Response:
+    if not is_job_id(job_id):
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    key = job_key(user.id, job_id)  # type: ignore
+    try:
+        status = await run_in_threadpool(store.status, key)
+        if status == UNKNOWN:
+            raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+        if status == PENDING:
+            return JSONResponse(content={"status": PENDING}, status_code=202)
+        if status == EXPIRED:
             raise HTTPException(
-                status_code=404, detail=f"Lambda function '{service.name}' not found"
+                status_code=410,
+                detail=f"Job '{job_id}' expired before its result was stored",
             )
-        else:
-            raise HTTPException(status_code=500, detail=str(e))
+        return await lambda_result_response(
+            request, await run_in_threadpool(store.get, key)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
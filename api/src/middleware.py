@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import time
 from typing import TYPE_CHECKING, Any
 
 from fastapi import Depends
@@ -54,6 +55,14 @@ async def get_deploy_version(request: Request) -> str | None:
         return None
 
 
+async def get_deadline(request: Request) -> float | None:
+    """The `time.monotonic()` time by which the caller needs the result, if any."""
+    try:
+        return request.state.deadline
+    except AttributeError:
+        return None
+
+
 AUTH_EXEMPT = {"/healthcheck/", "/login-with-github/"}
 
 
@@ -75,3 +84,20 @@ def apply_middleware(app: FastAPI) -> None:
             ]
 
         return await call_next(request)
+
+    @app.middleware("http")
+    async def deadline_middleware(request: Request, call_next: Any):  # pyright: ignore[reportUnusedFunction]
+        if settings.PARE_DEADLINE_HEADER in request.headers:
+            # Relative to when the request arrived, so clocks don't need to agree
+            try:
+                milliseconds = int(request.headers[settings.PARE_DEADLINE_HEADER])
+            except ValueError:
+                return JSONResponse(
+                    status_code=400,
+                    content={
+                        "detail": f"Invalid {settings.PARE_DEADLINE_HEADER} header"
+                    },
+                )
+            request.state.deadline = time.monotonic() + milliseconds / 1000
+
+        return await call_next(request)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from .deployment import Deployment, Service
+from .deployment import CurrentService, Deployment, Service
 from .user import User
 
-__all__ = ["User", "Deployment", "Service"]
+__all__ = ["User", "Deployment", "Service", "CurrentService"]
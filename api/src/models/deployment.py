@@ -1,6 +1,14 @@
 from __future__ import annotations
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.orm import relationship
 
 from src.db import Base
@@ -8,6 +16,9 @@ from src.db import Base
 
 class Deployment(Base):
     __tablename__ = "deployments"
+    __table_args__ = (
+        UniqueConstraint("user_id", "git_hash", name="uq_deployments_user_id_git_hash"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -18,9 +29,33 @@ class Deployment(Base):
 
 class Service(Base):
     __tablename__ = "services"
+    __table_args__ = (
+        UniqueConstraint(
+            "deployment_id", "name", name="uq_services_deployment_id_name"
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     deployment_id = Column(Integer, ForeignKey("deployments.id"), nullable=False)
     deployment = relationship("Deployment")
     name = Column(String, index=True, nullable=False)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+
+class CurrentService(Base):
+    """Points at the most recently deployed version of each of a user's services."""
+
+    __tablename__ = "current_services"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    name = Column(String, primary_key=True)
+    service_id = Column(
+        Integer,
+        ForeignKey("services.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    service = relationship("Service")
+    updated_at = Column(
+        DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
+    )
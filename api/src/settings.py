@@ -34,11 +34,55 @@ AWS_DEFAULT_REGION: str = env.str("AWS_DEFAULT_REGION", "us-east-1")
 AWS_ACCOUNT_ID: str = env.str("AWS_ACCOUNT_ID")
 AWS_LAMBDA_UPDATE_INITIAL_BACKOFF: int = env.int("AWS_LAMBDA_UPDATE_INITIAL_BACKOFF", 1)
 AWS_LAMBDA_UPDATE_MAX_RETRIES: int = env.int("AWS_LAMBDA_UPDATE_MAX_RETRIES", 8)
+# Connections kept open to each AWS service, and threads making calls, per API worker
+AWS_MAX_POOL_CONNECTIONS: int = env.int("AWS_MAX_POOL_CONNECTIONS", 64)
+AWS_CONNECT_TIMEOUT: float = env.float("AWS_CONNECT_TIMEOUT", 5.0)
+AWS_LAMBDA_READ_TIMEOUT: float = env.float("AWS_LAMBDA_READ_TIMEOUT", 15 * 60 + 5)
 
 PARE_ATOMIC_DEPLOYMENT_HEADER: str = env.str(
     "PARE_ATOMIC_DEPLOYMENT_HEADER", "X-Pare-Atomic-Deployment"
 )
 PARE_API_KEY_HEADER: str = env.str("PARE_API_KEY_HEADER", "X-Pare-API-Key")
+PARE_CONTENT_ENCODING_HEADER: str = env.str(
+    "PARE_CONTENT_ENCODING_HEADER", "X-Pare-Content-Encoding"
+)
+PARE_ACCEPT_ENCODING_HEADER: str = env.str(
+    "PARE_ACCEPT_ENCODING_HEADER", "X-Pare-Accept-Encoding"
+)
+PARE_COMPRESSION_THRESHOLD: int = env.int("PARE_COMPRESSION_THRESHOLD", 64 * 1024)
+# Largest request body, once decompressed; Lambda rejects larger payloads anyway
+PARE_MAX_PAYLOAD_SIZE: int = env.int("PARE_MAX_PAYLOAD_SIZE", 6 * 1024 * 1024)
+# Bytes of an invocation result read from Lambda at a time, while relaying it
+PARE_RESULT_CHUNK_SIZE: int = env.int("PARE_RESULT_CHUNK_SIZE", 64 * 1024)
+# Milliseconds the caller will still wait for an invocation
+PARE_DEADLINE_HEADER: str = env.str("PARE_DEADLINE_HEADER", "X-Pare-Deadline-Ms")
+
+# Invocations of a batch in flight at once, and the most invocations in a batch
+PARE_BATCH_CONCURRENCY: int = env.int("PARE_BATCH_CONCURRENCY", 32)
+PARE_BATCH_MAX_ITEMS: int = env.int("PARE_BATCH_MAX_ITEMS", 1000)
+PARE_BATCH_MAX_PAYLOAD_SIZE: int = env.int(
+    "PARE_BATCH_MAX_PAYLOAD_SIZE", 64 * 1024 * 1024
+)
+
+# Where results of submitted invocations are kept, e.g. "s3://bucket/jobs/" or "file:///tmp/pare-jobs"
+PARE_JOB_STORE_URL: str = env.str("PARE_JOB_STORE_URL", "")
+PARE_JOB_RESULT_URL_EXPIRY: int = env.int("PARE_JOB_RESULT_URL_EXPIRY", 60 * 60)
+
+# Deploys, deletes and blocks are published here, so every API worker drops stale
+# entries at once rather than when they expire, e.g. "redis://localhost:6379/0"
+PARE_RESOLUTION_CACHE_REDIS_URL: str = env.str("PARE_RESOLUTION_CACHE_REDIS_URL", "")
+# Invokes remember which function an API key, service and version resolve to,
+# instead of looking it up in the database; a TTL of 0 disables the cache.
+# Without Redis, other workers (and scripts/block_user.py) can't invalidate a
+# worker's entries, so it would keep serving blocked users, deleted services and
+# replaced deployments until they expire; the cache is off unless a TTL is set.
+PARE_RESOLUTION_CACHE_TTL: float = env.float(
+    "PARE_RESOLUTION_CACHE_TTL", 30.0 if PARE_RESOLUTION_CACHE_REDIS_URL else 0.0
+)
+PARE_RESOLUTION_CACHE_SIZE: int = env.int("PARE_RESOLUTION_CACHE_SIZE", 10_000)
+PARE_RESOLUTION_CACHE_CHANNEL: str = env.str(
+    "PARE_RESOLUTION_CACHE_CHANNEL", "pare:resolution-invalidations"
+)
 
 
 MAX_DEPLOYS_PER_USER: int = env.int("MAX_DEPLOYS_PER_USER", 50)
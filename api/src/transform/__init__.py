@@ -1,5 +1,18 @@
 from __future__ import annotations
 
-from src.transform.build_lambda_handler import build_lambda_handler
+# Shared with `pare serve`, so the emulator runs the same handler as deployed images
+from pare.handler import (
+    ENTRYPOINT_FILENAME,
+    RUNTIME_CHECK,
+    RUNTIME_MARKER_FILENAME,
+    build_lambda_entrypoint,
+    build_lambda_handler,
+)
 
-__all__ = ["build_lambda_handler"]
+__all__ = [
+    "ENTRYPOINT_FILENAME",
+    "RUNTIME_CHECK",
+    "RUNTIME_MARKER_FILENAME",
+    "build_lambda_entrypoint",
+    "build_lambda_handler",
+]
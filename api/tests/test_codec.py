@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+from src.core.codec import (
+    EVENT_ACCEPT_ENCODING_KEY,
+    EVENT_DEADLINE_KEY,
+    build_lambda_payload,
+)
+
+
+@pytest.mark.parametrize("body", [b'{"args": [1]}', b"{}", b' { "args": [] } \n'])
+def test_json_bodies_get_event_fields(body: bytes):
+    payload = build_lambda_payload(
+        body, "application/json", ["zstd"], {EVENT_DEADLINE_KEY: 500}
+    )
+    event = json.loads(payload)
+    assert event[EVENT_DEADLINE_KEY] == 500
+    assert event[EVENT_ACCEPT_ENCODING_KEY] == "zstd"
+    assert {key: event[key] for key in json.loads(body)} == json.loads(body)
+
+
+def test_event_fields_override_the_body():
+    body = json.dumps({"args": [], EVENT_DEADLINE_KEY: 10**9}).encode()
+    payload = build_lambda_payload(
+        body, "application/json", [], {EVENT_DEADLINE_KEY: 500}
+    )
+    assert json.loads(payload)[EVENT_DEADLINE_KEY] == 500
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import pytest
+from src.core.compression import (
+    GZIP,
+    IDENTITY,
+    ZSTD,
+    PayloadTooLargeError,
+    compress,
+    decompress,
+    decompress_chunks,
+)
+
+LIMIT = 6 * 1024 * 1024
+
+
+@pytest.mark.parametrize("encoding", [GZIP, ZSTD, IDENTITY])
+def test_roundtrip_within_limit(encoding: str):
+    data = b"pare" * 1024
+    compressed = compress(data, encoding)
+    assert decompress(compressed, encoding, LIMIT) == data
+    chunks = [compressed[i : i + 100] for i in range(0, len(compressed), 100)]
+    assert b"".join(decompress_chunks(chunks, encoding, LIMIT)) == data
+
+
+@pytest.mark.parametrize("encoding", [GZIP, ZSTD])
+def test_decompression_bombs_are_rejected(encoding: str):
+    bomb = compress(b"\x00" * (8 * LIMIT), encoding)
+    assert len(bomb) < LIMIT // 64
+    with pytest.raises(PayloadTooLargeError):
+        decompress(bomb, encoding, LIMIT)
+    chunks = decompress_chunks([bomb], encoding, LIMIT)
+    with pytest.raises(PayloadTooLargeError):
+        for chunk in chunks:
+            assert len(chunk) <= LIMIT
@@ -0,0 +1,78 @@
+"""Measure how long `import pare` takes, using `python -X importtime`.
+
+    python benchmarks/import_time.py [--module pare] [--top 15] [--max-ms 150]
+
+Prints the slowest imports and the total, and exits with status 1 when the total
+exceeds `--max-ms`, so it can guard against import time regressions in CI.
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from typing import NamedTuple
+
+# Modules which `import pare` and deployed handlers must not load eagerly
+HEAVY_MODULES = (
+    "aiohttp",
+    "asyncio",
+    "environs",
+    "marshmallow",
+    "multiprocessing",
+    "pydantic",
+    "requests",
+    "rich",
+)
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def measure(statement: str) -> list[ImportTime]:
+    """Run `statement` in a fresh interpreter, returning the time of every import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: list[ImportTime] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        times.append(ImportTime(module.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def heavy_imports(times: list[ImportTime]) -> list[str]:
+    return sorted(
+        {time.module for time in times if time.module.split(".")[0] in HEAVY_MODULES}
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="pare")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    times = measure(f"import {args.module}")
+    total = next(time for time in times if time.module == args.module)
+    for time in sorted(times, key=lambda time: time.self_us, reverse=True)[: args.top]:
+        print(f"{time.self_us / 1000:8.1f} ms  {time.module}")
+    print(f"{total.cumulative_us / 1000:8.1f} ms  total for 'import {args.module}'")
+    heavy = heavy_imports(times)
+    if heavy:
+        print(f"Heavy modules imported: {', '.join(heavy)}")
+    if args.max_ms is not None and total.cumulative_us / 1000 > args.max_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""Measure the throughput and latency of `invoke` and `invoke_async` against a local stub.
+
+    python benchmarks/invoke.py [--sizes 1KB,64KB,1MB,5MB] [--concurrency 1,8,32]
+        [--codecs json,msgpack] [--compression none,gzip,zstd] [--modes invoke,invoke_async]
+        [--requests 200] [--output results.json] [--compare baseline.json]
+
+The stub runs in a separate process and answers invocations the way the Pare API
+and a deployed function would, so the numbers cover the SDK's encoding, transport
+and decoding without any network or Lambda time. Every combination of the options
+is measured, and the results are saved as JSON, which `--compare` diffs against.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import pare
+from pare import settings
+from pare.cli.serve import (
+    LocalAPIRequestHandler,
+    build_lambda_payload,
+    json_response,
+    lambda_result_response,
+)
+from pare.client import get_client
+from pare.errors import PareError
+from pare.sdk.compression import available_encodings
+
+if TYPE_CHECKING:
+    from email.message import Message
+
+    from pare.cli.serve import Response
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SIZE_UNITS = {"KB": 1024, "MB": 1024 * 1024, "B": 1}
+# Fewer requests are made with large payloads, so that each case takes similar time
+MIN_REQUESTS = 10
+REUSE_PORT = hasattr(socket, "SO_REUSEPORT")
+
+
+@pare.endpoint(name="echo")
+def echo(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return records
+
+
+class StubAPI:
+    """Answers invocations of `echo` in-process, as the Pare API and its function would."""
+
+    def __init__(self) -> None:
+        self.invoke_path = (
+            f"/{settings.PARE_API_VERSION}{settings.PARE_API_INVOKE_URL_PATH}echo/"
+        )
+        self.handler = echo.as_lambda_function_url_handler()
+
+    def handle(self, method: str, path: str, headers: Message, body: bytes) -> Response:
+        if method != "POST" or path != self.invoke_path:
+            return json_response({"detail": "Not Found"}, status=404)
+        payload = build_lambda_payload(body, headers)
+        started = time.monotonic()
+        # Serialized on both sides, like the Lambda runtime
+        result = json.dumps(self.handler(json.loads(payload), None)).encode()
+        return lambda_result_response(result, headers, time.monotonic() - started)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int) -> None:
+        super().__init__(("127.0.0.1", port), LocalAPIRequestHandler)
+        self.api = StubAPI()
+
+    def server_bind(self) -> None:
+        if REUSE_PORT:
+            # Lets several stub processes share the port, so the stub keeps up with the SDK
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def start_stub(processes: int) -> tuple[list[subprocess.Popen[str]], str]:
+    """Start the stub processes, returning them and the URL they serve."""
+    started: list[subprocess.Popen[str]] = []
+    port = 0
+    for _ in range(processes if REUSE_PORT else 1):
+        process = subprocess.Popen(
+            [sys.executable, __file__, "--serve", str(port)],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        # Printed once the process is listening
+        port = int(process.stdout.readline())  # type: ignore
+        started.append(process)
+    return started, f"http://127.0.0.1:{port}"
+
+
+def parse_size(size: str) -> int:
+    size = size.strip().upper()
+    for unit, multiplier in SIZE_UNITS.items():
+        if size.endswith(unit):
+            return int(float(size[: -len(unit)]) * multiplier)
+    return int(size)
+
+
+def format_size(size: int) -> str:
+    for unit, multiplier in SIZE_UNITS.items():
+        if size >= multiplier and size % multiplier == 0:
+            return f"{size // multiplier}{unit}"
+    return f"{size}B"
+
+
+def make_payload(size: int) -> list[dict[str, Any]]:
+    """Records which take up about `size` bytes as JSON, like typical tabular data."""
+    rng = random.Random(0)
+
+    def record(i: int) -> dict[str, Any]:
+        return {"id": i, "name": f"item-{i}", "score": round(rng.random(), 6)}
+
+    count = max(1, size // len(json.dumps(record(0))))
+    return [record(i) for i in range(count)]
+
+
+class Case(NamedTuple):
+    mode: str
+    size: int
+    concurrency: int
+    codec: str
+    compression: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.mode} {format_size(self.size)} c={self.concurrency} {self.codec}/{self.compression}"
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_sync(payload: Any, requests: int, concurrency: int) -> tuple[list[float], int]:
+    def call(_: int) -> float | None:
+        started = time.perf_counter()
+        try:
+            echo.invoke(payload)
+        except PareError:
+            return None
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        # Open the pooled connections before measuring
+        list(executor.map(call, range(concurrency)))
+        outcomes = list(executor.map(call, range(requests)))
+    latencies = [latency for latency in outcomes if latency is not None]
+    return latencies, len(outcomes) - len(latencies)
+
+
+async def run_async(
+    payload: Any, requests: int, concurrency: int
+) -> tuple[list[float], int]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call() -> float | None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await echo.invoke_async(payload)
+            except PareError:
+                return None
+            return time.perf_counter() - started
+
+    try:
+        await asyncio.gather(*(call() for _ in range(concurrency)))
+        outcomes = await asyncio.gather(*(call() for _ in range(requests)))
+    finally:
+        await get_client().aclose()
+    latencies = [latency for latency in outcomes if latency is not None]
+    return latencies, len(outcomes) - len(latencies)
+
+
+def run_case(case: Case, payload: Any, requests: int) -> dict[str, Any]:
+    settings.PARE_CODEC = case.codec
+    settings.PARE_COMPRESSION = "" if case.compression == "none" else case.compression
+    started = time.perf_counter()
+    if case.mode == "invoke":
+        latencies, errors = run_sync(payload, requests, case.concurrency)
+    else:
+        latencies, errors = asyncio.run(run_async(payload, requests, case.concurrency))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    result: dict[str, Any] = {**case._asdict(), "requests": requests, "errors": errors}
+    if latencies:
+        result.update(
+            throughput_rps=round(len(latencies) / elapsed, 2),
+            p50_ms=round(percentile(latencies, 0.5) * 1000, 3),
+            p99_ms=round(percentile(latencies, 0.99) * 1000, 3),
+            mean_ms=round(sum(latencies) / len(latencies) * 1000, 3),
+        )
+    return result
+
+
+def environment() -> dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def print_result(result: dict[str, Any], baseline: dict[str, Any] | None) -> None:
+    line = f"{Case(*(result[name] for name in Case._fields)).key:<44}"
+    if "throughput_rps" not in result:
+        print(f"{line} all {result['errors']} requests failed")
+        return
+    line += f" {result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms"
+    if result["errors"]:
+        line += f"  ({result['errors']} errors)"
+    if baseline and "throughput_rps" in baseline:
+        line += f"  [throughput {result['throughput_rps'] / baseline['throughput_rps'] - 1:+.0%}, p50 {result['p50_ms'] / baseline['p50_ms'] - 1:+.0%}]"
+    print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1KB,64KB,1MB,5MB")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--codecs", default="json,msgpack")
+    parser.add_argument("--compression", default="none,gzip,zstd")
+    parser.add_argument("--modes", default="invoke,invoke_async")
+    parser.add_argument(
+        "--requests", type=int, default=200, help="Requests per case, at most."
+    )
+    parser.add_argument(
+        "--budget-mb",
+        type=float,
+        default=256,
+        help="Limits the requests of a case to about this much payload.",
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    parser.add_argument(
+        "--stub-processes",
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help="Processes serving the stub, where the platform supports SO_REUSEPORT.",
+    )
+    parser.add_argument("--serve", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        server = StubServer(args.serve)
+        print(server.server_address[1], flush=True)
+        server.serve_forever()
+        return
+
+    compressions = [
+        compression
+        for compression in args.compression.split(",")
+        if compression == "none" or compression in available_encodings()
+    ]
+    concurrencies = [int(concurrency) for concurrency in args.concurrency.split(",")]
+    cases = [
+        Case(*values)
+        for values in itertools.product(
+            args.modes.split(","),
+            [parse_size(size) for size in args.sizes.split(",")],
+            concurrencies,
+            args.codecs.split(","),
+            compressions,
+        )
+    ]
+    baseline: dict[str, dict[str, Any]] = {}
+    if args.compare:
+        for result in json.loads(args.compare.read_text())["results"]:
+            baseline[Case(*(result[name] for name in Case._fields)).key] = result
+
+    processes, url = start_stub(args.stub_processes)
+    settings.PARE_API_URL = url
+    # Enough pooled connections for the most concurrent case
+    get_client().pool_size = max(concurrencies)
+    results: list[dict[str, Any]] = []
+    payloads: dict[int, Any] = {}
+    try:
+        for case in cases:
+            if case.size not in payloads:
+                payloads[case.size] = make_payload(case.size)
+            requests = max(
+                MIN_REQUESTS,
+                min(args.requests, int(args.budget_mb * 1024 * 1024 / case.size)),
+            )
+            result = run_case(case, payloads[case.size], requests)
+            print_result(result, baseline.get(case.key))
+            results.append(result)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    output = args.output or RESULTS_DIR / (
+        f"invoke-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps({"environment": environment(), "results": results}, indent=2)
+    )
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,42 @@
 from __future__ import annotations
 
+from pare.sdk.backends import Backend, LambdaBackend, LocalBackend, RemoteBackend
+from pare.sdk.batch import BatchPolicy
+from pare.sdk.cache import CachePolicy
+from pare.sdk.circuit import CircuitBreakerPolicy
+from pare.sdk.deadline import deadline, remaining_time
+from pare.sdk.futures import as_completed, wait
 from pare.sdk.main import endpoint
+from pare.sdk.metrics import (
+    CallbackHook,
+    MetricsHook,
+    MetricsRegistry,
+    OpenTelemetryHook,
+    add_hook,
+    remove_hook,
+)
+from pare.sdk.offload import OffloadPolicy
+from pare.sdk.retry import RetryPolicy
 
-__all__ = ["endpoint"]
+__all__ = [
+    "endpoint",
+    "add_hook",
+    "as_completed",
+    "deadline",
+    "remaining_time",
+    "remove_hook",
+    "wait",
+    "Backend",
+    "BatchPolicy",
+    "CachePolicy",
+    "CallbackHook",
+    "CircuitBreakerPolicy",
+    "LambdaBackend",
+    "LocalBackend",
+    "MetricsHook",
+    "MetricsRegistry",
+    "OffloadPolicy",
+    "OpenTelemetryHook",
+    "RemoteBackend",
+    "RetryPolicy",
+]
@@ -5,6 +5,7 @@ import sys
 import requests
 
 from pare import settings
+from pare.client import get_client
 from pare.console import log_error
 
 
@@ -13,9 +14,10 @@ def delete_function(function_name: str, git_hash: str) -> None:
     if git_hash:
         headers[settings.PARE_ATOMIC_DEPLOYMENT_HEADER] = git_hash
 
+    client = get_client()
     try:
-        response = requests.delete(
-            f"{settings.PARE_API_URL}/{settings.PARE_API_VERSION}{settings.PARE_API_DELETE_URL_PATH}{function_name}/",
+        response = client.session.delete(
+            client.url(f"{settings.PARE_API_DELETE_URL_PATH}{function_name}/"),
             headers=headers,
         )
         response.raise_for_status()
@@ -10,11 +10,10 @@ import zipfile
 from pathlib import Path
 from typing import cast
 
-import requests
 from rich.console import Console
 
 from pare import settings
-from pare.client import get_current_git_hash
+from pare.client import get_client, get_current_git_hash
 from pare.console import log_error, log_task
 from pare.constants import PYTHON_VERSION
 from pare.models import DeployConfig, ServiceConfig, ServiceRegistration
@@ -38,7 +37,7 @@ class DeployHandler:
                     if path.endswith(".py")
                 )
         self.environment_variables = environment_variables or {}
-        self.deploy_url = f"{settings.PARE_API_URL}/{settings.PARE_API_VERSION}{settings.PARE_API_DEPLOY_URL_PATH}"
+        self.deploy_url = get_client().url(settings.PARE_API_DEPLOY_URL_PATH)
 
     @property
     def headers(self) -> dict[str, str]:
@@ -80,7 +79,7 @@ class DeployHandler:
                     "file": zip_file,
                     "json_data": (None, deploy_config.model_dump_json()),
                 }
-                resp = requests.post(
+                resp = get_client().session.post(
                     self.deploy_url,
                     headers=self.headers,
                     files=files,
@@ -113,6 +112,7 @@ class DeployHandler:
                                     name=service_registration.name,
                                     path=f"{module_name}:{service_registration.function}",
                                     requirements=service_registration.dependencies,
+                                    streaming=service_registration.streaming,
                                 )
                             )
                         except Exception as e:
@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import site
+import struct
+import subprocess
+import sys
+import threading
+import time
+import venv
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from pare.constants import PYTHON_VERSION
+from pare.handler import build_lambda_handler
+
+if TYPE_CHECKING:
+    from typing import IO
+
+# Runs in each worker process, like the Lambda runtime: import the handler once,
+# then answer length-prefixed events on stdin with results on stdout
+WORKER_SOURCE = """
+import json, os, struct, sys, traceback
+
+# Handlers may print, so the results go through a private copy of stdout
+channel = os.fdopen(os.dup(1), "wb")
+os.dup2(2, 1)
+sys.stdout = sys.stderr
+
+def send(ok, payload):
+    channel.write(struct.pack(">?I", ok, len(payload)) + payload)
+    channel.flush()
+
+def error(e):
+    return json.dumps({
+        "errorMessage": str(e),
+        "errorType": type(e).__name__,
+        "stackTrace": traceback.format_tb(e.__traceback__),
+    }).encode()
+
+try:
+    from lambda_function import lambda_handler
+except Exception as e:
+    send(False, error(e))
+    sys.exit(1)
+send(True, b"")
+
+while True:
+    header = sys.stdin.buffer.read(4)
+    if len(header) < 4:
+        break
+    event = json.loads(sys.stdin.buffer.read(struct.unpack(">I", header)[0]))
+    try:
+        send(True, json.dumps(lambda_handler(event, None)).encode())
+    except Exception as e:
+        send(False, error(e))
+"""
+
+# The directory containing the `pare` package, which functions import from the emulator's installation
+PARE_PATH = Path(__file__).resolve().parents[2]
+
+FUNCTION_CONFIG_FILENAME = "function.json"
+VIRTUALENV_COMPLETE_FILENAME = ".pare-complete"
+
+
+class FunctionError(Exception):
+    """The function failed; the message is the error payload Lambda would return."""
+
+
+class ThrottledError(Exception):
+    """A function is already running as many invocations as it is allowed to."""
+
+
+@dataclass(frozen=True)
+class LambdaLimits:
+    """How the emulator simulates the Lambda runtime.
+
+    Each function runs in at most `concurrency` worker processes, and further
+    invocations are throttled. Starting a worker is a cold start, delayed by
+    `cold_start_ms` on top of importing the handler. Workers stay warm for
+    `keep_warm` seconds after their last invocation.
+    """
+
+    concurrency: int = 10
+    cold_start_ms: float = 0.0
+    keep_warm: float = 300.0
+
+
+def _virtualenv_python(env_dir: Path) -> Path:
+    if os.name == "nt":
+        return env_dir / "Scripts" / "python.exe"
+    return env_dir / "bin" / "python"
+
+
+def build_virtualenv(env_dir: Path, requirements: list[str]) -> Path:
+    """Create a virtualenv with `requirements` installed, returning its interpreter."""
+    python = _virtualenv_python(env_dir)
+    if (env_dir / VIRTUALENV_COMPLETE_FILENAME).exists():
+        return python
+    venv.EnvBuilder(clear=True, symlinks=os.name != "nt").create(env_dir)
+    site_packages = subprocess.run(
+        [
+            str(python),
+            "-c",
+            "import sysconfig; print(sysconfig.get_paths()['purelib'])",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+    # Deployed images install `pare[codecs,compression]`; share the emulator's instead,
+    # after the function's own requirements so that those take precedence
+    shared_paths = [str(PARE_PATH), *site.getsitepackages()]
+    if site.ENABLE_USER_SITE:
+        shared_paths.append(site.getusersitepackages())
+    (Path(site_packages) / "pare-emulator.pth").write_text("\n".join(shared_paths))
+    if requirements:
+        try:
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "pip",
+                    "install",
+                    "--quiet",
+                    "--python",
+                    str(python),
+                    *requirements,
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(
+                f"Error installing dependencies. Error Output:\n{e.stderr}"
+            )
+    (env_dir / VIRTUALENV_COMPLETE_FILENAME).touch()
+    return python
+
+
+class Worker:
+    """A warm worker process, which runs one invocation at a time."""
+
+    def __init__(self, python: Path, function_dir: Path, env: dict[str, str]) -> None:
+        self.process = subprocess.Popen(
+            [str(python), "-c", WORKER_SOURCE],
+            cwd=function_dir,
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self.last_used = time.monotonic()
+        try:
+            # Sent once the handler has been imported
+            self._receive()
+        except FunctionError:
+            self.stop()
+            raise
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _receive(self) -> bytes:
+        stdout: IO[bytes] = self.process.stdout  # type: ignore
+        header = stdout.read(5)
+        if len(header) < 5:
+            raise FunctionError(
+                json.dumps(
+                    {
+                        "errorMessage": "Runtime exited unexpectedly",
+                        "errorType": "Runtime.ExitError",
+                    }
+                )
+            )
+        ok, size = struct.unpack(">?I", header)
+        payload = stdout.read(size)
+        if not ok:
+            raise FunctionError(payload.decode())
+        return payload
+
+    def invoke(self, payload: bytes) -> bytes:
+        stdin: IO[bytes] = self.process.stdin  # type: ignore
+        try:
+            stdin.write(struct.pack(">I", len(payload)) + payload)
+            stdin.flush()
+        except OSError:
+            pass  # the process has exited, which is reported below
+        return self._receive()
+
+    def stop(self) -> None:
+        if self.process.stdin is not None:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        if self.process.stdout is not None:
+            self.process.stdout.close()
+
+
+class FunctionPool:
+    """The worker processes of one deployed function."""
+
+    def __init__(
+        self,
+        name: str,
+        function_dir: Path,
+        python: Path,
+        environment: dict[str, str],
+        limits: LambdaLimits,
+    ) -> None:
+        self.name = name
+        self.function_dir = function_dir
+        self.python = python
+        self.environment = environment
+        self.limits = limits
+        self.cold_starts = 0
+        self._lock = threading.Lock()
+        self._idle: deque[Worker] = deque()
+        self._busy = 0
+        self._closed = False
+
+    def _start_worker(self) -> Worker:
+        time.sleep(self.limits.cold_start_ms / 1000)
+        env = {
+            **os.environ,
+            **self.environment,
+            "AWS_LAMBDA_FUNCTION_NAME": self.name,
+        }
+        return Worker(self.python, self.function_dir, env)
+
+    def _acquire(self) -> Worker:
+        with self._lock:
+            if self._busy >= self.limits.concurrency:
+                raise ThrottledError(
+                    f"Rate exceeded for '{self.name}' (concurrency: {self.limits.concurrency})"
+                )
+            self._busy += 1
+            if self._idle:
+                # The most recently used worker, which is the warmest
+                return self._idle.pop()
+            self.cold_starts += 1
+        try:
+            return self._start_worker()
+        except BaseException:
+            with self._lock:
+                self._busy -= 1
+            raise
+
+    def _release(self, worker: Worker) -> None:
+        with self._lock:
+            self._busy -= 1
+            if worker.alive and not self._closed:
+                worker.last_used = time.monotonic()
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+    def invoke(self, payload: bytes) -> bytes:
+        worker = self._acquire()
+        try:
+            return worker.invoke(payload)
+        finally:
+            self._release(worker)
+
+    def reap(self) -> None:
+        """Stop workers that have been idle for longer than `keep_warm`."""
+        expired = time.monotonic() - self.limits.keep_warm
+        with self._lock:
+            stale = [worker for worker in self._idle if worker.last_used < expired]
+            for worker in stale:
+                self._idle.remove(worker)
+        for worker in stale:
+            worker.stop()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, deque()
+        for worker in idle:
+            worker.stop()
+
+
+class LambdaEmulator:
+    """Builds deployed bundles into local virtualenvs and runs their handlers.
+
+    Each function gets its own copy of the bundle and a generated handler, like
+    a deployed image. Virtualenvs are shared by functions with the same
+    requirements. Everything is kept under `state_dir`, so that functions are
+    restored when the emulator restarts.
+    """
+
+    def __init__(self, state_dir: Path, limits: LambdaLimits | None = None) -> None:
+        self.state_dir = state_dir
+        self.limits = limits or LambdaLimits()
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._functions: dict[str, FunctionPool] = {}
+        for config_path in sorted(
+            (state_dir / "functions").glob(f"*/{FUNCTION_CONFIG_FILENAME}")
+        ):
+            config = json.loads(config_path.read_text())
+            self._register(config_path.parent, config)
+
+    def _function_dir(self, function_name: str) -> Path:
+        return self.state_dir / "functions" / function_name
+
+    def _register(self, function_dir: Path, config: dict[str, Any]) -> None:
+        requirements: list[str] = config["requirements"]
+        key = hashlib.sha256(
+            "\n".join([PYTHON_VERSION, *sorted(requirements)]).encode()
+        ).hexdigest()[:16]
+        with self._build_lock:
+            python = build_virtualenv(self.state_dir / "venvs" / key, requirements)
+        pool = FunctionPool(
+            function_dir.name,
+            function_dir,
+            python,
+            config["environment"],
+            self.limits,
+        )
+        with self._lock:
+            previous = self._functions.get(pool.name)
+            self._functions[pool.name] = pool
+        if previous is not None:
+            previous.close()
+
+    def deploy(
+        self,
+        function_name: str,
+        bundle_dir: Path,
+        symbol_path: str,
+        requirements: list[str],
+        environment: dict[str, str],
+    ) -> None:
+        function_dir = self._function_dir(function_name)
+        self.delete(function_name)
+        shutil.copytree(bundle_dir, function_dir)
+        config = {"requirements": requirements, "environment": environment}
+        try:
+            build_lambda_handler(symbol_path, function_dir / "lambda_function.py")
+            self._register(function_dir, config)
+        except Exception:
+            shutil.rmtree(function_dir, ignore_errors=True)
+            raise
+        (function_dir / FUNCTION_CONFIG_FILENAME).write_text(json.dumps(config))
+
+    def delete(self, function_name: str) -> None:
+        with self._lock:
+            pool = self._functions.pop(function_name, None)
+        if pool is not None:
+            pool.close()
+        shutil.rmtree(self._function_dir(function_name), ignore_errors=True)
+
+    def get(self, function_name: str) -> FunctionPool | None:
+        with self._lock:
+            return self._functions.get(function_name)
+
+    def invoke(self, function_name: str, payload: bytes) -> bytes:
+        pool = self.get(function_name)
+        if pool is None:
+            raise KeyError(function_name)
+        return pool.invoke(payload)
+
+    def reap(self) -> None:
+        with self._lock:
+            pools = list(self._functions.values())
+        for pool in pools:
+            pool.reap()
+
+    def close(self) -> None:
+        with self._lock:
+            pools, self._functions = list(self._functions.values()), {}
+        for pool in pools:
+            pool.close()
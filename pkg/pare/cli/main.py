@@ -3,18 +3,13 @@ from __future__ import annotations
 import argparse
 import sys
 
-from rich.console import Console
-
 from pare import settings
-from pare.cli.delete import delete_function
-from pare.cli.deploy import DeployHandler
-from pare.cli.status import show_status
-from pare.login import login
+from pare.console import get_console
 
 
 def verify_logged_in() -> None:
     if not settings.PARE_API_KEY:
-        console = Console()
+        console = get_console()
         console.print(
             "[bold red]Error:[/bold red] Pare API key not found. Try 'pare login' first."
         )
@@ -32,7 +27,12 @@ def parse_env_vars(env_vars: list[str]) -> dict[str, str]:
     return environment_variables
 
 
+# Commands import what they need when they run, so the CLI starts quickly
+
+
 def deploy(file_patterns: list[str], env_vars: list[str]) -> None:
+    from pare.cli.deploy import DeployHandler
+
     verify_logged_in()
     environment_variables = parse_env_vars(env_vars)
     DeployHandler(
@@ -41,8 +41,10 @@ def deploy(file_patterns: list[str], env_vars: list[str]) -> None:
 
 
 def delete(function_name: str, git_hash: str = "", force: bool = False) -> None:
+    from pare.cli.delete import delete_function
+
     verify_logged_in()
-    console = Console()
+    console = get_console()
     if not force and (
         console.input(
             f"You are about to delete your deployed function called [bold red]'{function_name}'[/bold red]. "
@@ -63,10 +65,35 @@ def delete(function_name: str, git_hash: str = "", force: bool = False) -> None:
 
 
 def status() -> None:
+    from pare.cli.status import show_status
+
     verify_logged_in()
     show_status()
 
 
+def serve(
+    host: str,
+    port: int,
+    state_dir: str,
+    concurrency: int,
+    cold_start_ms: float,
+    keep_warm: float,
+) -> None:
+    from pathlib import Path
+
+    from pare.cli.emulator import LambdaLimits
+    from pare.cli.serve import serve
+
+    serve(
+        host,
+        port,
+        state_dir=Path(state_dir),
+        limits=LambdaLimits(
+            concurrency=concurrency, cold_start_ms=cold_start_ms, keep_warm=keep_warm
+        ),
+    )
+
+
 def create_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="A CLI tool to deploy python lambdas with a single command"
@@ -111,6 +138,38 @@ def create_parser() -> argparse.ArgumentParser:
         help="Skip the confirmation prompt and delete the function.",
     )
 
+    parser_serve = subparsers.add_parser(
+        "serve",
+        help="Run the Pare API locally, with functions in local worker processes.",
+    )
+    parser_serve.add_argument("--host", default="127.0.0.1", help="The host to bind.")
+    parser_serve.add_argument(
+        "-p", "--port", type=int, default=8000, help="The port to listen on."
+    )
+    parser_serve.add_argument(
+        "--state-dir",
+        default=".pare/serve",
+        help="Where deployed functions and their virtualenvs are kept.",
+    )
+    parser_serve.add_argument(
+        "--concurrency",
+        type=int,
+        default=10,
+        help="The most concurrent invocations per function; further ones are throttled.",
+    )
+    parser_serve.add_argument(
+        "--cold-start-ms",
+        type=float,
+        default=0.0,
+        help="Extra delay when a function starts a new worker process.",
+    )
+    parser_serve.add_argument(
+        "--keep-warm",
+        type=float,
+        default=300.0,
+        help="Seconds that idle worker processes are kept before being stopped.",
+    )
+
     return parser
 
 
@@ -123,7 +182,18 @@ def main() -> None:
         status()
     elif args.command == "delete":
         delete(args.function_name, git_hash=args.git_hash, force=args.force)
+    elif args.command == "serve":
+        serve(
+            args.host,
+            args.port,
+            state_dir=args.state_dir,
+            concurrency=args.concurrency,
+            cold_start_ms=args.cold_start_ms,
+            keep_warm=args.keep_warm,
+        )
     elif args.command == "login":
+        from pare.login import login
+
         login()
     else:
         print("Unknown command")
@@ -0,0 +1,418 @@
+from __future__ import annotations
+
+import base64
+import json
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+from urllib.parse import urlsplit
+from zipfile import BadZipFile, ZipFile
+
+from pare import settings
+from pare.cli.emulator import FunctionError, LambdaEmulator, ThrottledError
+from pare.console import get_console, log_error
+from pare.models import DeployConfig
+from pare.sdk.codec import (
+    EVENT_ACCEPT_ENCODING_KEY,
+    EVENT_BLOB_KEY,
+    EVENT_BODY_KEY,
+    EVENT_CODEC_KEY,
+    EVENT_ENCODING_KEY,
+    JSON_CONTENT_TYPE,
+    MSGPACK_CONTENT_TYPE,
+)
+from pare.sdk.compression import IDENTITY, compress, decompress, parse_accept_encoding
+from pare.sdk.deadline import EVENT_DEADLINE_KEY
+from pare.sdk.streaming import NDJSON_CONTENT_TYPE
+
+if TYPE_CHECKING:
+    from email.message import Message
+
+    from pare.cli.emulator import LambdaLimits
+
+SERVICES_FILENAME = "services.json"
+
+CODEC_CONTENT_TYPES = {
+    "json": JSON_CONTENT_TYPE,
+    "msgpack": MSGPACK_CONTENT_TYPE,
+}
+CONTENT_TYPE_CODECS = {
+    content_type: codec for codec, content_type in CODEC_CONTENT_TYPES.items()
+}
+RESULT_CONTENT_TYPES = {**CODEC_CONTENT_TYPES, "ndjson": NDJSON_CONTENT_TYPE}
+
+_ENVELOPE_PREFIX = b'{"' + EVENT_CODEC_KEY.encode()
+
+
+class APIError(Exception):
+    def __init__(self, status: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+@dataclass
+class Response:
+    content: bytes
+    status: int = 200
+    media_type: str = JSON_CONTENT_TYPE
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+def json_response(content: Any, status: int = 200) -> Response:
+    return Response(json.dumps(content).encode(), status=status)
+
+
+def parse_form(body: bytes, content_type: str) -> dict[str, bytes]:
+    """The fields of a multipart/form-data request body."""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    fields: dict[str, bytes] = {}
+    for part in message.walk():
+        name = part.get_param("name", header="content-disposition")
+        if isinstance(name, str):
+            fields[name] = part.get_payload(decode=True)  # type: ignore
+    return fields
+
+
+def build_lambda_payload(body: bytes, headers: Message) -> bytes:
+    """Turn an SDK request body into a Lambda event payload, as the Pare API does."""
+    try:
+        body = decompress(
+            body, headers.get(settings.PARE_CONTENT_ENCODING_HEADER, IDENTITY)
+        )
+    except Exception as e:
+        raise APIError(400, f"Could not decompress request body: {e}")
+    content_type = headers.get("Content-Type")
+    codec = CONTENT_TYPE_CODECS.get(
+        (content_type or JSON_CONTENT_TYPE).split(";")[0].strip().lower()
+    )
+    if codec is None:
+        raise APIError(415, f"Unsupported content type: '{content_type}'")
+
+    fields: dict[str, Any] = {}
+    accept_encoding = parse_accept_encoding(
+        headers.get(settings.PARE_ACCEPT_ENCODING_HEADER)
+    )
+    if accept_encoding:
+        fields[EVENT_ACCEPT_ENCODING_KEY] = ",".join(accept_encoding)
+    deadline = headers.get(settings.PARE_DEADLINE_HEADER)
+    if deadline is not None:
+        try:
+            milliseconds = int(deadline)
+        except ValueError:
+            raise APIError(400, f"Invalid {settings.PARE_DEADLINE_HEADER} header")
+        if milliseconds <= 0:
+            raise APIError(504, "Deadline exceeded before invoking the function")
+        fields[EVENT_DEADLINE_KEY] = milliseconds
+
+    if codec == "json":
+        if not fields:
+            return body
+        event = json.loads(body)
+        if isinstance(event, dict):
+            event.update(fields)
+        return json.dumps(event).encode()
+    return json.dumps(
+        {
+            EVENT_CODEC_KEY: codec,
+            **fields,
+            EVENT_BODY_KEY: base64.b64encode(body).decode("ascii"),
+        }
+    ).encode()
+
+
+def lambda_result_response(
+    payload: bytes, headers: Message, lambda_duration: float
+) -> Response:
+    """Pass a Lambda result through to the client, as the Pare API does."""
+    body, media_type, encoding = payload, JSON_CONTENT_TYPE, IDENTITY
+    if payload.startswith(_ENVELOPE_PREFIX):
+        envelope = json.loads(payload)
+        if EVENT_BLOB_KEY not in envelope:
+            body = base64.b64decode(envelope[EVENT_BODY_KEY])
+            media_type = RESULT_CONTENT_TYPES[envelope[EVENT_CODEC_KEY]]
+            encoding = envelope.get(EVENT_ENCODING_KEY, IDENTITY)
+
+    accept_encoding = parse_accept_encoding(
+        headers.get(settings.PARE_ACCEPT_ENCODING_HEADER)
+    )
+    if encoding == IDENTITY:
+        if accept_encoding and len(body) >= settings.PARE_COMPRESSION_THRESHOLD:
+            body, encoding = compress(body, accept_encoding[0]), accept_encoding[0]
+    elif encoding not in accept_encoding:
+        body, encoding = decompress(body, encoding), IDENTITY
+
+    response = Response(body, media_type=media_type)
+    if encoding != IDENTITY:
+        response.headers[settings.PARE_CONTENT_ENCODING_HEADER] = encoding
+    response.headers["Server-Timing"] = f"lambda;dur={lambda_duration * 1000:.1f}"
+    return response
+
+
+Route = Callable[..., Response]
+
+
+class LocalAPI:
+    """The routes of the Pare API that deploy, list, invoke and delete services.
+
+    Functions run in a `LambdaEmulator` instead of on AWS. Unlike the Pare API,
+    there is a single user, so the API key is not checked and functions are
+    named after just the service and its git hash.
+    """
+
+    def __init__(self, emulator: LambdaEmulator) -> None:
+        self.emulator = emulator
+        self._lock = threading.Lock()
+        self._services_path = emulator.state_dir / SERVICES_FILENAME
+        self.services: list[dict[str, Any]] = []
+        if self._services_path.exists():
+            self.services = json.loads(self._services_path.read_text())
+
+        prefix = f"/{settings.PARE_API_VERSION}"
+        name = "(?P<service_name>[^/]+)/"
+        self.routes: list[tuple[str, re.Pattern[str], Route]] = [
+            ("POST", re.compile(prefix + settings.PARE_API_DEPLOY_URL_PATH), self.deploy),
+            ("GET", re.compile(prefix + settings.PARE_API_SERVICES_URL_PATH), self.list_services),
+            ("GET", re.compile(prefix + settings.PARE_API_SERVICES_URL_PATH + name), self.get_service),
+            ("POST", re.compile(prefix + settings.PARE_API_INVOKE_URL_PATH + name), self.invoke),
+            ("DELETE", re.compile(prefix + settings.PARE_API_DELETE_URL_PATH + name), self.delete),
+        ]  # fmt: skip
+
+    def handle(self, method: str, path: str, headers: Message, body: bytes) -> Response:
+        for route_method, pattern, route in self.routes:
+            match = pattern.fullmatch(path)
+            if match and route_method == method:
+                try:
+                    return route(headers, body, **match.groupdict())
+                except APIError as e:
+                    return json_response({"detail": e.detail}, status=e.status)
+                except Exception as e:
+                    return json_response({"detail": str(e)}, status=500)
+        return json_response({"detail": "Not Found"}, status=404)
+
+    def _save(self) -> None:
+        self._services_path.parent.mkdir(parents=True, exist_ok=True)
+        self._services_path.write_text(json.dumps(self.services))
+
+    @staticmethod
+    def function_name(service: dict[str, Any]) -> str:
+        return f"{service['name']}_{service['deployment']['git_hash']}"
+
+    def _services_by_name(self, service_name: str) -> list[dict[str, Any]]:
+        with self._lock:
+            services = [
+                service for service in self.services if service["name"] == service_name
+            ]
+        if not services:
+            raise APIError(404, "No services found")
+        return services
+
+    def _service_for_version(
+        self, services: list[dict[str, Any]], deploy_version: str
+    ) -> dict[str, Any]:
+        for service in services:
+            if service["deployment"]["git_hash"] == deploy_version:
+                return service
+        raise APIError(404, "Service not found for deploy version")
+
+    def service_for_version_or_latest(
+        self, service_name: str, headers: Message
+    ) -> dict[str, Any]:
+        services = self._services_by_name(service_name)
+        deploy_version = headers.get(settings.PARE_ATOMIC_DEPLOYMENT_HEADER)
+        if deploy_version is None:
+            return services[-1]
+        return self._service_for_version(services, deploy_version)
+
+    def service_for_version_or_unique_name(
+        self, service_name: str, headers: Message
+    ) -> dict[str, Any]:
+        services = self._services_by_name(service_name)
+        if len(services) == 1:
+            return services[0]
+        deploy_version = headers.get(settings.PARE_ATOMIC_DEPLOYMENT_HEADER)
+        if deploy_version is None:
+            raise APIError(
+                400,
+                "Deploy version is required when more than one service exists for a name.",
+            )
+        return self._service_for_version(services, deploy_version)
+
+    def deploy(self, headers: Message, body: bytes) -> Response:
+        fields = parse_form(body, headers.get("Content-Type", ""))
+        try:
+            deploy_config = DeployConfig.model_validate_json(fields["json_data"])
+            deploy_config.git_hash = deploy_config.git_hash[:7]
+        except Exception:
+            raise APIError(422, "Couldn't process deployment data.")
+
+        succeeded: list[str] = []
+        failed: list[str] = []
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bundle_dir = Path(tmp_dir) / "unzipped_bundle"
+            bundle_dir.mkdir()
+            try:
+                with ZipFile(BytesIO(fields.get("file", b""))) as bundle:
+                    bundle.extractall(bundle_dir)
+            except BadZipFile:
+                return json_response(
+                    {"error": "The uploaded file is not a valid zip file"}, status=400
+                )
+
+            created_at = datetime.now(timezone.utc).isoformat()
+            for service_config in deploy_config.services:
+                service = {
+                    "name": service_config.name,
+                    "deployment": {
+                        "git_hash": deploy_config.git_hash,
+                        "created_at": created_at,
+                    },
+                    "created_at": created_at,
+                }
+                try:
+                    self.emulator.deploy(
+                        self.function_name(service),
+                        bundle_dir,
+                        service_config.path,
+                        service_config.requirements,
+                        deploy_config.environment_variables,
+                    )
+                except Exception as e:
+                    log_error(f"Failed to deploy '{service_config.name}': {e}")
+                    failed.append(service_config.name)
+                    continue
+                with self._lock:
+                    # Redeploying a version replaces it, and makes it the latest
+                    self.services = [
+                        existing
+                        for existing in self.services
+                        if self.function_name(existing) != self.function_name(service)
+                    ]
+                    self.services.append(service)
+                    self._save()
+                succeeded.append(service_config.name)
+
+        if failed:
+            return json_response(
+                {
+                    "succeeded": succeeded,
+                    "failed": failed,
+                    "message": "Some services failed to deploy",
+                },
+                status=500,
+            )
+        return json_response({"succeeded": succeeded, "failed": failed})
+
+    def list_services(self, headers: Message, body: bytes) -> Response:
+        with self._lock:
+            return json_response(self.services)
+
+    def get_service(self, headers: Message, body: bytes, service_name: str) -> Response:
+        return json_response(
+            self.service_for_version_or_unique_name(service_name, headers)
+        )
+
+    def invoke(self, headers: Message, body: bytes, service_name: str) -> Response:
+        service = self.service_for_version_or_latest(service_name, headers)
+        payload = build_lambda_payload(body, headers)
+        try:
+            started = time.monotonic()
+            result = self.emulator.invoke(self.function_name(service), payload)
+            lambda_duration = time.monotonic() - started
+        except KeyError:
+            raise APIError(404, f"Lambda function '{service_name}' not found")
+        except ThrottledError as e:
+            # Like Lambda's TooManyRequestsException; clients may retry
+            raise APIError(429, str(e))
+        except FunctionError as e:
+            raise APIError(502, str(e))
+        return lambda_result_response(result, headers, lambda_duration)
+
+    def delete(self, headers: Message, body: bytes, service_name: str) -> Response:
+        service = self.service_for_version_or_unique_name(service_name, headers)
+        self.emulator.delete(self.function_name(service))
+        with self._lock:
+            self.services.remove(service)
+            self._save()
+        return json_response(
+            {"message": f"Lambda function '{service_name}' deleted successfully"}
+        )
+
+
+class LocalAPIRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so that pooled SDK sessions reuse their connections
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, which Nagle's algorithm would delay
+    disable_nagle_algorithm = True
+    server: LocalAPIServer
+
+    def _dispatch(self, method: str) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        response = self.server.api.handle(
+            method, urlsplit(self.path).path, self.headers, body
+        )
+        self.send_response(response.status)
+        self.send_header("Content-Type", response.media_type)
+        self.send_header("Content-Length", str(len(response.content)))
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(response.content)
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Per-request logging would skew benchmarks against the emulator
+        pass
+
+
+class LocalAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, server_address: tuple[str, int], api: LocalAPI) -> None:
+        super().__init__(server_address, LocalAPIRequestHandler)
+        self.api = api
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def service_actions(self) -> None:
+        # Called between requests by `serve_forever`
+        self.api.emulator.reap()
+
+
+def serve(host: str, port: int, state_dir: Path, limits: LambdaLimits) -> None:
+    emulator = LambdaEmulator(state_dir, limits)
+    server = LocalAPIServer((host, port), LocalAPI(emulator))
+    console = get_console()
+    console.print(
+        f"[bold white]Serving the Pare API locally at {server.url}[/bold white]\n"
+        f"Set PARE_API_URL={server.url} to deploy and invoke functions against it."
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        emulator.close()
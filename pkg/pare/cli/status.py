@@ -3,20 +3,22 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any
 
-import requests
 from rich import box
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
 from pare import settings
+from pare.client import get_client
 
 
 def show_status():
-    list_url = f"{settings.PARE_API_URL}/{settings.PARE_API_VERSION}{settings.PARE_API_SERVICES_URL_PATH}"
+    client = get_client()
     headers = {settings.PARE_API_KEY_HEADER: settings.PARE_API_KEY}
     try:
-        response = requests.get(list_url, headers=headers)
+        response = client.session.get(
+            client.url(settings.PARE_API_SERVICES_URL_PATH), headers=headers
+        )
         response.raise_for_status()
         display_status_table(response.json())
     except Exception as e:
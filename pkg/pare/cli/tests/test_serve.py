@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+import pare
+from pare import endpoint, errors
+from pare.cli.deploy import DeployHandler
+from pare.cli.emulator import LambdaEmulator, LambdaLimits
+from pare.cli.serve import LocalAPI, LocalAPIServer
+from pare.client import get_current_git_hash
+
+SERVICE = """
+import time
+
+from pare import endpoint
+
+
+@endpoint(name="shout")
+def shout(text: str) -> str:
+    return text.upper()
+
+
+@endpoint(name="nap")
+def nap(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+"""
+
+
+# Stand-ins for the deployed functions, which are invoked by name
+@endpoint(name="shout")
+def shout(text: str) -> str: ...
+
+
+@endpoint(name="nap")
+def nap(seconds: float) -> float: ...
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    emulator = LambdaEmulator(
+        tmp_path_factory.mktemp("state"), LambdaLimits(concurrency=1)
+    )
+    server = LocalAPIServer(("127.0.0.1", 0), LocalAPI(emulator))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    project = tmp_path_factory.mktemp("project")
+    (project / "service.py").write_text(SERVICE)
+    with pytest.MonkeyPatch.context() as monkeypatch, patch(
+        "pare.settings.PARE_API_URL", server.url
+    ), patch("pare.settings.PARE_API_KEY", "local"), patch(
+        "pare.settings.PARE_GIT_HASH", "abc1234"
+    ):
+        monkeypatch.chdir(project)
+        get_current_git_hash.cache_clear()
+        DeployHandler(["service.py"]).deploy()
+        yield server
+    get_current_git_hash.cache_clear()
+    server.shutdown()
+    server.server_close()
+    emulator.close()
+
+
+def test_deploy_and_invoke(server):
+    assert [service["name"] for service in server.api.services] == ["nap", "shout"]
+    for codec in ("json", "msgpack"):
+        with patch("pare.settings.PARE_CODEC", codec):
+            assert shout.invoke("hi") == "HI"
+    with pare.deadline(5.0):
+        assert shout.invoke("hi") == "HI"
+    (service,) = (s for s in server.api.services if s["name"] == "shout")
+    # Later invocations reuse the warm worker
+    assert server.api.emulator.get(LocalAPI.function_name(service)).cold_starts == 1
+
+
+def test_throttles_beyond_concurrency(server):
+    with ThreadPoolExecutor(2) as executor:
+        futures = [executor.submit(nap.invoke, 0.5) for _ in range(2)]
+        outcomes = [future.exception() or future.result() for future in futures]
+    assert 0.5 in outcomes
+    (error,) = (outcome for outcome in outcomes if outcome != 0.5)
+    assert isinstance(error, errors.PareInvokeError)
+    assert error.status == 429
@@ -1,13 +1,21 @@
 from __future__ import annotations
 
+import atexit
 import subprocess
 import sys
+import threading
+import weakref
 from functools import lru_cache
+from typing import TYPE_CHECKING, AsyncIterator
 
 from pare import settings
 from pare.console import log_error, log_warning
 
-# TODO: build a Client singleton to handle all requests
+if TYPE_CHECKING:
+    import asyncio
+
+    import aiohttp
+    import requests
 
 
 @lru_cache(maxsize=1)
@@ -40,3 +48,107 @@ def get_client_headers() -> dict[str, str]:
     if settings.PARE_ATOMIC_DEPLOYMENT_ENABLED:
         headers[settings.PARE_ATOMIC_DEPLOYMENT_HEADER] = get_current_git_hash()
     return headers
+
+
+class PareClient:
+    """Process-wide HTTP client for the Pare API.
+
+    Holds a single pooled `requests.Session` shared by all threads, and one
+    `aiohttp.ClientSession` per running event loop, so that repeated calls
+    reuse keep-alive connections instead of paying for a new TCP+TLS handshake.
+    Async sessions are closed when `asyncio.run` shuts their loop down, or by
+    `aclose()` on other loops.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = settings.PARE_HTTP_POOL_SIZE,
+        keepalive_timeout: float = settings.PARE_HTTP_KEEPALIVE_TIMEOUT,
+    ) -> None:
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self._lock = threading.Lock()
+        self._session: requests.Session | None = None
+        # Each session is kept with the async generator that closes it
+        self._async_sessions: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop,
+            tuple[aiohttp.ClientSession, AsyncIterator[None]],
+        ] = weakref.WeakKeyDictionary()
+
+    def url(self, path: str) -> str:
+        return f"{settings.PARE_API_URL}/{settings.PARE_API_VERSION}{path}"
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    # HTTP libraries are imported on first use, keeping `import pare` fast
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=self.pool_size, pool_maxsize=self.pool_size
+                    )
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    @property
+    def async_session(self) -> aiohttp.ClientSession:
+        import asyncio
+
+        # aiohttp sessions are bound to the loop they were created on
+        loop = asyncio.get_running_loop()
+        entry = self._async_sessions.get(loop)
+        if entry is None or entry[0].closed:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size, keepalive_timeout=self.keepalive_timeout
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            closer = self._close_at_shutdown(loop, session)
+            self._async_sessions[loop] = (session, closer)
+            # Starting the generator registers it with the loop, which finalizes
+            # it, and so closes the session, before `asyncio.run` closes the loop
+            asyncio.ensure_future(closer.asend(None))
+            return session
+        return entry[0]
+
+    async def _close_at_shutdown(
+        self, loop: asyncio.AbstractEventLoop, session: aiohttp.ClientSession
+    ) -> AsyncIterator[None]:
+        try:
+            yield
+        finally:
+            entry = self._async_sessions.get(loop)
+            if entry is not None and entry[0] is session:
+                del self._async_sessions[loop]
+            await session.close()
+
+    async def aclose(self) -> None:
+        """Close the async session belonging to the running event loop."""
+        import asyncio
+
+        entry = self._async_sessions.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            session, closer = entry
+            await closer.aclose()  # type: ignore
+            # In case the closer had not started yet
+            await session.close()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+@lru_cache(maxsize=1)
+def get_client() -> PareClient:
+    client = PareClient()
+    atexit.register(client.close)
+    return client
@@ -4,15 +4,22 @@ from contextlib import contextmanager
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from rich.console import Console
-
 if TYPE_CHECKING:
     from collections.abc import Generator
 
+    from rich.console import Console
+
+
+def get_console() -> Console:
+    # rich is only imported once there is something to print
+    from rich.console import Console
+
+    return Console()
+
 
 @contextmanager
 def log_task(start_message: str, end_message: str = "") -> Generator[None, None, None]:
-    console = Console()
+    console = get_console()
     with console.status(
         f"      {start_message}", spinner="aesthetic", spinner_style="blue"
     ):
@@ -31,10 +38,10 @@ def log_task(start_message: str, end_message: str = "") -> Generator[None, None,
 
 
 def log_error(message: str) -> None:
-    console = Console()
+    console = get_console()
     console.print(f"[bright_red]✗ Error[/bright_red]: {message}")
 
 
 def log_warning(message: str) -> None:
-    console = Console()
+    console = get_console()
     console.print(f"[yellow] Warning[/yellow]: {message}")
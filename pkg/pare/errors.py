@@ -1,7 +1,54 @@
 from __future__ import annotations
 
+from typing import Any
+
 
 class PareError(Exception): ...
 
 
-class PareInvokeError(PareError): ...
+class PareInvokeError(PareError):
+    """Raised when a remote invocation fails.
+
+    `status` is the HTTP status of the failed call, when there was one.
+    """
+
+    def __init__(self, message: str, status: int | None = None) -> None:
+        self.status = status
+        super().__init__(message)
+
+
+class PareFunctionError(PareInvokeError):
+    """Raised when the remote function ran, but reported an error."""
+
+
+class PareDeadlineExceededError(PareInvokeError):
+    """Raised when an invocation's deadline passed before it could finish."""
+
+
+class PareCodecError(PareError): ...
+
+
+class PareCompressionError(PareError): ...
+
+
+class PareBlobError(PareError): ...
+
+
+class PareCircuitOpenError(PareError): ...
+
+
+class PareTimeoutError(PareError): ...
+
+
+class PareMapError(PareError):
+    """Raised after a map finishes when some inputs failed every attempt.
+
+    `failures` maps each failed input's position to the input and its last error.
+    """
+
+    def __init__(self, failures: dict[int, tuple[Any, BaseException]]) -> None:
+        self.failures = failures
+        super().__init__(
+            f"{len(failures)} input(s) failed: "
+            + ", ".join(str(index) for index in sorted(failures))
+        )
@@ -0,0 +1,72 @@
+"""The `lambda_function.py` module generated for each deployed endpoint.
+
+Used both by the Pare API when building images and by `pare serve`, so the
+emulator runs the same handler as Lambda.
+
+Images of streaming endpoints also get an entrypoint which starts Pare's own
+runtime (`pare.sdk.runtime`), which can stream responses. The `pare` installed
+in an image may predate it, so it is only used when a check at build time
+finds it; otherwise the base image's runtime (awslambdaric) starts as usual,
+and streams are sent whole.
+"""
+
+from __future__ import annotations
+
+from string import Template
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+HANDLER_TEMPLATE = Template(
+    """from ${mod_path} import ${target_symbol} as lambda_function
+
+try:
+    lambda_handler = lambda_function.as_lambda_function_url_handler()
+except Exception as e:
+    exception_msg = str(e)
+    def lambda_handler(evt, ctx):
+        full_path = "${mod_path}" + ":" + "${target_symbol}"
+        return {
+            "statusCode": 500,
+            "body": f"Lambda for '{full_path}' failed to start: {exception_msg}"
+        }
+"""
+)
+
+
+ENTRYPOINT_FILENAME = "pare-entrypoint.sh"
+# Created in the task root at build time when the installed pare has its runtime
+RUNTIME_MARKER_FILENAME = ".pare-runtime"
+
+# Run with the marker path in the image; must work with any installed version of pare
+RUNTIME_CHECK = (
+    "import importlib.util as u, pathlib, sys; "
+    "u.find_spec('pare.sdk') and u.find_spec('pare.sdk.runtime') "
+    "and pathlib.Path(sys.argv[1]).touch()"
+)
+
+ENTRYPOINT_SCRIPT = f"""#!/bin/sh
+if [ -n "$AWS_LAMBDA_RUNTIME_API" ] && [ -f "$LAMBDA_TASK_ROOT/{RUNTIME_MARKER_FILENAME}" ]; then
+    exec /var/lang/bin/python3 -m pare.sdk.runtime "$@"
+fi
+# The base image's entrypoint, which starts awslambdaric
+exec /lambda-entrypoint.sh "$@"
+"""
+
+
+def build_lambda_handler(symbol_path: str, output_path: Path) -> None:
+    try:
+        mod_path, target_symbol = symbol_path.split(":")
+    except ValueError:  # not enough values to unpack/too many values to unpack
+        raise ValueError(
+            f"Could not resolve module path and target symbol from: '{symbol_path}'"
+        )
+    output_path.write_text(
+        HANDLER_TEMPLATE.substitute(mod_path=mod_path, target_symbol=target_symbol)
+    )
+
+
+def build_lambda_entrypoint(output_path: Path) -> None:
+    output_path.write_text(ENTRYPOINT_SCRIPT)
+    output_path.chmod(0o755)
@@ -7,12 +7,15 @@ class ServiceRegistration(BaseModel):
     name: str
     function: str
     dependencies: list[str] = Field(default_factory=list)
+    streaming: bool = False
 
 
 class ServiceConfig(BaseModel):
     name: str
     path: str
     requirements: list[str] = Field(default_factory=list)
+    # Generator endpoints, whose images start a runtime which can stream responses
+    streaming: bool = False
 
 
 class DeployConfig(BaseModel):
@@ -0,0 +1,17 @@
+"""Names of deployed resources, shared by the Pare API and the SDK."""
+
+from __future__ import annotations
+
+
+def build_ecr_repo_name(username: str, service_name: str) -> str:
+    return f"{username}_{service_name}"
+
+
+def build_lambda_function_name(repo_name: str, tag: str) -> str:
+    return f"{repo_name}_{tag}"
+
+
+# AUTH SENSITIVE!
+# This pattern is used in the ECR policy to allow Lambda to pull images
+def build_lambda_function_name_pattern(repo_name: str) -> str:
+    return f"{repo_name}_*"
@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import contextvars
+import importlib
+import json
+import math
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Union
+
+from pare import errors, naming, settings
+from pare.sdk.cache import deployed_version
+from pare.sdk.codec import decode_event_response, encode_event_payload, get_codec
+from pare.sdk.deadline import check_deadline, deadline_fields, expired, remaining_time
+from pare.sdk.transport import (
+    RemoteInvocationArguments,
+    async_invoke_endpoint,
+    async_invoke_endpoint_batch,
+    encode_batch,
+    get_batch_results,
+    get_invoke_result,
+    invoke_endpoint,
+    invoke_endpoint_batch,
+    invoke_errors,
+)
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from pare.sdk.codec import Codec
+    from pare.sdk.main import PareEndpoint
+
+
+class Backend:
+    """Runs the invocations of endpoints, such as through the Pare API."""
+
+    def invoke(
+        self, endpoint: PareEndpoint, arguments: RemoteInvocationArguments
+    ) -> Any:
+        raise NotImplementedError
+
+    async def invoke_async(
+        self, endpoint: PareEndpoint, arguments: RemoteInvocationArguments
+    ) -> Any:
+        import asyncio
+
+        # Runs in a copy of the caller's context, which holds its deadline
+        return await asyncio.get_running_loop().run_in_executor(
+            None, contextvars.copy_context().run, self.invoke, endpoint, arguments
+        )
+
+    def invoke_batch(
+        self, endpoint: PareEndpoint, batch: list[RemoteInvocationArguments]
+    ) -> list[Any]:
+        """One outcome per invocation, in order; failed invocations become exceptions."""
+        raise NotImplementedError
+
+    async def invoke_batch_async(
+        self, endpoint: PareEndpoint, batch: list[RemoteInvocationArguments]
+    ) -> list[Any]:
+        import asyncio
+
+        return await asyncio.get_running_loop().run_in_executor(
+            None, contextvars.copy_context().run, self.invoke_batch, endpoint, batch
+        )
+
+
+class RemoteBackend(Backend):
+    """Invokes deployed functions through the Pare API."""
+
+    def invoke(
+        self, endpoint: PareEndpoint, arguments: RemoteInvocationArguments
+    ) -> Any:
+        return invoke_endpoint(endpoint.name, arguments)
+
+    async def invoke_async(
+        self, endpoint: PareEndpoint, arguments: RemoteInvocationArguments
+    ) -> Any:
+        return await async_invoke_endpoint(endpoint.name, arguments)
+
+    def invoke_batch(
+        self, endpoint: PareEndpoint, batch: list[RemoteInvocationArguments]
+    ) -> list[Any]:
+        return invoke_endpoint_batch(endpoint.name, batch)
+
+    async def invoke_batch_async(
+        self, endpoint: PareEndpoint, batch: list[RemoteInvocationArguments]
+    ) -> list[Any]:
+        return await async_invoke_endpoint_batch(endpoint.name, batch)
+
+
+def _deadline_exceeded(endpoint: PareEndpoint) -> errors.PareDeadlineExceededError:
+    return errors.PareDeadlineExceededError(
+        f"Deadline exceeded while invoking '{endpoint.name}'", status=504
+    )
+
+
+class EventBackend(Backend):
+    """Sends the same Lambda event the Pare API would to an endpoint's handler."""
+
+    def send_event(self, endpoint: PareEndpoint, payload: bytes) -> bytes:
+        """Run the handler on a serialized event, returning its serialized response.
+
+        Must give up once the current deadline has passed.
+        """
+        raise NotImplementedError
+
+    def encode_event(self, endpoint: PareEndpoint, data: bytes, codec: Codec) -> bytes:
+        check_deadline(endpoint.name)
+        return encode_event_payload(codec, data, deadline_fields())
+
+    def invoke(
+        self, endpoint: PareEndpoint, arguments: RemoteInvocationArguments
+    ) -> Any:
+        codec = get_codec(settings.PARE_CODEC)
+        with invoke_errors(endpoint.name):
+            payload = self.encode_event(endpoint, arguments.encode(codec), codec)
+            return get_invoke_result(
+                endpoint.name, decode_event_response(self.send_event(endpoint, payload))
+            )
+
+    def invoke_batch(
+        self, endpoint: PareEndpoint, batch: list[RemoteInvocationArguments]
+    ) -> list[Any]:
+        codec = get_codec(settings.PARE_CODEC)
+        with invoke_errors(endpoint.name):
+            payload = self.encode_event(endpoint, encode_batch(batch, codec), codec)
+            return get_batch_results(
+                endpoint.name, decode_event_response(self.send_event(endpoint, payload))
+            )
+
+
+class LambdaBackend(EventBackend):
+    """Invokes deployed Lambda functions directly, without going through the Pare API.
+
+    Requires the optional `boto3` dependency (`pare[aws]`) and AWS credentials
+    allowed to invoke the functions. `function_name` is formatted with the
+    endpoint's `name` and the deployed `git_hash` to get the Lambda function name.
+    By default, functions are named as the Pare API deploys them for `username`.
+    """
+
+    def __init__(
+        self,
+        function_name: str = settings.PARE_LAMBDA_FUNCTION_NAME,
+        region_name: str | None = None,
+        username: str = settings.PARE_USERNAME,
+    ) -> None:
+        self.function_name = function_name
+        self.region_name = region_name
+        self.username = username
+
+    def get_function_name(self, endpoint: PareEndpoint) -> str:
+        if self.function_name and "{git_hash}" not in self.function_name:
+            return self.function_name.format(name=endpoint.name)
+        git_hash = deployed_version()
+        if git_hash is None:
+            raise errors.PareInvokeError(
+                f"Could not name the Lambda function for '{endpoint.name}': the deployed version is unknown. Set PARE_GIT_HASH to the git hash it was deployed from."
+            )
+        if self.function_name:
+            return self.function_name.format(name=endpoint.name, git_hash=git_hash)
+        if not self.username:
+            raise errors.PareInvokeError(
+                f"Could not name the Lambda function for '{endpoint.name}'. Set PARE_USERNAME to the username it was deployed by, or PARE_LAMBDA_FUNCTION_NAME."
+            )
+        return naming.build_lambda_function_name(
+            naming.build_ecr_repo_name(self.username, endpoint.name), git_hash
+        )
+
+    def send_event(self, endpoint: PareEndpoint, payload: bytes) -> bytes:
+        function_name = self.get_function_name(endpoint)
+        remaining = remaining_time()
+        # Whole seconds, so that calls with similar deadlines share clients
+        read_timeout = None if remaining is None else max(math.ceil(remaining), 1)
+        try:
+            response = _lambda_client(self.region_name, read_timeout).invoke(
+                FunctionName=function_name,
+                InvocationType="RequestResponse",
+                Payload=payload,
+            )
+        except Exception:
+            if expired():
+                raise _deadline_exceeded(endpoint) from None
+            raise
+        if response.get("FunctionError"):
+            # e.g. the result was over the Lambda payload limit, or the function timed out
+            raise errors.PareInvokeError(
+                f"Function invocation for '{endpoint.name}' failed: {response['Payload'].read().decode()}",
+                status=502,
+            )
+        return response["Payload"].read()
+
+
+@lru_cache(maxsize=32)
+def _lambda_client(region_name: str | None, read_timeout: int | None = None) -> Any:
+    try:
+        import boto3
+    except ImportError:
+        raise errors.PareInvokeError(
+            "The Lambda backend requires boto3. Install it with 'pip install pare[aws]'."
+        )
+    if read_timeout is None:
+        return boto3.client("lambda", region_name=region_name)
+    from botocore.config import Config
+
+    # Waits no longer than the caller's deadline, which a retry could only overrun
+    config = Config(read_timeout=read_timeout, retries={"total_max_attempts": 1})
+    return boto3.client("lambda", region_name=region_name, config=config)
+
+
+def load_endpoint(module: str, qualname: str) -> Any:
+    """Import an endpoint by the module and qualified name of its function."""
+    # The function itself can't be pickled when the decorator has replaced it in its module
+    target: Any = importlib.import_module(module)
+    for attr in qualname.split("."):
+        target = getattr(target, attr)
+    return target
+
+
+@lru_cache(maxsize=None)
+def _load_handler(module: str, qualname: str) -> Callable[[Any, Any], Any]:
+    return load_endpoint(module, qualname).as_lambda_function_url_handler()
+
+
+def _handle_event(module: str, qualname: str, payload: bytes) -> bytes:
+    # Serialized on both sides like the Lambda runtime, so results match exactly
+    handler = _load_handler(module, qualname)
+    return json.dumps(handler(json.loads(payload), None)).encode()
+
+
+class LocalBackend(EventBackend):
+    """Runs endpoint handlers in a local pool of `max_workers` processes.
+
+    Invocations go through the same serialization as deployed functions, with
+    no network access, which suits tests, load tests and batch jobs. Endpoints
+    must be defined at module level, so that the worker processes can import them.
+    """
+
+    def __init__(self, max_workers: int | None = None) -> None:
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._executor = ProcessPoolExecutor(self.max_workers)
+            return self._executor
+
+    def _submit(self, endpoint: PareEndpoint, payload: bytes) -> Any:
+        func = endpoint.func
+        return self.executor.submit(
+            _handle_event, func.__module__, func.__qualname__, payload
+        )
+
+    def send_event(self, endpoint: PareEndpoint, payload: bytes) -> bytes:
+        future = self._submit(endpoint, payload)
+        try:
+            return future.result(timeout=remaining_time())
+        except FutureTimeoutError:
+            if future.done():
+                raise
+            future.cancel()
+            raise _deadline_exceeded(endpoint) from None
+
+    async def invoke_async(
+        self, endpoint: PareEndpoint, arguments: RemoteInvocationArguments
+    ) -> Any:
+        import asyncio
+
+        codec = get_codec(settings.PARE_CODEC)
+        with invoke_errors(endpoint.name):
+            payload = self.encode_event(endpoint, arguments.encode(codec), codec)
+            future = asyncio.wrap_future(self._submit(endpoint, payload))
+            try:
+                response = await asyncio.wait_for(future, remaining_time())
+            except asyncio.TimeoutError:
+                if not future.cancelled():
+                    raise
+                raise _deadline_exceeded(endpoint) from None
+            return get_invoke_result(endpoint.name, decode_event_response(response))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+BackendOption = Union[Backend, str, None]
+
+BACKENDS: dict[str, Callable[[], Backend]] = {
+    "remote": RemoteBackend,
+    "lambda": LambdaBackend,
+    "local": LocalBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def _named_backend(name: str) -> Backend:
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown backend '{name}'. Expected one of: {', '.join(BACKENDS)}"
+        )
+
+
+def get_backend(backend: BackendOption = None) -> Backend:
+    """Resolve a backend option, defaulting to the one named by `PARE_BACKEND`."""
+    if isinstance(backend, Backend):
+        return backend
+    return _named_backend(backend or settings.PARE_BACKEND)
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import threading
+import weakref
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Generic, TypeVar
+
+from pare import errors
+from pare.sdk.deadline import current_deadline, deadline_scope, remaining_time
+
+if TYPE_CHECKING:
+    import asyncio
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class BatchPolicy:
+    """Configures client-side micro-batching of an endpoint's invocations.
+
+    Invocations are held for up to `max_wait_ms` and sent together in a single
+    request once `max_size` of them are pending or the wait has elapsed.
+    """
+
+    max_size: int = 32
+    max_wait_ms: float = 5.0
+
+
+def _earliest(first: float | None, second: float | None) -> float | None:
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return min(first, second)
+
+
+def _deadline_exceeded() -> errors.PareDeadlineExceededError:
+    return errors.PareDeadlineExceededError(
+        "Deadline exceeded while waiting for a batched invocation", status=504
+    )
+
+
+class _AsyncPending:
+    def __init__(self) -> None:
+        self.items: list[tuple[Any, asyncio.Future[Any]]] = []
+        self.deadline: float | None = None
+        self.handle: asyncio.TimerHandle | None = None
+        self.tasks: set[asyncio.Task[Any]] = set()
+
+
+class Batcher(Generic[T]):
+    """Groups items submitted close together in time into batches.
+
+    `send` receives a batch and returns one outcome per item, in order. An outcome
+    that is an exception fails only its own item; an exception raised by `send`
+    fails the whole batch. Batches are sent under the earliest deadline of their
+    items' callers, since they may be sent from another thread or task.
+    """
+
+    def __init__(
+        self,
+        policy: BatchPolicy,
+        send: Callable[[list[T]], list[Any]],
+        send_async: Callable[[list[T]], Awaitable[list[Any]]],
+    ) -> None:
+        self.policy = policy
+        self._send = send
+        self._send_async = send_async
+        self._lock = threading.Lock()
+        self._pending: list[tuple[T, Future[Any]]] = []
+        self._deadline: float | None = None
+        self._timer: threading.Timer | None = None
+        # Bumped whenever a batch is taken, so a stale timer can't flush the next one
+        self._generation = 0
+        self._async_pending: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, _AsyncPending
+        ] = weakref.WeakKeyDictionary()
+
+    @property
+    def _max_wait(self) -> float:
+        return self.policy.max_wait_ms / 1000
+
+    def call(self, item: T) -> Any:
+        """Submit `item` and wait for its outcome, until the caller's deadline."""
+        future = self.submit(item)
+        try:
+            return future.result(timeout=remaining_time())
+        except FutureTimeoutError:
+            if future.done():
+                # The item itself failed with a timeout
+                raise
+            future.cancel()
+            raise _deadline_exceeded() from None
+
+    def submit(self, item: T) -> Future[Any]:
+        future: Future[Any] = Future()
+        batch = None
+        with self._lock:
+            self._pending.append((item, future))
+            self._deadline = _earliest(self._deadline, current_deadline())
+            if len(self._pending) >= self.policy.max_size:
+                batch = self._take()
+            elif len(self._pending) == 1:
+                self._timer = threading.Timer(
+                    self._max_wait, self._flush_on_timer, args=(self._generation,)
+                )
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            # The submitter that fills the batch sends it from its own thread
+            self._flush(*batch)
+        return future
+
+    def _take(self) -> tuple[list[tuple[T, Future[Any]]], float | None]:
+        batch, self._pending = self._pending, []
+        deadline, self._deadline = self._deadline, None
+        self._generation += 1
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Drop items whose caller has already given up on them
+        return [
+            entry for entry in batch if entry[1].set_running_or_notify_cancel()
+        ], deadline
+
+    def _flush_on_timer(self, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            batch = self._take()
+        self._flush(*batch)
+
+    def _flush(
+        self, batch: list[tuple[T, Future[Any]]], deadline: float | None
+    ) -> None:
+        if not batch:
+            return
+        futures = [future for _, future in batch]
+        try:
+            with deadline_scope(deadline):
+                outcomes = self._send([item for item, _ in batch])
+        except BaseException as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        _resolve(futures, outcomes)
+
+    async def submit_async(self, item: T) -> Any:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        pending = self._async_pending.get(loop)
+        if pending is None:
+            pending = self._async_pending[loop] = _AsyncPending()
+        future = loop.create_future()
+        pending.items.append((item, future))
+        pending.deadline = _earliest(pending.deadline, current_deadline())
+        if len(pending.items) >= self.policy.max_size:
+            self._flush_async(pending)
+        elif len(pending.items) == 1:
+            pending.handle = loop.call_later(self._max_wait, self._flush_async, pending)
+        try:
+            # Cancels the item, which is then left out of its batch, on timeout
+            return await asyncio.wait_for(future, remaining_time())
+        except asyncio.TimeoutError:
+            if not future.cancelled():
+                raise
+            raise _deadline_exceeded() from None
+
+    def _flush_async(self, pending: _AsyncPending) -> None:
+        import asyncio
+
+        batch, pending.items = pending.items, []
+        deadline, pending.deadline = pending.deadline, None
+        if pending.handle is not None:
+            pending.handle.cancel()
+            pending.handle = None
+        batch = [entry for entry in batch if not entry[1].done()]
+        if not batch:
+            return
+        # Keep a reference to the task so it isn't garbage collected mid-flight
+        task = asyncio.ensure_future(self._send_batch_async(batch, deadline))
+        pending.tasks.add(task)
+        task.add_done_callback(pending.tasks.discard)
+
+    async def _send_batch_async(
+        self, batch: list[tuple[T, asyncio.Future[Any]]], deadline: float | None
+    ):
+        futures = [future for _, future in batch]
+        try:
+            with deadline_scope(deadline):
+                outcomes = await self._send_async([item for item, _ in batch])
+        except BaseException as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        _resolve(futures, outcomes)
+
+
+def _resolve(
+    futures: list[Future[Any]] | list[asyncio.Future[Any]], outcomes: list[Any]
+) -> None:
+    if len(outcomes) != len(futures):
+        error = RuntimeError(
+            f"Expected {len(futures)} results for batch, received {len(outcomes)}"
+        )
+        outcomes = [error] * len(futures)
+    for future, outcome in zip(futures, outcomes):
+        if future.done():
+            continue
+        if isinstance(outcome, BaseException):
+            future.set_exception(outcome)
+        else:
+            future.set_result(outcome)
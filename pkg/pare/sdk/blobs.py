@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import IO, Any, Iterator
+from urllib.parse import unquote, urlparse
+
+from pare import errors, settings
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobStore:
+    """Holds payloads too large to send through the invoke API."""
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store `data` under `key`, returning the URL to fetch it from."""
+        raise NotImplementedError
+
+    def get(self, url: str) -> Iterator[bytes]:
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    """Keeps blobs in a local directory, for tests and local development."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+
+    def put(self, key: str, data: bytes) -> str:
+        path = self.path / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path.resolve().as_uri()
+
+    def get(self, url: str) -> Iterator[bytes]:
+        with open(unquote(urlparse(url).path), "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+
+
+class S3BlobStore(BlobStore):
+    """Keeps blobs in an S3 bucket; requires the optional `boto3` dependency (`pare[s3]`).
+
+    Set `endpoint_url` to use an S3-compatible store such as MinIO.
+    """
+
+    def __init__(
+        self, bucket: str, prefix: str = "", endpoint_url: str | None = None
+    ) -> None:
+        self.bucket = bucket
+        self.prefix = prefix
+        self.endpoint_url = endpoint_url
+
+    @property
+    def client(self) -> Any:
+        return _s3_client(self.endpoint_url)
+
+    def put(self, key: str, data: bytes) -> str:
+        key = f"{self.prefix}{key}"
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+        return f"s3://{self.bucket}/{key}"
+
+    def get(self, url: str) -> Iterator[bytes]:
+        parsed = urlparse(url)
+        response = self.client.get_object(
+            Bucket=parsed.netloc, Key=parsed.path.lstrip("/")
+        )
+        yield from response["Body"].iter_chunks(CHUNK_SIZE)
+
+
+@lru_cache(maxsize=None)
+def _s3_client(endpoint_url: str | None) -> Any:
+    try:
+        import boto3
+    except ImportError:
+        raise errors.PareBlobError(
+            "The S3 blob store requires boto3. Install it with 'pip install pare[s3]'."
+        )
+    return boto3.client("s3", endpoint_url=endpoint_url or None)
+
+
+def store_for_url(url: str) -> BlobStore:
+    parsed = urlparse(url)
+    if parsed.scheme == "s3":
+        return S3BlobStore(
+            parsed.netloc,
+            prefix=parsed.path.lstrip("/"),
+            endpoint_url=settings.PARE_BLOB_ENDPOINT_URL,
+        )
+    if parsed.scheme == "file":
+        return LocalBlobStore(unquote(parsed.path))
+    raise errors.PareBlobError(f"Unsupported blob store: '{url}'")
+
+
+@lru_cache(maxsize=None)
+def get_blob_store() -> BlobStore | None:
+    """The store configured by `PARE_BLOB_STORE_URL`, if any."""
+    if not settings.PARE_BLOB_STORE_URL:
+        return None
+    return store_for_url(settings.PARE_BLOB_STORE_URL)
+
+
+def should_spill(size: int) -> bool:
+    return size > settings.PARE_BLOB_THRESHOLD and get_blob_store() is not None
+
+
+def spill(data: bytes) -> dict[str, Any]:
+    """Upload `data` to the blob store, returning a reference to send instead."""
+    store = get_blob_store()
+    if store is None:
+        raise errors.PareBlobError("No blob store is configured")
+    digest = hashlib.sha256(data).hexdigest()
+    # Blobs are content-addressed, so identical payloads are only stored once
+    url = store.put(digest, data)
+    return {"url": url, "sha256": digest, "size": len(data)}
+
+
+def payload_limit_error(size: int, what: str) -> str | None:
+    """Why a payload of `size` bytes can't be sent through Lambda, if it can't.
+
+    Payloads over the threshold are spilled when a blob store is configured,
+    so only without one do they run into Lambda's limit.
+    """
+    if size <= settings.PARE_MAX_PAYLOAD_SIZE or get_blob_store() is not None:
+        return None
+    return (
+        f"{what} of {size} bytes exceed the Lambda payload limit of "
+        f"{settings.PARE_MAX_PAYLOAD_SIZE} bytes. Set PARE_BLOB_STORE_URL to "
+        "send large payloads through a blob store."
+    )
+
+
+class BlobReader(io.RawIOBase):
+    """Reads a spilled payload as it is downloaded.
+
+    The payload is verified against its reference once it has been read to the
+    end, so a decoder reading from it fails rather than returning tampered data.
+    """
+
+    def __init__(self, ref: dict[str, Any]) -> None:
+        self.ref = ref
+        self.url: str = ref["url"]
+        self._chunks: Iterator[bytes] | None = None
+        self._pending = memoryview(b"")
+        self._digest = hashlib.sha256()
+        self._size = 0
+        self._verified = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _next_chunk(self) -> bytes | None:
+        try:
+            if self._chunks is None:
+                self._chunks = iter(store_for_url(self.url).get(self.url))
+            chunk = next(self._chunks, None)
+        except errors.PareBlobError:
+            raise
+        except Exception as e:
+            raise errors.PareBlobError(f"Could not fetch blob '{self.url}': {e}")
+        if chunk is None:
+            self._verify()
+            return None
+        self._digest.update(chunk)
+        self._size += len(chunk)
+        return chunk
+
+    def _verify(self) -> None:
+        if self._verified:
+            return
+        if (
+            self._size != self.ref["size"]
+            or self._digest.hexdigest() != self.ref["sha256"]
+        ):
+            raise errors.PareBlobError(f"Blob '{self.url}' does not match its checksum")
+        self._verified = True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self._pending:
+            chunk = self._next_chunk()
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def readall(self) -> bytes:
+        chunks = [bytes(self._pending)]
+        self._pending = memoryview(b"")
+        while True:
+            chunk = self._next_chunk()
+            if chunk is None:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+
+def open_blob(ref: dict[str, Any]) -> IO[bytes]:
+    """Open a spilled payload for reading as it is downloaded."""
+    return io.BufferedReader(BlobReader(ref), buffer_size=CHUNK_SIZE)
+
+
+def fetch(ref: dict[str, Any]) -> bytes:
+    """Download a spilled payload, verifying it against its reference.
+
+    Prefer `open_blob` where the payload can be decoded as it is read.
+    """
+    with open_blob(ref) as f:
+        return f.read()
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Union
+
+from pare import settings
+from pare.client import get_current_git_hash
+from pare.sdk.codec import JSONCodec
+
+MISSING = object()
+# Disk entries start with their expiry time (0 means no expiry)
+_DISK_HEADER = struct.Struct("!d")
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Configures the client-side result cache of an endpoint.
+
+    Results are kept in an in-memory LRU bounded by `max_entries` and
+    `max_bytes`. When `disk_path` is set, results are also written there so
+    that other worker processes on the same machine can reuse them.
+    """
+
+    ttl: float | None = 300.0
+    max_entries: int = 1024
+    max_bytes: int = 64 * 1024 * 1024
+    disk_path: str | Path | None = None
+    max_disk_bytes: int = 1024 * 1024 * 1024
+
+
+CacheOption = Union[CachePolicy, bool, None]
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    disk_hits: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def resolve_cache_policy(cache: CacheOption) -> CachePolicy | None:
+    if cache is True:
+        return CachePolicy()
+    if not cache:
+        return None
+    return cache
+
+
+def deployed_version() -> str | None:
+    """The deploy version invocations are routed to, or None if the client can't tell."""
+    if settings.PARE_ATOMIC_DEPLOYMENT_ENABLED:
+        return get_current_git_hash()
+    return settings.PARE_GIT_HASH[:7] or None
+
+
+def invocation_key(
+    function_name: str, args: tuple[Any, ...], kwargs: dict[str, Any]
+) -> str:
+    """A stable hash identifying an invocation of a deployed function."""
+    # Sorting kwargs makes the key independent of keyword argument order
+    canonical = JSONCodec().encode(
+        [function_name, deployed_version(), list(args), sorted(kwargs.items())]
+    )
+    return hashlib.sha256(canonical).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, function_name: str, policy: CachePolicy) -> None:
+        self.function_name = function_name
+        self.policy = policy
+        self._codec = JSONCodec()
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._size = 0
+        self._stats = CacheStats()
+        self._disk_writes = 0
+        self._disk_path = (
+            Path(policy.disk_path) / function_name if policy.disk_path else None
+        )
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._stats
+
+    def key(self, args: tuple[Any, ...], kwargs: dict[str, Any]) -> str:
+        return invocation_key(self.function_name, args, kwargs)
+
+    def _expires_at(self) -> float:
+        return time.time() + self.policy.ttl if self.policy.ttl is not None else 0.0
+
+    def get(self, key: str) -> Any:
+        """Return the cached result for `key`, or `MISSING`."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, data = entry
+                if not expires_at or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats = replace(self._stats, hits=self._stats.hits + 1)
+                    return self._codec.decode(data)
+                self._remove(key)
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self._stats = replace(self._stats, misses=self._stats.misses + 1)
+                return MISSING
+            self._stats = replace(
+                self._stats,
+                hits=self._stats.hits + 1,
+                disk_hits=self._stats.disk_hits + 1,
+            )
+            self._insert(key, *entry)
+        return self._codec.decode(entry[1])
+
+    def set(self, key: str, value: Any) -> None:
+        data = self._codec.encode(value)
+        expires_at = self._expires_at()
+        with self._lock:
+            self._insert(key, expires_at, data)
+        self._write_disk(key, expires_at, data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _insert(self, key: str, expires_at: float, data: bytes) -> None:
+        if len(data) > self.policy.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (expires_at, data)
+        self._size += len(data)
+        while (
+            len(self._entries) > self.policy.max_entries
+            or self._size > self.policy.max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+            self._stats = replace(self._stats, evictions=self._stats.evictions + 1)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def _read_disk(self, key: str, now: float) -> tuple[float, bytes] | None:
+        if self._disk_path is None:
+            return None
+        path = self._disk_path / key
+        try:
+            raw = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            (expires_at,) = _DISK_HEADER.unpack_from(raw)
+        except struct.error:
+            # Empty or truncated, e.g. by a full disk or a crash; drop it as a miss
+            _unlink(path)
+            return None
+        if expires_at and expires_at <= now:
+            _unlink(path)
+            return None
+        return expires_at, raw[_DISK_HEADER.size :]
+
+    def _write_disk(self, key: str, expires_at: float, data: bytes) -> None:
+        if self._disk_path is None:
+            return
+        try:
+            self._disk_path.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so concurrent readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self._disk_path, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(_DISK_HEADER.pack(expires_at))
+                f.write(data)
+            os.replace(tmp_path, self._disk_path / key)
+        except OSError:
+            return
+        self._disk_writes += 1
+        if self._disk_writes % 64 == 0:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        assert self._disk_path is not None
+        entries: list[tuple[float, int, Path]] = []
+        for path in self._disk_path.iterdir():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        # Drop the least recently written entries until we are back under the limit
+        for _, size, path in sorted(entries):
+            if total <= self.policy.max_disk_bytes:
+                break
+            _unlink(path)
+            total -= size
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except OSError:
+        pass
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, TypeVar
+
+from pare import errors
+from pare.sdk.backends import load_endpoint
+
+R = TypeVar("R")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass(frozen=True)
+class CircuitBreakerPolicy:
+    """Configures the circuit breaker guarding an endpoint's remote invocations.
+
+    The circuit opens when at least `failure_rate` of the last `window` calls
+    (once there have been `min_calls`) failed or took longer than `slow_call`
+    seconds. While open, calls run locally in a pool of `local_workers`
+    (threads, or processes with `local_executor="process"`), with at most
+    `local_queue` calls waiting. After `open_duration` seconds, a single remote
+    probe decides whether to close the circuit again.
+    """
+
+    failure_rate: float = 0.5
+    slow_call: float | None = None
+    window: int = 20
+    min_calls: int = 10
+    open_duration: float = 30.0
+    fallback: bool = True
+    local_workers: int = 4
+    local_queue: int = 16
+    local_executor: str = "thread"
+
+
+def is_remote_failure(error: BaseException) -> bool:
+    """Whether an error means the remote path is degraded.
+
+    Errors reported by the function itself say nothing about the remote path, and
+    neither do deadlines the caller chose.
+    """
+    return isinstance(error, errors.PareInvokeError) and not isinstance(
+        error, (errors.PareFunctionError, errors.PareDeadlineExceededError)
+    )
+
+
+class CircuitBreaker:
+    def __init__(self, policy: CircuitBreakerPolicy) -> None:
+        self.policy = policy
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=policy.window)
+        self._opened_at = 0.0
+        self._probing = False
+        # Bumped on every state change, so calls admitted before it can't count after
+        self._generation = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._can_probe():
+                return HALF_OPEN
+            return self._state
+
+    def _can_probe(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.policy.open_duration
+
+    def allow(self) -> bool:
+        """Whether the next call may go to the remote path."""
+        return self._admit() is not None
+
+    def _admit(self) -> int | None:
+        # The generation the call was admitted in, or None if it may not go remote
+        with self._lock:
+            if self._state == CLOSED:
+                return self._generation
+            if self._probing or not self._can_probe():
+                return None
+            # Let a single call through to probe whether the remote path recovered
+            self._state = HALF_OPEN
+            self._probing = True
+            self._generation += 1
+            return self._generation
+
+    def record(self, failed: bool, generation: int | None = None) -> None:
+        """Record a call's outcome, ignored if it was admitted in an earlier state."""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self._state = CLOSED
+                    self._generation += 1
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(failed)
+            if (
+                len(self._outcomes) >= self.policy.min_calls
+                and sum(self._outcomes) / len(self._outcomes)
+                >= self.policy.failure_rate
+            ):
+                self._open()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._generation += 1
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def _is_slow(self, started: float) -> bool:
+        return (
+            self.policy.slow_call is not None
+            and time.monotonic() - started > self.policy.slow_call
+        )
+
+    def call(self, func: Callable[[], R]) -> R:
+        """Run `func` through the breaker, raising `PareCircuitOpenError` when open."""
+        generation = self._admit()
+        if generation is None:
+            raise errors.PareCircuitOpenError("Circuit is open")
+        started = time.monotonic()
+        try:
+            result = func()
+        except BaseException as e:
+            failed = is_remote_failure(e) or self._is_slow(started)
+            self.record(failed, generation)
+            raise
+        self.record(self._is_slow(started), generation)
+        return result
+
+    async def call_async(self, func: Callable[[], Awaitable[R]]) -> R:
+        generation = self._admit()
+        if generation is None:
+            raise errors.PareCircuitOpenError("Circuit is open")
+        started = time.monotonic()
+        try:
+            result = await func()
+        except BaseException as e:
+            failed = is_remote_failure(e) or self._is_slow(started)
+            self.record(failed, generation)
+            raise
+        self.record(self._is_slow(started), generation)
+        return result
+
+
+def _call_endpoint_function(
+    module: str, qualname: str, args: Any, kwargs: dict[str, Any]
+) -> Any:
+    return load_endpoint(module, qualname).func(*args, **kwargs)
+
+
+class LocalExecutor:
+    """Runs an endpoint's function locally in a bounded pool."""
+
+    def __init__(self, endpoint: Any, policy: CircuitBreakerPolicy) -> None:
+        self.endpoint = endpoint
+        self.policy = policy
+        self._slots = threading.BoundedSemaphore(
+            policy.local_workers + policy.local_queue
+        )
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.policy.local_executor == "process":
+                    # Imports multiprocessing, so only when needed
+                    from concurrent.futures import ProcessPoolExecutor
+
+                    self._executor = ProcessPoolExecutor(self.policy.local_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        self.policy.local_workers, thread_name_prefix="pare-local"
+                    )
+            return self._executor
+
+    def _submit(self, args: Any, kwargs: dict[str, Any]) -> Any:
+        if not self._slots.acquire(blocking=False):
+            raise errors.PareCircuitOpenError(
+                f"Circuit for '{self.endpoint.name}' is open and local execution is at capacity"
+            )
+        try:
+            if self.policy.local_executor == "process":
+                func = self.endpoint.func
+                future = self.executor.submit(
+                    _call_endpoint_function,
+                    func.__module__,
+                    func.__qualname__,
+                    args,
+                    kwargs,
+                )
+            else:
+                future = self.executor.submit(self.endpoint.func, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, args: Any, kwargs: dict[str, Any]) -> Any:
+        return self._submit(args, kwargs).result()
+
+    async def run_async(self, args: Any, kwargs: dict[str, Any]) -> Any:
+        import asyncio
+
+        return await asyncio.wrap_future(self._submit(args, kwargs))
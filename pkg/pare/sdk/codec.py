@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import base64
+import json
+import sys
+from datetime import datetime
+from typing import IO, Any, Callable
+
+from pare import errors, settings
+from pare.sdk import blobs
+from pare.sdk.compression import IDENTITY, decompress, maybe_compress
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+# Keys used in the event passed to (and returned from) the Lambda handler
+EVENT_CODEC_KEY = "pare_codec"
+EVENT_BODY_KEY = "body"
+EVENT_EXT_KEY = "pare_ext"
+EVENT_ENCODING_KEY = "pare_encoding"
+EVENT_ACCEPT_ENCODING_KEY = "pare_accept_encoding"
+# Replaces the body of an envelope when the payload was spilled to the blob store
+EVENT_BLOB_KEY = "pare_blob"
+
+# JSON has no native bytes/datetime/array types, so they are tagged objects on the wire
+JSON_EXT_KEY = "__pare__"
+_JSON_EXT_MARKER = b'"__pare__"'
+
+MSGPACK_EXT_DATETIME = 1
+MSGPACK_EXT_NDARRAY = 2
+
+
+def _get_ndarray_type() -> type | None:
+    # Never import numpy ourselves; if an array is being encoded, it is already loaded
+    numpy = sys.modules.get("numpy")
+    return numpy.ndarray if numpy is not None else None
+
+
+def _ndarray_parts(value: Any) -> tuple[str, list[int], bytes]:
+    numpy = sys.modules["numpy"]
+    return value.dtype.str, list(value.shape), numpy.ascontiguousarray(value).tobytes()
+
+
+def _ndarray_from_parts(dtype: str, shape: list[int], data: bytes) -> Any:
+    import numpy
+
+    # Zero-copy view over the received buffer, so the array is read-only
+    return numpy.frombuffer(data, dtype=numpy.dtype(dtype)).reshape(shape)
+
+
+class Codec:
+    name: str
+    content_type: str
+
+    def encode(self, obj: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+    def decode_stream(self, stream: IO[bytes]) -> Any:
+        """Decode from a file-like object, e.g. a payload read from the blob store.
+
+        Codecs which can't parse incrementally read the whole stream first.
+        """
+        return self.decode(stream.read())
+
+    def encode_event(self, event: dict[str, Any]) -> bytes:
+        """Encode an event object (e.g. args/kwargs) to be sent to the handler."""
+        return self.encode(event)
+
+    def encode_arguments(self, args: list[Any], kwargs: dict[str, Any]) -> bytes:
+        return self.encode_event({"args": args, "kwargs": kwargs})
+
+
+class JSONCodec(Codec):
+    """JSON via orjson when installed, falling back to the standard library."""
+
+    name = "json"
+    content_type = JSON_CONTENT_TYPE
+
+    def _dumps(self, obj: Any) -> tuple[bytes, bool]:
+        used_ext = False
+
+        def default(value: Any) -> Any:
+            nonlocal used_ext
+            used_ext = True
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                return {
+                    JSON_EXT_KEY: "bytes",
+                    "data": base64.b64encode(value).decode("ascii"),
+                }
+            if isinstance(value, datetime):
+                return {JSON_EXT_KEY: "datetime", "data": value.isoformat()}
+            ndarray = _get_ndarray_type()
+            if ndarray is not None and isinstance(value, ndarray):
+                dtype, shape, data = _ndarray_parts(value)
+                return {
+                    JSON_EXT_KEY: "ndarray",
+                    "dtype": dtype,
+                    "shape": shape,
+                    "data": base64.b64encode(data).decode("ascii"),
+                }
+            raise TypeError(
+                f"Object of type {type(value).__name__} is not serializable"
+            )
+
+        if orjson is not None:
+            data = orjson.dumps(
+                obj, default=default, option=orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        else:
+            data = json.dumps(obj, default=default, separators=(",", ":")).encode()
+        return data, used_ext
+
+    def encode(self, obj: Any) -> bytes:
+        return self._dumps(obj)[0]
+
+    def decode(self, data: bytes) -> Any:
+        obj = orjson.loads(data) if orjson is not None else json.loads(data)
+        if _JSON_EXT_MARKER in data:
+            return restore_json_ext(obj)
+        return obj
+
+    def encode_event(self, event: dict[str, Any]) -> bytes:
+        data, used_ext = self._dumps(event)
+        if used_ext:
+            # The Lambda runtime parses the event before we see it, so flag that
+            # tagged values need restoring rather than walking every event
+            data = b'{"' + EVENT_EXT_KEY.encode() + b'":true,' + data[1:]
+        return data
+
+    def to_jsonable(self, obj: Any, data: bytes | None = None) -> Any:
+        """Replace extension values in `obj` with their tagged JSON form.
+
+        `data` may be passed when `obj` has already been encoded.
+        """
+        used_ext = data is not None and _JSON_EXT_MARKER in data
+        if data is None:
+            data, used_ext = self._dumps(obj)
+        if not used_ext:
+            return obj
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def restore_json_ext(obj: Any) -> Any:
+    if isinstance(obj, list):
+        return [restore_json_ext(item) for item in obj]  # type: ignore
+    if not isinstance(obj, dict):
+        return obj
+    tag = obj.get(JSON_EXT_KEY)  # type: ignore
+    if tag == "bytes":
+        return base64.b64decode(obj["data"])
+    if tag == "datetime":
+        return datetime.fromisoformat(obj["data"])
+    if tag == "ndarray":
+        return _ndarray_from_parts(
+            obj["dtype"], obj["shape"], base64.b64decode(obj["data"])
+        )
+    return {key: restore_json_ext(value) for key, value in obj.items()}  # type: ignore
+
+
+class MsgpackCodec(Codec):
+    """Binary codec; requires the optional `msgpack` dependency (`pare[codecs]`)."""
+
+    name = "msgpack"
+    content_type = MSGPACK_CONTENT_TYPE
+
+    @staticmethod
+    def _msgpack() -> Any:
+        try:
+            import msgpack
+        except ImportError:
+            raise errors.PareCodecError(
+                "The 'msgpack' codec requires msgpack. Install it with 'pip install pare[codecs]'."
+            )
+        return msgpack
+
+    def encode(self, obj: Any) -> bytes:
+        msgpack = self._msgpack()
+
+        def default(value: Any) -> Any:
+            if isinstance(value, datetime):
+                return msgpack.ExtType(MSGPACK_EXT_DATETIME, value.isoformat().encode())
+            if isinstance(value, memoryview):
+                return value.tobytes()
+            ndarray = _get_ndarray_type()
+            if ndarray is not None and isinstance(value, ndarray):
+                return msgpack.ExtType(
+                    MSGPACK_EXT_NDARRAY,
+                    msgpack.packb(_ndarray_parts(value), use_bin_type=True),
+                )
+            raise TypeError(
+                f"Object of type {type(value).__name__} is not serializable"
+            )
+
+        return msgpack.packb(obj, default=default, use_bin_type=True)
+
+    def _ext_hook(self, code: int, payload: bytes) -> Any:
+        if code == MSGPACK_EXT_DATETIME:
+            return datetime.fromisoformat(payload.decode())
+        if code == MSGPACK_EXT_NDARRAY:
+            return _ndarray_from_parts(*self._msgpack().unpackb(payload, raw=False))
+        return self._msgpack().ExtType(code, payload)
+
+    def decode(self, data: bytes) -> Any:
+        return self._msgpack().unpackb(
+            data, ext_hook=self._ext_hook, raw=False, strict_map_key=False
+        )
+
+    def decode_stream(self, stream: IO[bytes]) -> Any:
+        unpacker = self._msgpack().Unpacker(
+            stream,
+            ext_hook=self._ext_hook,
+            raw=False,
+            strict_map_key=False,
+            # Unlimited, as a single value may be as large as the payload
+            max_buffer_size=0,
+        )
+        obj = unpacker.unpack()
+        # Read to the end, which verifies a blob against its checksum
+        stream.read()
+        return obj
+
+
+CODECS: dict[str, Callable[[], Codec]] = {
+    JSONCodec.name: JSONCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+
+_CONTENT_TYPES = {
+    JSON_CONTENT_TYPE: JSONCodec.name,
+    MSGPACK_CONTENT_TYPE: MsgpackCodec.name,
+}
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return CODECS[name]()
+    except KeyError:
+        raise errors.PareCodecError(
+            f"Unknown codec '{name}'. Expected one of: {', '.join(CODECS)}"
+        )
+
+
+def codec_for_content_type(content_type: str | None) -> Codec:
+    media_type = (content_type or JSON_CONTENT_TYPE).split(";")[0].strip().lower()
+    return get_codec(_CONTENT_TYPES.get(media_type, JSONCodec.name))
+
+
+def decode_event(event: dict[str, Any]) -> tuple[Codec, Any]:
+    """Unwrap the event received by the Lambda handler into args/kwargs."""
+    codec_name = event.get(EVENT_CODEC_KEY)
+    if codec_name is None:
+        codec = JSONCodec()
+        if event.get(EVENT_EXT_KEY):
+            return codec, restore_json_ext(event)
+        return codec, event
+    return get_codec(codec_name), decode_envelope(event)
+
+
+def decode_envelope_body(envelope: dict[str, Any]) -> bytes:
+    """The (decompressed) payload of an envelope, fetching it if it was spilled."""
+    if EVENT_BLOB_KEY in envelope:
+        body = blobs.fetch(envelope[EVENT_BLOB_KEY])
+    else:
+        body = base64.b64decode(envelope[EVENT_BODY_KEY])
+    return decompress(body, envelope.get(EVENT_ENCODING_KEY, IDENTITY))
+
+
+def decode_envelope(envelope: dict[str, Any]) -> Any:
+    """Decode the payload of an envelope, decoding a spilled one as it is downloaded."""
+    codec = get_codec(envelope[EVENT_CODEC_KEY])
+    if EVENT_BLOB_KEY in envelope:
+        with blobs.open_blob(envelope[EVENT_BLOB_KEY]) as stream:
+            return codec.decode_stream(stream)
+    return codec.decode(decode_envelope_body(envelope))
+
+
+def _base64_size(size: int) -> int:
+    return 4 * -(-size // 3)
+
+
+def event_size(codec: Codec, size: int) -> int:
+    """The size of `size` bytes of encoded data once wrapped as a Lambda event."""
+    if isinstance(codec, JSONCodec):
+        return size
+    # Binary payloads are base64-encoded into an envelope
+    return _base64_size(size)
+
+
+def spill_envelope(codec: Codec, data: bytes) -> dict[str, Any]:
+    return {EVENT_CODEC_KEY: codec.name, EVENT_BLOB_KEY: blobs.spill(data)}
+
+
+def encode_event_payload(
+    codec: Codec, data: bytes, fields: dict[str, Any] | None = None
+) -> bytes:
+    """Wrap encoded arguments as a Lambda event payload, as the invoke API does.
+
+    `fields` (such as the caller's deadline) are added to the event, replacing
+    any of the same name in the arguments.
+    """
+    fields = fields or {}
+    if blobs.should_spill(len(data)):
+        return JSONCodec().encode({**spill_envelope(codec, data), **fields})
+    error = blobs.payload_limit_error(event_size(codec, len(data)), "Arguments")
+    if error is not None:
+        raise errors.PareInvokeError(error, status=413)
+    if isinstance(codec, JSONCodec):
+        # JSON arguments are already a valid event
+        if not fields:
+            return data
+        # Added last, since the last of duplicate keys wins when parsing
+        separator = b"," if data.rstrip()[:-1].strip() != b"{" else b""
+        return data.rstrip()[:-1] + separator + JSONCodec().encode(fields)[1:]
+    return JSONCodec().encode(
+        {
+            EVENT_CODEC_KEY: codec.name,
+            **fields,
+            EVENT_BODY_KEY: base64.b64encode(data).decode("ascii"),
+        }
+    )
+
+
+def decode_event_response(payload: bytes) -> Any:
+    """Decode a serialized handler response, which may be wrapped in an envelope."""
+    response = JSONCodec().decode(payload)
+    if isinstance(response, dict) and EVENT_CODEC_KEY in response:
+        return decode_envelope(response)
+    return response
+
+
+def encode_event_response(
+    codec: Codec, response: dict[str, Any], encoding: str = IDENTITY
+) -> dict[str, Any]:
+    """Build the value returned from the Lambda handler for the given codec.
+
+    JSON responses below the compression threshold are returned as plain
+    objects, which the Lambda runtime serializes; anything else is wrapped.
+    Results too large for Lambda to return, with no blob store to spill them
+    to, are replaced by an error response.
+    """
+    data = codec.encode(response)
+    if blobs.should_spill(len(data)):
+        return spill_envelope(codec, data)
+    body, encoding = maybe_compress(
+        data, encoding, threshold=settings.PARE_COMPRESSION_THRESHOLD
+    )
+    plain = isinstance(codec, JSONCodec) and encoding == IDENTITY
+    size = len(body) if plain else _base64_size(len(body))
+    error = blobs.payload_limit_error(size, "Results")
+    if error is not None:
+        return {"status": 413, "detail": error}
+    if plain:
+        return codec.to_jsonable(response, data=data)
+    envelope = {EVENT_CODEC_KEY: codec.name}
+    if encoding != IDENTITY:
+        envelope[EVENT_ENCODING_KEY] = encoding
+    envelope[EVENT_BODY_KEY] = base64.b64encode(body).decode("ascii")
+    return envelope
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import gzip
+from typing import Any
+
+from pare import errors
+
+IDENTITY = "identity"
+GZIP = "gzip"
+ZSTD = "zstd"
+
+# Most preferred first
+ENCODINGS = (ZSTD, GZIP)
+
+
+def _zstandard() -> Any:
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def available_encodings() -> list[str]:
+    return [
+        encoding
+        for encoding in ENCODINGS
+        if encoding != ZSTD or _zstandard() is not None
+    ]
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == IDENTITY:
+        return data
+    if encoding == GZIP:
+        # Favour speed: payloads are compressed on the request path
+        return gzip.compress(data, compresslevel=5)
+    if encoding == ZSTD:
+        zstandard = _zstandard()
+        if zstandard is None:
+            raise errors.PareCompressionError(
+                "zstd compression requires zstandard. Install it with 'pip install pare[compression]'."
+            )
+        return zstandard.ZstdCompressor().compress(data)
+    raise errors.PareCompressionError(f"Unsupported encoding: '{encoding}'")
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == IDENTITY:
+        return data
+    if encoding == GZIP:
+        return gzip.decompress(data)
+    if encoding == ZSTD:
+        zstandard = _zstandard()
+        if zstandard is None:
+            raise errors.PareCompressionError(
+                "zstd decompression requires zstandard. Install it with 'pip install pare[compression]'."
+            )
+        # Frames written by streaming compressors may not record their size
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    raise errors.PareCompressionError(f"Unsupported encoding: '{encoding}'")
+
+
+def parse_accept_encoding(header: str | None) -> list[str]:
+    if not header:
+        return []
+    return [encoding.strip().lower() for encoding in header.split(",") if encoding]
+
+
+def negotiate_encoding(accepted: list[str]) -> str:
+    """Pick the preferred encoding that both sides support."""
+    supported = available_encodings()
+    for encoding in accepted:
+        if encoding in supported:
+            return encoding
+    return IDENTITY
+
+
+def maybe_compress(data: bytes, encoding: str, threshold: int) -> tuple[bytes, str]:
+    """Compress `data` when it is at least `threshold` bytes and compression helps."""
+    if encoding == IDENTITY or len(data) < threshold:
+        return data, IDENTITY
+    compressed = compress(data, encoding)
+    if len(compressed) >= len(data):
+        return data, IDENTITY
+    return compressed, encoding
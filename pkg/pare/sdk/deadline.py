@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Generator
+
+from pare import errors, settings
+
+# Milliseconds the caller will still wait for the result, added to the Lambda event
+EVENT_DEADLINE_KEY = "pare_deadline_ms"
+
+# A `time.monotonic()` timestamp, or None when calls may take as long as they like
+_deadline: ContextVar[float | None] = ContextVar("pare_deadline", default=None)
+
+
+def current_deadline() -> float | None:
+    return _deadline.get()
+
+
+def remaining_time() -> float | None:
+    """Seconds left before the current deadline, or None if there is none.
+
+    Inside a deployed function, this is the time the caller will still wait for
+    the result (or until Lambda's own timeout), so that long-running work can
+    stop early once nobody is waiting for it.
+    """
+    return time_until(_deadline.get())
+
+
+def time_until(at: float | None) -> float | None:
+    """Seconds left before the monotonic deadline `at`, or None if there is none."""
+    if at is None:
+        return None
+    return max(at - time.monotonic(), 0.0)
+
+
+def passed(at: float | None) -> bool:
+    return at is not None and time.monotonic() >= at
+
+
+def expired() -> bool:
+    return passed(_deadline.get())
+
+
+@contextmanager
+def deadline_scope(at: float | None) -> Generator[None, None, None]:
+    """Apply a monotonic deadline within the block, unless an earlier one applies."""
+    current = _deadline.get()
+    if current is not None and (at is None or current <= at):
+        at = current
+    token = _deadline.set(at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def deadline(
+    timeout: float | None = None, at: float | None = None
+) -> Generator[None, None, None]:
+    """Limit every invocation made within the block to finish by a deadline.
+
+    The deadline is `timeout` seconds from now, or the `time.time()` timestamp
+    `at`, whichever is earlier. It is sent along with each invocation, so that
+    the API refuses calls which would start after it, and functions can check
+    `pare.remaining_time()` to stop early. Nested blocks can only shorten it.
+    """
+    now = time.monotonic()
+    candidates = [now + timeout] if timeout is not None else []
+    if at is not None:
+        candidates.append(now + at - time.time())
+    with deadline_scope(min(candidates) if candidates else None):
+        yield
+
+
+def check_deadline(function_name: str) -> None:
+    if expired():
+        raise errors.PareDeadlineExceededError(
+            f"Deadline exceeded before invoking '{function_name}'", status=504
+        )
+
+
+def deadline_headers() -> dict[str, str]:
+    remaining = remaining_time()
+    if remaining is None:
+        return {}
+    return {settings.PARE_DEADLINE_HEADER: str(int(remaining * 1000))}
+
+
+def deadline_fields() -> dict[str, int]:
+    """The caller's remaining time, to add to a Lambda event as the API does."""
+    remaining = remaining_time()
+    if remaining is None:
+        return {}
+    return {EVENT_DEADLINE_KEY: int(remaining * 1000)}
+
+
+def handler_deadline(event: Any, context: Any) -> float | None:
+    """The deadline of an invocation inside its function: the caller's, or Lambda's timeout."""
+    now = time.monotonic()
+    candidates: list[float] = []
+    if isinstance(event, dict) and isinstance(event.get(EVENT_DEADLINE_KEY), int):
+        candidates.append(now + event[EVENT_DEADLINE_KEY] / 1000)
+    if hasattr(context, "get_remaining_time_in_millis"):
+        candidates.append(now + context.get_remaining_time_in_millis() / 1000)
+    return min(candidates) if candidates else None
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    TypeVar,
+)
+
+from pare import errors
+
+if TYPE_CHECKING:
+    import asyncio
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class _Item:
+    __slots__ = ("index", "value", "attempts")
+
+    def __init__(self, index: int, value: Any) -> None:
+        self.index = index
+        self.value = value
+        self.attempts = 0
+
+
+class _Collector:
+    """Tracks completed items and decides what to yield next.
+
+    When `ordered` is set, results are buffered until every earlier input has
+    completed, otherwise they are released in completion order.
+    """
+
+    def __init__(self, ordered: bool, return_exceptions: bool) -> None:
+        self.ordered = ordered
+        self.return_exceptions = return_exceptions
+        self.next_index = 0
+        self.buffer: dict[int, Any] = {}
+        self.failures: dict[int, tuple[Any, BaseException]] = {}
+
+    def complete(self, item: _Item, result: Any) -> None:
+        self.buffer[item.index] = result
+
+    def fail(self, item: _Item, error: BaseException) -> None:
+        self.failures[item.index] = (item.value, error)
+        if self.return_exceptions:
+            self.buffer[item.index] = error
+        elif self.ordered:
+            # Nothing will be yielded for this index, but later results still can be
+            self.buffer[item.index] = _SKIP
+
+    def drain(self) -> Iterator[Any]:
+        if not self.ordered:
+            results = list(self.buffer.values())
+            self.buffer.clear()
+            yield from (result for result in results if result is not _SKIP)
+            return
+        while self.next_index in self.buffer:
+            result = self.buffer.pop(self.next_index)
+            self.next_index += 1
+            if result is not _SKIP:
+                yield result
+
+    def raise_for_failures(self) -> None:
+        if self.failures and not self.return_exceptions:
+            raise errors.PareMapError(self.failures)
+
+
+_SKIP = object()
+
+
+def _should_retry(
+    item: _Item,
+    error: BaseException,
+    retries: int,
+    is_retryable: Callable[[BaseException], bool] | None,
+) -> bool:
+    return item.attempts <= retries and (is_retryable is None or is_retryable(error))
+
+
+def map_sync(
+    invoke: Callable[[T], R],
+    inputs: Iterable[T],
+    concurrency: int,
+    ordered: bool = True,
+    retries: int = 0,
+    return_exceptions: bool = False,
+    is_retryable: Callable[[BaseException], bool] | None = None,
+) -> Iterator[R]:
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    collector = _Collector(ordered=ordered, return_exceptions=return_exceptions)
+    source = (_Item(index, value) for index, value in enumerate(inputs))
+    in_flight: dict[Future[R], _Item] = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+
+        def submit(item: _Item) -> None:
+            item.attempts += 1
+            # In a copy of the caller's context, so that `pare.deadline` blocks apply
+            context = contextvars.copy_context()
+            in_flight[executor.submit(context.run, invoke, item.value)] = item
+
+        # Only pull as many inputs as we can run, so large or lazy iterables stay cheap
+        for item in source:
+            submit(item)
+            if len(in_flight) >= concurrency:
+                break
+
+        try:
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = in_flight.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        collector.complete(item, future.result())
+                    elif _should_retry(item, error, retries, is_retryable):
+                        submit(item)
+                        continue
+                    else:
+                        collector.fail(item, error)
+                    next_item = next(source, None)
+                    if next_item is not None:
+                        submit(next_item)
+                yield from collector.drain()
+        finally:
+            # Stop queued work if the caller abandons the iterator early
+            for future in in_flight:
+                future.cancel()
+
+    collector.raise_for_failures()
+
+
+async def map_async(
+    invoke: Callable[[T], Awaitable[R]],
+    inputs: Iterable[T] | AsyncIterable[T],
+    concurrency: int,
+    ordered: bool = True,
+    retries: int = 0,
+    return_exceptions: bool = False,
+    is_retryable: Callable[[BaseException], bool] | None = None,
+) -> AsyncIterator[R]:
+    import asyncio
+
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    collector = _Collector(ordered=ordered, return_exceptions=return_exceptions)
+    source = _aenumerate(inputs)
+    in_flight: dict[asyncio.Future[R], _Item] = {}
+    exhausted = False
+
+    def submit(item: _Item) -> None:
+        item.attempts += 1
+        in_flight[asyncio.ensure_future(invoke(item.value))] = item
+
+    async def fill() -> None:
+        nonlocal exhausted
+        while not exhausted and len(in_flight) < concurrency:
+            try:
+                submit(await source.__anext__())
+            except StopAsyncIteration:
+                exhausted = True
+
+    try:
+        await fill()
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                item = in_flight.pop(future)
+                error = future.exception()
+                if error is None:
+                    collector.complete(item, future.result())
+                elif _should_retry(item, error, retries, is_retryable):
+                    submit(item)
+                else:
+                    collector.fail(item, error)
+            await fill()
+            for result in collector.drain():
+                yield result
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+    collector.raise_for_failures()
+
+
+async def _aenumerate(inputs: Iterable[T] | AsyncIterable[T]) -> AsyncIterator[_Item]:
+    index = 0
+    if hasattr(inputs, "__aiter__"):
+        async for value in inputs:  # type: ignore
+            yield _Item(index, value)
+            index += 1
+    else:
+        for value in inputs:  # type: ignore
+            yield _Item(index, value)
+            index += 1
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import concurrent.futures
+import contextvars
+import threading
+from concurrent.futures import ALL_COMPLETED, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, TypeVar
+
+from pare import settings
+from pare.client import get_client
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+R = TypeVar("R")
+
+_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """The thread pool shared by every endpoint's `invoke_future`.
+
+    Sized by `PARE_FUTURE_MAX_WORKERS`, or by default to the client's connection
+    pool, so that each worker thread can hold a pooled keep-alive connection.
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PARE_FUTURE_MAX_WORKERS or get_client().pool_size,
+                thread_name_prefix="pare-invoke",
+            )
+        return _executor
+
+
+def submit(fn: Callable[..., R], *args: Any, **kwargs: Any) -> Future[R]:
+    # Run in a copy of the caller's context, so that `pare.deadline` blocks apply
+    context = contextvars.copy_context()
+    return get_executor().submit(context.run, fn, *args, **kwargs)
+
+
+def wait(
+    fs: Iterable[Future[R]],
+    timeout: float | None = None,
+    return_when: str = ALL_COMPLETED,
+) -> tuple[set[Future[R]], set[Future[R]]]:
+    """Wait for futures from `invoke_future`, returning the `(done, not_done)` sets.
+
+    Behaves like `concurrent.futures.wait`, including its `return_when` options.
+    """
+    return concurrent.futures.wait(fs, timeout=timeout, return_when=return_when)
+
+
+def as_completed(
+    fs: Iterable[Future[R]], timeout: float | None = None
+) -> Iterator[Future[R]]:
+    """Yield futures from `invoke_future` as they finish, like `concurrent.futures.as_completed`.
+
+    Raises `TimeoutError` if some are still running after `timeout` seconds.
+    """
+    return concurrent.futures.as_completed(fs, timeout=timeout)
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Generator, Generic, Iterable, Mapping, TypeVar
+from urllib.parse import unquote, urlparse
+
+from pare import errors, settings
+from pare.sdk.codec import JSONCodec, decode_event_response
+from pare.sdk.transport import (
+    RemoteInvocationArguments,
+    get_invoke_result,
+    get_job_response,
+    get_job_statuses,
+    invoke_errors,
+    submit_invocation,
+)
+
+R = TypeVar("R")
+
+PENDING = "pending"
+DONE = "done"
+UNKNOWN = "unknown"
+# Still pending when its result URL expired, so no result will ever be stored
+EXPIRED = "expired"
+
+# Added to the Lambda event of submitted invocations, holding where to store the result
+EVENT_JOB_KEY = "pare_job"
+EVENT_JOB_RESULT_URL_KEY = "result_url"
+# A `time.time()` timestamp after which the result can no longer be stored
+EVENT_JOB_EXPIRES_AT_KEY = "expires_at"
+
+JOB_FAILED_RESPONSE = {
+    "status": 500,
+    "detail": "The function failed before returning a result.",
+}
+JOB_EXPIRED_RESPONSE = {
+    "status": 504,
+    "detail": "The job expired before the function started.",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class JobStore:
+    """Starts jobs and tracks them until their results are collected."""
+
+    def submit(self, function_name: str, arguments: RemoteInvocationArguments) -> str:
+        raise NotImplementedError
+
+    def statuses(self, job_ids: list[str]) -> dict[str, str]:
+        raise NotImplementedError
+
+    def response(self, job_id: str) -> Any:
+        """The response envelope (status, result or detail) of a finished job."""
+        raise NotImplementedError
+
+
+class RemoteJobStore(JobStore):
+    """Jobs run as asynchronous Lambda invocations, tracked by the Pare API."""
+
+    def submit(self, function_name: str, arguments: RemoteInvocationArguments) -> str:
+        return submit_invocation(function_name, arguments)
+
+    def statuses(self, job_ids: list[str]) -> dict[str, str]:
+        return get_job_statuses(job_ids)
+
+    def response(self, job_id: str) -> Any:
+        return get_job_response(job_id)
+
+
+class LocalJobStore(JobStore):
+    """Runs jobs in-process against endpoint handlers, keeping results in memory.
+
+    Stands in for the Pare API when testing code that submits jobs.
+    """
+
+    def __init__(self, endpoints: Iterable[Any], max_workers: int = 4) -> None:
+        self._handlers: dict[str, Callable[[Any, Any], Any]] = {
+            endpoint.name: endpoint.as_lambda_function_url_handler()
+            for endpoint in endpoints
+        }
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._results: dict[str, bytes | None] = {}
+
+    def submit(self, function_name: str, arguments: RemoteInvocationArguments) -> str:
+        handler = self._handlers.get(function_name)
+        if handler is None:
+            raise errors.PareInvokeError(f"No local endpoint named '{function_name}'")
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._results[job_id] = None
+        event = json.loads(arguments.encode(JSONCodec()))
+        self._executor.submit(self._run, job_id, handler, event)
+        return job_id
+
+    def _run(self, job_id: str, handler: Callable[[Any, Any], Any], event: Any) -> None:
+        payload = json.dumps(handler(event, None)).encode()
+        with self._lock:
+            self._results[job_id] = payload
+
+    def statuses(self, job_ids: list[str]) -> dict[str, str]:
+        with self._lock:
+            return {
+                job_id: UNKNOWN
+                if job_id not in self._results
+                else PENDING
+                if self._results[job_id] is None
+                else DONE
+                for job_id in job_ids
+            }
+
+    def response(self, job_id: str) -> Any:
+        with self._lock:
+            payload = self._results.get(job_id)
+        if payload is None:
+            raise errors.PareInvokeError(f"Job '{job_id}' has not finished")
+        return decode_job_payload(payload)
+
+
+@lru_cache(maxsize=None)
+def get_job_store() -> JobStore:
+    return RemoteJobStore()
+
+
+def decode_job_payload(payload: bytes) -> Any:
+    """Decode a stored handler result, wrapped in an envelope for binary codecs."""
+    return decode_event_response(payload)
+
+
+def store_job_result(result_url: str, payload: bytes) -> None:
+    """Upload the handler's result for a submitted job to where the API expects it."""
+    url = urlparse(result_url)
+    if url.scheme == "file":
+        path = Path(unquote(url.path))
+        # Write then rename, so the API never sees a partial result
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return
+    import urllib.request
+
+    request = urllib.request.Request(result_url, data=payload, method="PUT")
+    with urllib.request.urlopen(request) as response:
+        response.read()
+
+
+def job_expired(job: Mapping[str, Any]) -> bool:
+    expires_at = job.get(EVENT_JOB_EXPIRES_AT_KEY)
+    return isinstance(expires_at, (int, float)) and time.time() >= expires_at
+
+
+def complete_job(job: Mapping[str, Any], result: Any) -> None:
+    """Store a submitted invocation's result, logging rather than raising on failure.
+
+    A handler raising would make Lambda retry the invocation, running the
+    function again.
+    """
+    try:
+        store_job_result(job[EVENT_JOB_RESULT_URL_KEY], json.dumps(result).encode())
+    except Exception:
+        logger.exception("Could not store the result of a submitted invocation")
+
+
+class Job(Generic[R]):
+    """Handle to an invocation started with `PareEndpoint.submit`.
+
+    Wait for the result with `result()`, or `await` the job from async code.
+    """
+
+    def __init__(self, function_name: str, job_id: str, store: JobStore) -> None:
+        self.function_name = function_name
+        self.id = job_id
+        self.store = store
+        self._response: Any = None
+
+    def __repr__(self) -> str:
+        return f"Job({self.function_name!r}, {self.id!r})"
+
+    def done(self) -> bool:
+        if self._response is None:
+            poll_jobs([self])
+        return self._response is not None
+
+    def _fetch(self) -> None:
+        with invoke_errors(self.function_name):
+            self._response = self.store.response(self.id)
+
+    def _update(self, status: str) -> None:
+        if status == DONE:
+            self._fetch()
+        elif status == UNKNOWN:
+            self._response = {"status": 404, "detail": f"Unknown job '{self.id}'"}
+        elif status == EXPIRED:
+            self._response = {
+                "status": 504,
+                "detail": f"Job '{self.id}' expired before its result was stored",
+            }
+
+    def result(self, timeout: float | None = None) -> R:
+        _, pending = wait_jobs([self], timeout=timeout)
+        if pending:
+            raise errors.PareTimeoutError(
+                f"Job '{self.id}' for '{self.function_name}' did not finish within {timeout}s"
+            )
+        return get_invoke_result(self.function_name, self._response)
+
+    async def result_async(self, timeout: float | None = None) -> R:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for interval in _poll_intervals():
+            if await loop.run_in_executor(None, self.done):
+                return get_invoke_result(self.function_name, self._response)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise errors.PareTimeoutError(
+                        f"Job '{self.id}' for '{self.function_name}' did not finish within {timeout}s"
+                    )
+                interval = min(interval, remaining)
+            await asyncio.sleep(interval)
+        raise AssertionError("unreachable")
+
+    def __await__(self) -> Generator[Any, None, R]:
+        return self.result_async().__await__()
+
+
+def _poll_intervals() -> Generator[float, None, None]:
+    interval = settings.PARE_JOB_POLL_INTERVAL
+    while True:
+        yield interval
+        interval = min(interval * 1.5, settings.PARE_JOB_MAX_POLL_INTERVAL)
+
+
+def poll_jobs(jobs: Iterable[Job[Any]]) -> list[Job[Any]]:
+    """Check on many jobs at once, with one status request per store.
+
+    Returns the jobs which have finished.
+    """
+    jobs = list(jobs)
+    by_store: dict[int, list[Job[Any]]] = {}
+    for job in jobs:
+        if job._response is None:
+            by_store.setdefault(id(job.store), []).append(job)
+    for store_jobs in by_store.values():
+        store = store_jobs[0].store
+        with invoke_errors(store_jobs[0].function_name):
+            statuses: Mapping[str, str] = store.statuses([job.id for job in store_jobs])
+        for job in store_jobs:
+            job._update(statuses.get(job.id, UNKNOWN))
+    return [job for job in jobs if job._response is not None]
+
+
+def wait_jobs(
+    jobs: Iterable[Job[Any]], timeout: float | None = None
+) -> tuple[list[Job[Any]], list[Job[Any]]]:
+    """Poll jobs until all of them finish or `timeout` elapses.
+
+    Returns the finished and the still pending jobs.
+    """
+    jobs = list(jobs)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for interval in _poll_intervals():
+        done = poll_jobs(jobs)
+        pending = [job for job in jobs if job._response is None]
+        if not pending:
+            return done, pending
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return done, pending
+            interval = min(interval, remaining)
+        time.sleep(interval)
+    raise AssertionError("unreachable")
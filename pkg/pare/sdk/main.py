@@ -1,139 +1,555 @@
 from __future__ import annotations
 
-import json
-from dataclasses import asdict, dataclass, field
-from typing import Any, Callable, Generic, TypeVar
+import functools
+import inspect
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Generic,
+    Iterable,
+    Iterator,
+    TypeVar,
+)
 
-import aiohttp
-import requests
 from typing_extensions import ParamSpec
 
 from pare import errors, settings
-from pare.client import get_client_headers
-from pare.models import ServiceRegistration
+from pare.sdk import fanout, futures, jobs, metrics
+from pare.sdk.backends import Backend, BackendOption, get_backend
+from pare.sdk.batch import Batcher, BatchPolicy
+from pare.sdk.cache import (
+    MISSING,
+    CacheOption,
+    CacheStats,
+    ResultCache,
+    deployed_version,
+    invocation_key,
+    resolve_cache_policy,
+)
+from pare.sdk.circuit import (
+    CircuitBreaker,
+    CircuitBreakerPolicy,
+    LocalExecutor,
+    is_remote_failure,
+)
+from pare.sdk.codec import (
+    EVENT_ACCEPT_ENCODING_KEY,
+    decode_event,
+    encode_event_response,
+)
+from pare.sdk.compression import negotiate_encoding, parse_accept_encoding
+from pare.sdk.deadline import (
+    check_deadline,
+    current_deadline,
+    deadline_scope,
+    expired,
+    handler_deadline,
+)
+from pare.sdk.offload import (
+    LOCAL,
+    Offloader,
+    OffloadOption,
+    OffloadStats,
+    resolve_offload_policy,
+)
+from pare.sdk.retry import Retrier, RetryPolicy
+from pare.sdk.singleflight import SingleFlight
+from pare.sdk.streaming import (
+    EVENT_STREAM_KEY,
+    ResponseStream,
+    async_stream_endpoint,
+    encode_stream,
+    encode_stream_line,
+    encode_stream_response,
+    iter_async_generator,
+    stream_endpoint,
+    supports_streaming,
+)
+from pare.sdk.transport import RemoteInvocationArguments
 
+if TYPE_CHECKING:
+    from concurrent.futures import Future
 
-@dataclass
-class RemoteInvocationArguments:
-    args: list[Any] = field(default_factory=list)
-    kwargs: dict[Any, Any] = field(default_factory=dict)
+    from pare.models import ServiceRegistration
 
+P = ParamSpec("P")
+R = TypeVar("R")
 
-def invoke_endpoint(function_name: str, arguments: RemoteInvocationArguments) -> Any:
-    try:
-        response = requests.post(
-            f"{settings.PARE_API_URL}/{settings.PARE_API_VERSION}{settings.PARE_API_INVOKE_URL_PATH}{function_name}/",
-            headers=get_client_headers(),
-            json=json.dumps(asdict(arguments)),
-        )
-        response.raise_for_status()
-        json_response = response.json()
-        json_status = json_response.get("status", 500)
-        if json_status != 200:
-            raise errors.PareInvokeError(
-                f"Function invocation for '{function_name}' failed with status: {json_status}. Detail: {json_response.get('detail', '[No detail provided]')}"
-            )
-        return json_response.get("result")
-    except requests.HTTPError as e:
-        raise errors.PareInvokeError(
-            f"Function invocation for '{function_name}' failed with status: {e.response.status_code}"
-        )
-    except Exception as e:
-        raise errors.PareInvokeError(
-            f"Could not invoke function: '{function_name}' due to error:\n{e}"
-        )
+MISSING_ARGUMENTS_RESPONSE = {
+    "status": 400,
+    "detail": "Incoming JSON should contain 'args' or 'kwargs' to invoke the function.",
+}
+DEADLINE_EXCEEDED_RESPONSE = {
+    "status": 504,
+    "detail": "The caller's deadline passed before the function started.",
+}
 
 
-async def async_invoke_endpoint(
-    function_name: str, arguments: RemoteInvocationArguments
-) -> Any:
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(
-                f"{settings.PARE_API_URL}/{settings.PARE_API_VERSION}/invoke/{function_name}/",
-                headers=get_client_headers(),
-                json=json.dumps(asdict(arguments)),
-            ) as response:
-                response.raise_for_status()
-                json_response = await response.json()
-                json_status = json_response.get("status", 500)
-                if json_status != 200:
-                    raise errors.PareInvokeError(
-                        f"Function invocation for '{function_name}' failed with status: {json_status}. Detail: {json_response.get('detail', '[No detail provided]')}"
-                    )
-                return json_response.get("result")
-        except aiohttp.ClientResponseError as e:
-            raise errors.PareInvokeError(
-                f"Function invocation for '{function_name}' failed with status: {e.status}"
-            )
-        except Exception as e:
-            raise errors.PareInvokeError(
-                f"Could not invoke function: '{function_name}' due to error:\n{e}"
-            )
+def _within_deadline(lines: Iterable[bytes], at: float | None) -> Iterator[bytes]:
+    with deadline_scope(at):
+        yield from lines
 
 
-P = ParamSpec("P")
-R = TypeVar("R")
+def _has_arguments(event: Any) -> bool:
+    return isinstance(event, dict) and ("args" in event or "kwargs" in event)
 
 
 class PareEndpoint(Generic[P, R]):
     def __init__(
-        self, func: Callable[P, R], name: str, dependencies: list[str] = []
+        self,
+        func: Callable[P, R],
+        name: str,
+        dependencies: list[str] = [],
+        cache: CacheOption = None,
+        coalesce: bool = False,
+        batch: BatchPolicy | None = None,
+        idempotent: bool = False,
+        retry: RetryPolicy | None = None,
+        circuit_breaker: CircuitBreakerPolicy | None = None,
+        offload: OffloadOption = None,
+        backend: BackendOption = None,
+        timeout: float | None = None,
     ) -> None:
+        if retry is not None and not idempotent:
+            raise ValueError(
+                f"Endpoint '{name}' must be declared idempotent=True to be retried"
+            )
         self.func = func
         self.name = name
         self.dependencies = dependencies
+        if isinstance(backend, str):
+            # Fail on unknown backend names when the endpoint is defined
+            get_backend(backend)
+        self._backend = backend
+        cache_policy = resolve_cache_policy(cache)
+        self.cache = ResultCache(name, cache_policy) if cache_policy else None
+        # Identical concurrent invocations share one remote call when coalescing
+        self.single_flight = SingleFlight() if coalesce else None
+        self.batcher: Batcher[RemoteInvocationArguments] | None = (
+            Batcher(
+                batch,
+                send=lambda batch: self.backend.invoke_batch(self, batch),
+                send_async=lambda batch: self.backend.invoke_batch_async(self, batch),
+            )
+            if batch
+            else None
+        )
+        self.idempotent = idempotent
+        self.retrier = Retrier(retry, name) if retry else None
+        self.circuit_breaker = (
+            CircuitBreaker(circuit_breaker) if circuit_breaker else None
+        )
+        # While the circuit is open, calls run `func` locally instead
+        self.local_executor = (
+            LocalExecutor(self, circuit_breaker)
+            if circuit_breaker and circuit_breaker.fallback
+            else None
+        )
+        offload_policy = resolve_offload_policy(offload)
+        self.offloader = Offloader(offload_policy) if offload_policy else None
+        # Seconds each call may take, unless a `pare.deadline` block is stricter
+        self.timeout = timeout
+
+    @property
+    def backend(self) -> Backend:
+        """The backend running invocations, `PARE_BACKEND` unless set on the endpoint."""
+        return get_backend(self._backend)
+
+    @property
+    def cache_stats(self) -> CacheStats:
+        """Hit/miss counters of the client-side result cache."""
+        return self.cache.stats if self.cache else CacheStats()
+
+    @property
+    def offload_stats(self) -> OffloadStats:
+        """Counts of calls run locally and remotely by adaptive offloading."""
+        return self.offloader.stats if self.offloader else OffloadStats()
 
     def __call__(self, *args: P.args, **kwargs: P.kwargs) -> R:
         return self.func(*args, **kwargs)
 
     def _pare_register(self) -> ServiceRegistration:
+        # Only deploys need the models, and pydantic is slow to import
+        from pare.models import ServiceRegistration
+
         return ServiceRegistration(
-            name=self.name, function=self.func.__name__, dependencies=self.dependencies
+            name=self.name,
+            function=self.func.__name__,
+            dependencies=self.dependencies,
+            streaming=inspect.isgeneratorfunction(self.func)
+            or inspect.isasyncgenfunction(self.func),
         )
 
     def as_lambda_function_url_handler(self) -> Callable[[Any, Any], Any]:
-        def _lambda_handler(event: Any, context: Any) -> Any:
+        def _respond(event: Any, context: Any) -> Any:
+            if expired():
+                return DEADLINE_EXCEEDED_RESPONSE
             if not isinstance(event, dict):
                 return {
                     "status": 400,
                     "detail": "Could not parse incoming data. The request body must be JSON.",
                 }
-            if "args" not in event and "kwargs" not in event:
-                return {
-                    "status": 400,
-                    "detail": "Incoming JSON should contain 'args' or 'kwargs' to invoke the function.",
-                }
+            encoding = negotiate_encoding(
+                parse_accept_encoding(event.get(EVENT_ACCEPT_ENCODING_KEY))  # type: ignore
+            )
+            stream = event.get(EVENT_STREAM_KEY)
             try:
-                return {
-                    "status": 200,
-                    "result": self.func(
-                        *event.get("args", []),  # type: ignore
-                        **event.get("kwargs", {}),  # type: ignore
-                    ),
-                }
+                codec, event = decode_event(event)  # type: ignore
+            except Exception as e:
+                return {"status": 400, "detail": f"Could not decode arguments: {e}"}
+            if stream:
+                lines = self._stream_lines(event)
+                if supports_streaming(context):
+                    # Chunks are produced as the runtime sends them, after the handler
+                    # has returned, so they need the deadline applied again
+                    return ResponseStream(_within_deadline(lines, current_deadline()))
+                # Runtimes which buffer handler responses receive the whole stream
+                return encode_stream_response(lines)
+            if "batch" in event:
+                batch = event["batch"]
+                response = (
+                    {
+                        "status": 200,
+                        "result": [self._run_invocation(item) for item in batch],
+                    }
+                    if isinstance(batch, list)
+                    else {"status": 400, "detail": "'batch' should be a list."}
+                )
+            else:
+                response = self._run_invocation(event)
+            try:
+                return encode_event_response(codec, response, encoding=encoding)
             except Exception as e:
-                return {"status": 500, "detail": str(e)}
+                return {"status": 500, "detail": f"Could not encode result: {e}"}
+
+        def _handle(event: Any, context: Any) -> Any:
+            # Lets the function check `pare.remaining_time()`, and limits its own invocations
+            with deadline_scope(handler_deadline(event, context)):
+                return _respond(event, context)
+
+        def _lambda_handler(event: Any, context: Any) -> Any:
+            job = event.get(jobs.EVENT_JOB_KEY) if isinstance(event, dict) else None
+            if not job:
+                return _handle(event, context)
+            # Nobody waits on submitted invocations, so the result is stored for the
+            # client, even if the handler fails; errors aren't raised, since Lambda
+            # would retry the invocation and run the function again
+            result: Any = jobs.JOB_FAILED_RESPONSE
+            try:
+                if jobs.job_expired(job):
+                    result = jobs.JOB_EXPIRED_RESPONSE
+                else:
+                    result = _handle(event, context)
+            except Exception as e:
+                result = {"status": 500, "detail": str(e)}
+            finally:
+                jobs.complete_job(job, result)
+            return result
 
         return _lambda_handler
 
-    def invoke(self, *args: P.args, **kwargs: P.kwargs) -> Callable[P, R]:
-        return invoke_endpoint(
-            self.name,
-            RemoteInvocationArguments(args=args, kwargs=kwargs),  # type: ignore
+    def _call(self, event: Any) -> Any:
+        return self.func(
+            *event.get("args", []),  # type: ignore
+            **event.get("kwargs", {}),  # type: ignore
         )
 
+    def _run_invocation(self, event: Any) -> dict[str, Any]:
+        if not _has_arguments(event):
+            return MISSING_ARGUMENTS_RESPONSE
+        try:
+            result = self._call(event)
+            if inspect.isgenerator(result) or inspect.isasyncgen(result):
+                # Generator endpoints invoked without streaming return every chunk
+                result = list(self._iter_chunks(result))
+            return {"status": 200, "result": result}
+        except Exception as e:
+            return {"status": 500, "detail": str(e)}
+
+    def _iter_chunks(self, result: Any) -> Iterator[Any]:
+        if inspect.isasyncgen(result):
+            return iter_async_generator(result)
+        if inspect.isgenerator(result):
+            return result
+        raise TypeError(f"Endpoint '{self.name}' is not a generator function")
+
+    def _stream_lines(self, event: Any) -> Iterator[bytes]:
+        if not _has_arguments(event):
+            yield encode_stream_line(MISSING_ARGUMENTS_RESPONSE)
+            return
+        try:
+            chunks = self._iter_chunks(self._call(event))
+        except Exception as e:
+            yield encode_stream_line({"status": 500, "detail": str(e)})
+            return
+        yield from encode_stream(chunks)
+
+    def _invoke(self, arguments: RemoteInvocationArguments) -> Any:
+        if self.offloader is None:
+            return self._invoke_remote(arguments)
+        size = self.offloader.size(arguments.args, arguments.kwargs)
+        where = self.offloader.choose(size)
+        metrics.increment(self.name, "offload", labels={"path": where})
+        started = time.monotonic()
+        if where == LOCAL:
+            result = self.func(*arguments.args, **arguments.kwargs)
+        else:
+            result = self._invoke_remote(arguments)
+        self.offloader.record(where, size, time.monotonic() - started)
+        return result
+
+    async def _invoke_async(self, arguments: RemoteInvocationArguments) -> Any:
+        import asyncio
+
+        if self.offloader is None:
+            return await self._invoke_remote_async(arguments)
+        size = self.offloader.size(arguments.args, arguments.kwargs)
+        where = self.offloader.choose(size)
+        metrics.increment(self.name, "offload", labels={"path": where})
+        started = time.monotonic()
+        if where == LOCAL:
+            # Run in a thread, so a slow function doesn't block the event loop
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(self.func, *arguments.args, **arguments.kwargs)
+            )
+        else:
+            result = await self._invoke_remote_async(arguments)
+        self.offloader.record(where, size, time.monotonic() - started)
+        return result
+
+    def _invoke_remote(self, arguments: RemoteInvocationArguments) -> Any:
+        def call() -> Any:
+            check_deadline(self.name)
+            if self.batcher is not None:
+                return self.batcher.call(arguments)
+            return self.backend.invoke(self, arguments)
+
+        def remote() -> Any:
+            if self.retrier is not None:
+                return self.retrier.call(call)
+            return call()
+
+        if self.circuit_breaker is None:
+            return remote()
+        try:
+            return self.circuit_breaker.call(remote)
+        except Exception as e:
+            if not self._should_fall_back(e):
+                raise
+        assert self.local_executor is not None
+        metrics.increment(self.name, "local_fallbacks")
+        return self.local_executor.run(arguments.args, arguments.kwargs)
+
+    async def _invoke_remote_async(self, arguments: RemoteInvocationArguments) -> Any:
+        async def call() -> Any:
+            check_deadline(self.name)
+            if self.batcher is not None:
+                return await self.batcher.submit_async(arguments)
+            return await self.backend.invoke_async(self, arguments)
+
+        async def remote() -> Any:
+            if self.retrier is not None:
+                return await self.retrier.call_async(call)
+            return await call()
+
+        if self.circuit_breaker is None:
+            return await remote()
+        try:
+            return await self.circuit_breaker.call_async(remote)
+        except Exception as e:
+            if not self._should_fall_back(e):
+                raise
+        assert self.local_executor is not None
+        metrics.increment(self.name, "local_fallbacks")
+        return await self.local_executor.run_async(arguments.args, arguments.kwargs)
+
+    def _should_fall_back(self, error: Exception) -> bool:
+        if self.local_executor is None:
+            return False
+        if isinstance(error, errors.PareCircuitOpenError):
+            return True
+        # A failed call may still have run remotely, so only run it again if that's safe
+        return self.idempotent and is_remote_failure(error)
+
+    def _call_deadline(self) -> float | None:
+        return time.monotonic() + self.timeout if self.timeout is not None else None
+
+    def _result_cache(self) -> ResultCache | None:
+        # Without a known deploy version, results of a previous deploy would be reused
+        if self.cache is None or deployed_version() is None:
+            return None
+        return self.cache
+
+    def invoke(self, *args: P.args, **kwargs: P.kwargs) -> Callable[P, R]:
+        with deadline_scope(self._call_deadline()):
+            return self._invoke_cached(args, kwargs)
+
+    def _invoke_cached(self, args: Any, kwargs: Any) -> Any:
+        arguments = RemoteInvocationArguments(args=args, kwargs=kwargs)
+        cache = self._result_cache()
+        if cache is None and self.single_flight is None:
+            return self._invoke(arguments)
+
+        key = invocation_key(self.name, args, kwargs)
+        if cache is not None:
+            result = cache.get(key)
+            if result is not MISSING:
+                return result
+
+        def call() -> Any:
+            result = self._invoke(arguments)
+            if cache is not None:
+                cache.set(key, result)
+            return result
+
+        if self.single_flight is not None:
+            return self.single_flight.do(key, call)
+        return call()
+
     async def invoke_async(self, *args: P.args, **kwargs: P.kwargs) -> Callable[P, R]:
-        return await async_invoke_endpoint(
-            self.name,
-            RemoteInvocationArguments(args=args, kwargs=kwargs),  # type: ignore
+        with deadline_scope(self._call_deadline()):
+            return await self._invoke_cached_async(args, kwargs)
+
+    async def _invoke_cached_async(self, args: Any, kwargs: Any) -> Any:
+        arguments = RemoteInvocationArguments(args=args, kwargs=kwargs)
+        cache = self._result_cache()
+        if cache is None and self.single_flight is None:
+            return await self._invoke_async(arguments)
+
+        key = invocation_key(self.name, args, kwargs)
+        if cache is not None:
+            result = cache.get(key)
+            if result is not MISSING:
+                return result
+
+        async def call() -> Any:
+            result = await self._invoke_async(arguments)
+            if cache is not None:
+                cache.set(key, result)
+            return result
+
+        if self.single_flight is not None:
+            return await self.single_flight.do_async(key, call)
+        return await call()
+
+    def invoke_future(self, *args: P.args, **kwargs: P.kwargs) -> Future[R]:
+        """Start `invoke` on the shared thread pool, returning a `concurrent.futures.Future`.
+
+        Use `pare.wait` or `pare.as_completed` to collect the results of many calls.
+        """
+        return futures.submit(self.invoke, *args, **kwargs)  # type: ignore
+
+    def stream(self, *args: P.args, **kwargs: P.kwargs) -> Iterator[Any]:
+        """Invoke a generator endpoint remotely, yielding its chunks as they arrive.
+
+        The endpoint's `timeout`, and any enclosing `pare.deadline`, limit the
+        whole stream from when this is called.
+        """
+        arguments = RemoteInvocationArguments(args=args, kwargs=kwargs)  # type: ignore
+        with deadline_scope(self._call_deadline()):
+            return stream_endpoint(self.name, arguments)
+
+    def stream_async(self, *args: P.args, **kwargs: P.kwargs) -> AsyncIterator[Any]:
+        """Async version of `stream`, usable with `async for`."""
+        arguments = RemoteInvocationArguments(args=args, kwargs=kwargs)  # type: ignore
+        with deadline_scope(self._call_deadline()):
+            return async_stream_endpoint(self.name, arguments)
+
+    def submit(self, *args: P.args, **kwargs: P.kwargs) -> jobs.Job[R]:
+        """Start a remote invocation without waiting for it to finish.
+
+        Returns a `Job` handle; use `job.result(timeout)` or `await job` for the result.
+        """
+        store = jobs.get_job_store()
+        arguments = RemoteInvocationArguments(args=args, kwargs=kwargs)  # type: ignore
+        return jobs.Job(self.name, store.submit(self.name, arguments), store)
+
+    def map(
+        self,
+        inputs: Iterable[Any],
+        concurrency: int = settings.PARE_MAP_CONCURRENCY,
+        ordered: bool = True,
+        retries: int = 0,
+        return_exceptions: bool = False,
+    ) -> Iterator[Any]:
+        """Invoke the endpoint remotely once per input, yielding results as they finish.
+
+        At most `concurrency` invocations are in flight at a time. Inputs failing
+        with a connection error or one of the retry policy's `retry_statuses` are
+        retried up to `retries` times, which requires `idempotent=True`. Inputs that
+        still fail are either yielded as exceptions (`return_exceptions=True`) or
+        reported together in a `PareMapError` once every other result has been
+        yielded.
+        """
+        return fanout.map_sync(
+            self.invoke,  # type: ignore
+            inputs,
+            concurrency=concurrency,
+            ordered=ordered,
+            retries=retries,
+            return_exceptions=return_exceptions,
+            is_retryable=self._map_retry_check(retries),
         )
 
+    def map_async(
+        self,
+        inputs: Iterable[Any] | AsyncIterable[Any],
+        concurrency: int = settings.PARE_MAP_CONCURRENCY,
+        ordered: bool = True,
+        retries: int = 0,
+        return_exceptions: bool = False,
+    ) -> AsyncIterator[Any]:
+        """Async version of `map`, usable with `async for`."""
+        return fanout.map_async(
+            self.invoke_async,  # type: ignore
+            inputs,
+            concurrency=concurrency,
+            ordered=ordered,
+            retries=retries,
+            return_exceptions=return_exceptions,
+            is_retryable=self._map_retry_check(retries),
+        )
+
+    def _map_retry_check(self, retries: int) -> Callable[[BaseException], bool]:
+        if retries and not self.idempotent:
+            raise ValueError(
+                f"Endpoint '{self.name}' must be declared idempotent=True to be retried"
+            )
+        policy = self.retrier.policy if self.retrier is not None else RetryPolicy()
+        return policy.is_retryable
+
 
 def endpoint(
-    name: str, dependencies: list[str] = []
+    name: str,
+    dependencies: list[str] = [],
+    cache: CacheOption = None,
+    coalesce: bool = False,
+    batch: BatchPolicy | None = None,
+    idempotent: bool = False,
+    retry: RetryPolicy | None = None,
+    circuit_breaker: CircuitBreakerPolicy | None = None,
+    offload: OffloadOption = None,
+    backend: BackendOption = None,
+    timeout: float | None = None,
 ) -> Callable[[Callable[P, R]], PareEndpoint[P, R]]:
     def decorator(func: Callable[P, R]) -> PareEndpoint[P, R]:
-        return PareEndpoint(func, name, dependencies)
+        return PareEndpoint(
+            func,
+            name,
+            dependencies,
+            cache=cache,
+            coalesce=coalesce,
+            batch=batch,
+            idempotent=idempotent,
+            retry=retry,
+            circuit_breaker=circuit_breaker,
+            offload=offload,
+            backend=backend,
+            timeout=timeout,
+        )
 
     return decorator
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Mapping
+
+from pare import errors
+
+# Phases of a remote invocation, as seen by the client
+ENCODE = "encode"
+NETWORK = "network"
+SERVER = "server"
+DECODE = "decode"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+SERVER_TIMING_HEADER = "Server-Timing"
+_SERVER_TIMING_DURATION = re.compile(r"dur=([0-9.]+)")
+
+
+class MetricsHook:
+    """Receives client-side measurements of endpoint invocations.
+
+    Subclasses override the methods for the measurements they're interested in.
+    """
+
+    def observe(self, endpoint: str, phase: str, seconds: float) -> None:
+        """Record the time spent in one phase of an invocation."""
+
+    def increment(
+        self,
+        endpoint: str,
+        counter: str,
+        value: int = 1,
+        labels: Mapping[str, str] | None = None,
+    ) -> None:
+        """Add to a counter such as `status`, `retries`, `bytes_sent` or `bytes_received`."""
+
+
+_hooks: list[MetricsHook] = []
+
+
+def add_hook(hook: MetricsHook) -> None:
+    _hooks.append(hook)
+
+
+def remove_hook(hook: MetricsHook) -> None:
+    _hooks.remove(hook)
+
+
+def enabled() -> bool:
+    return bool(_hooks)
+
+
+def observe(endpoint: str, phase: str, seconds: float) -> None:
+    for hook in _hooks:
+        hook.observe(endpoint, phase, seconds)
+
+
+def increment(
+    endpoint: str,
+    counter: str,
+    value: int = 1,
+    labels: Mapping[str, str] | None = None,
+) -> None:
+    for hook in _hooks:
+        hook.increment(endpoint, counter, value, labels)
+
+
+def server_time(headers: Mapping[str, str]) -> float | None:
+    """Seconds the API reported spending on a request, from its `Server-Timing` header."""
+    header = headers.get(SERVER_TIMING_HEADER)
+    if not header:
+        return None
+    durations = _SERVER_TIMING_DURATION.findall(header)
+    return sum(float(duration) for duration in durations) / 1000 if durations else None
+
+
+class PhaseTimer:
+    """Times the phases of one invocation, reporting each to the installed hooks."""
+
+    def __init__(self, endpoint: str) -> None:
+        self.endpoint = endpoint
+        self._last = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        now = time.perf_counter()
+        observe(self.endpoint, phase, now - self._last)
+        self._last = now
+
+    def response(
+        self, status: int, headers: Mapping[str, str], sent: int, received: int
+    ) -> None:
+        """Record a response, splitting its round trip into network and server time."""
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        server = server_time(headers)
+        if server is not None:
+            observe(self.endpoint, SERVER, server)
+            elapsed = max(elapsed - server, 0.0)
+        observe(self.endpoint, NETWORK, elapsed)
+        increment(self.endpoint, "status", labels={"status": str(status)})
+        increment(self.endpoint, "bytes_sent", sent)
+        increment(self.endpoint, "bytes_received", received)
+
+
+class _NullTimer(PhaseTimer):
+    def __init__(self) -> None:
+        pass
+
+    def lap(self, phase: str) -> None:
+        pass
+
+    def response(
+        self, status: int, headers: Mapping[str, str], sent: int, received: int
+    ) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(endpoint: str) -> PhaseTimer:
+    # Without hooks there is nothing to report, so don't measure anything
+    return PhaseTimer(endpoint) if _hooks else _NULL_TIMER
+
+
+class CallbackHook(MetricsHook):
+    """Passes measurements to plain functions."""
+
+    def __init__(
+        self,
+        on_observe: Callable[[str, str, float], Any] | None = None,
+        on_increment: Callable[[str, str, int, Mapping[str, str] | None], Any]
+        | None = None,
+    ) -> None:
+        self.on_observe = on_observe
+        self.on_increment = on_increment
+
+    def observe(self, endpoint: str, phase: str, seconds: float) -> None:
+        if self.on_observe is not None:
+            self.on_observe(endpoint, phase, seconds)
+
+    def increment(
+        self,
+        endpoint: str,
+        counter: str,
+        value: int = 1,
+        labels: Mapping[str, str] | None = None,
+    ) -> None:
+        if self.on_increment is not None:
+            self.on_increment(endpoint, counter, value, labels)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        # One count per bucket, plus one for observations above the largest
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Mapping[str, str]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+class MetricsRegistry(MetricsHook):
+    """Aggregates measurements in memory, rendering them in the Prometheus text format."""
+
+    def __init__(
+        self, buckets: tuple[float, ...] = DEFAULT_BUCKETS, prefix: str = "pare_client"
+    ) -> None:
+        self.buckets = buckets
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms: dict[tuple[str, str], Histogram] = {}
+        self._counters: dict[tuple[str, str, tuple[tuple[str, str], ...]], int] = {}
+
+    def observe(self, endpoint: str, phase: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get((endpoint, phase))
+            if histogram is None:
+                histogram = self._histograms[(endpoint, phase)] = Histogram(
+                    self.buckets
+                )
+            histogram.observe(seconds)
+
+    def increment(
+        self,
+        endpoint: str,
+        counter: str,
+        value: int = 1,
+        labels: Mapping[str, str] | None = None,
+    ) -> None:
+        key = (counter, endpoint, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def histogram(self, endpoint: str, phase: str) -> Histogram | None:
+        return self._histograms.get((endpoint, phase))
+
+    def counter(self, endpoint: str, counter: str, **labels: str) -> int:
+        return self._counters.get((counter, endpoint, tuple(sorted(labels.items()))), 0)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            name = f"{self.prefix}_phase_seconds"
+            if self._histograms:
+                lines.append(f"# TYPE {name} histogram")
+            for (endpoint, phase), histogram in sorted(self._histograms.items()):
+                labels = _format_labels({"endpoint": endpoint, "phase": phase})
+                cumulative = 0
+                for bound, count in zip((*self.buckets, "+Inf"), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+            typed: set[str] = set()
+            for (counter, endpoint, extra), value in sorted(self._counters.items()):
+                name = f"{self.prefix}_{counter}_total"
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} counter")
+                labels = _format_labels({"endpoint": endpoint, **dict(extra)})
+                lines.append(f"{name}{{{labels}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class OpenTelemetryHook(MetricsHook):
+    """Records measurements as OpenTelemetry metrics; requires `opentelemetry-api` (`pare[opentelemetry]`)."""
+
+    def __init__(self, meter: Any = None) -> None:
+        if meter is None:
+            try:
+                from opentelemetry import metrics
+            except ImportError:
+                raise errors.PareError(
+                    "OpenTelemetry metrics require opentelemetry-api. Install it with 'pip install pare[opentelemetry]'."
+                )
+            meter = metrics.get_meter("pare")
+        self.meter = meter
+        self._histogram = meter.create_histogram(
+            "pare.client.phase.duration",
+            unit="s",
+            description="Time spent in each phase of a remote invocation",
+        )
+        self._lock = threading.Lock()
+        self._counters: dict[str, Any] = {}
+
+    def observe(self, endpoint: str, phase: str, seconds: float) -> None:
+        self._histogram.record(seconds, {"endpoint": endpoint, "phase": phase})
+
+    def increment(
+        self,
+        endpoint: str,
+        counter: str,
+        value: int = 1,
+        labels: Mapping[str, str] | None = None,
+    ) -> None:
+        with self._lock:
+            instrument = self._counters.get(counter)
+            if instrument is None:
+                instrument = self._counters[counter] = self.meter.create_counter(
+                    f"pare.client.{counter}"
+                )
+        instrument.add(value, {"endpoint": endpoint, **(labels or {})})
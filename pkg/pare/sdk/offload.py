@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import random
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Union
+
+LOCAL = "local"
+REMOTE = "remote"
+
+
+@dataclass(frozen=True)
+class OffloadPolicy:
+    """Configures adaptive offloading, which runs each call wherever it is predicted to finish first.
+
+    The duration of local and remote calls is estimated as a linear function of
+    the input size, given by `size(*args, **kwargs)` (by default, the total
+    `len()` of the arguments that have one). Each estimate is used once it has
+    `min_samples` observations, weighing older ones down by `decay`. A fraction
+    `explore_rate` of calls goes to the path predicted to be slower, keeping
+    both estimates current.
+    """
+
+    size: Callable[..., float] | None = None
+    min_samples: int = 5
+    decay: float = 0.95
+    explore_rate: float = 0.05
+
+
+OffloadOption = Union[OffloadPolicy, str, None]
+
+
+@dataclass(frozen=True)
+class OffloadStats:
+    local: int = 0
+    remote: int = 0
+    # Calls sent to the path predicted to be slower, to refine its estimate
+    explored: int = 0
+
+
+def resolve_offload_policy(offload: OffloadOption) -> OffloadPolicy | None:
+    if offload == "auto":
+        return OffloadPolicy()
+    if isinstance(offload, str):
+        raise ValueError(f"Unknown offload mode '{offload}', expected 'auto'")
+    return offload
+
+
+def default_size(*args: Any, **kwargs: Any) -> float:
+    return sum(
+        len(value) for value in (*args, *kwargs.values()) if hasattr(value, "__len__")
+    )
+
+
+class CostModel:
+    """Running least-squares estimate of a call's duration from its input size."""
+
+    def __init__(self, decay: float) -> None:
+        self.decay = decay
+        self.count = 0
+        self._lock = threading.Lock()
+        # Exponentially weighted sums of 1, x, y, x*x and x*y
+        self._w = self._x = self._y = self._xx = self._xy = 0.0
+
+    def record(self, size: float, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            d = self.decay
+            self._w = self._w * d + 1
+            self._x = self._x * d + size
+            self._y = self._y * d + seconds
+            self._xx = self._xx * d + size * size
+            self._xy = self._xy * d + size * seconds
+
+    def predict(self, size: float) -> float:
+        with self._lock:
+            if not self._w:
+                return 0.0
+            variance = self._w * self._xx - self._x * self._x
+            slope = (
+                (self._w * self._xy - self._x * self._y) / variance
+                if variance > 1e-12 * self._w * self._w
+                else 0.0
+            )
+            # Duration can't shrink with larger inputs; treat that as noise
+            slope = max(slope, 0.0)
+            intercept = (self._y - slope * self._x) / self._w
+        return max(intercept + slope * size, 0.0)
+
+
+class Offloader:
+    def __init__(self, policy: OffloadPolicy) -> None:
+        self.policy = policy
+        self.local = CostModel(policy.decay)
+        self.remote = CostModel(policy.decay)
+        self._lock = threading.Lock()
+        self._stats = OffloadStats()
+
+    @property
+    def stats(self) -> OffloadStats:
+        return self._stats
+
+    def size(self, args: Any, kwargs: dict[str, Any]) -> float:
+        return (self.policy.size or default_size)(*args, **kwargs)
+
+    def choose(self, size: float) -> str:
+        """Where to run a call with the given input size."""
+        min_samples = self.policy.min_samples
+        explored = False
+        if self.local.count < min_samples or self.remote.count < min_samples:
+            # Alternate until both paths have been measured
+            where = LOCAL if self.local.count <= self.remote.count else REMOTE
+        else:
+            faster, slower = (
+                (LOCAL, REMOTE)
+                if self.local.predict(size) <= self.remote.predict(size)
+                else (REMOTE, LOCAL)
+            )
+            explored = random.random() < self.policy.explore_rate
+            where = slower if explored else faster
+        with self._lock:
+            self._stats = replace(
+                self._stats,
+                **{where: getattr(self._stats, where) + 1},
+                explored=self._stats.explored + explored,
+            )
+        return where
+
+    def record(self, where: str, size: float, seconds: float) -> None:
+        (self.local if where == LOCAL else self.remote).record(size, seconds)
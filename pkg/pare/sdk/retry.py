@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, TypeVar
+
+from pare import errors
+from pare.sdk import metrics
+from pare.sdk.deadline import remaining_time
+
+R = TypeVar("R")
+
+
+@lru_cache(maxsize=1)
+def retryable_errors() -> tuple[type[BaseException], ...]:
+    """Network failures where the request may never have reached the function."""
+    import asyncio
+
+    import aiohttp
+    import requests
+
+    return (
+        requests.ConnectionError,
+        requests.Timeout,
+        aiohttp.ClientConnectionError,
+        asyncio.TimeoutError,
+    )
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Configures retries of failed remote invocations of an idempotent endpoint.
+
+    Calls failing with one of `retry_statuses` (or a connection error) are retried
+    up to `max_attempts` times in total, sleeping a random time of up to
+    `backoff_base * 2 ** attempt` (capped at `backoff_max`) in between. No retry
+    starts after `deadline` seconds have passed since the first attempt.
+
+    With `hedge=True`, a second attempt is sent when the first hasn't answered
+    within the endpoint's observed `hedge_quantile` latency, and whichever
+    finishes first is used. Async calls cancel the slower attempt; sync calls
+    run each hedged attempt in its own thread and can't stop the slower one, so
+    its result is discarded when it finishes.
+    """
+
+    max_attempts: int = 3
+    retry_statuses: frozenset[int] = frozenset({429, 502, 503, 504})
+    backoff_base: float = 0.1
+    backoff_max: float = 2.0
+    deadline: float | None = None
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    # Latencies observed before hedging starts
+    hedge_min_samples: int = 20
+
+    def is_retryable(self, error: BaseException) -> bool:
+        if not isinstance(error, errors.PareInvokeError) or isinstance(
+            # Errors reported by the function mean it already ran
+            error,
+            (errors.PareFunctionError, errors.PareDeadlineExceededError),
+        ):
+            return False
+        if error.status is not None:
+            return error.status in self.retry_statuses
+        return isinstance(error.__cause__, retryable_errors())
+
+    def backoff(self, attempt: int) -> float:
+        # "Full jitter", which spreads out retries from many clients
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+
+class LatencyTracker:
+    """Keeps the most recent latencies of successful calls."""
+
+    def __init__(self, size: int = 256) -> None:
+        self._lock = threading.Lock()
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 1) -> float | None:
+        with self._lock:
+            if len(self._samples) < max(min_samples, 1):
+                return None
+            samples = sorted(self._samples)
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+def _start_attempt(func: Callable[[], R]) -> Future[R]:
+    """Run a hedged attempt in a thread of its own.
+
+    A shared pool would queue hedges behind the attempts they are meant to race
+    (e.g. under `map`), so each attempt gets its own thread instead.
+    """
+    future: Future[R] = Future()
+    # Attempts run in a copy of the caller's context, which holds its deadline
+    context = contextvars.copy_context()
+
+    def run() -> None:
+        try:
+            future.set_result(context.run(func))
+        except BaseException as e:
+            future.set_exception(e)
+
+    future.set_running_or_notify_cancel()
+    threading.Thread(target=run, name="pare-hedge", daemon=True).start()
+    return future
+
+
+class Retrier:
+    def __init__(self, policy: RetryPolicy, function_name: str = "") -> None:
+        self.policy = policy
+        self.function_name = function_name
+        self.latencies = LatencyTracker()
+
+    def _hedge_delay(self) -> float | None:
+        if not self.policy.hedge:
+            return None
+        return self.latencies.quantile(
+            self.policy.hedge_quantile, self.policy.hedge_min_samples
+        )
+
+    def _next_backoff(self, attempt: int, started: float, error: Exception) -> float:
+        """Time to wait before the next attempt; re-raises `error` if there is none."""
+        if attempt + 1 >= self.policy.max_attempts or not self.policy.is_retryable(
+            error
+        ):
+            raise error
+        delay = self.policy.backoff(attempt)
+        if (
+            self.policy.deadline is not None
+            and time.monotonic() + delay - started > self.policy.deadline
+        ):
+            raise error
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            # The retry could only start after the caller's deadline
+            raise error
+        return delay
+
+    def _timed(self, func: Callable[[], R]) -> R:
+        started = time.monotonic()
+        result = func()
+        self.latencies.record(time.monotonic() - started)
+        return result
+
+    def call(self, func: Callable[[], R]) -> R:
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                return self._attempt(func)
+            except Exception as e:
+                time.sleep(self._next_backoff(attempt, started, e))
+            attempt += 1
+            metrics.increment(self.function_name, "retries")
+
+    def _attempt(self, func: Callable[[], R]) -> R:
+        delay = self._hedge_delay()
+        if delay is None:
+            return self._timed(func)
+        pending = {_start_attempt(lambda: self._timed(func))}
+        done, pending = wait(pending, timeout=delay)
+        if not done:
+            metrics.increment(self.function_name, "hedges")
+            pending.add(_start_attempt(lambda: self._timed(func)))
+        return _first_result(pending | done)
+
+    async def call_async(self, func: Callable[[], Awaitable[R]]) -> R:
+        import asyncio
+
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt_async(func)
+            except Exception as e:
+                await asyncio.sleep(self._next_backoff(attempt, started, e))
+            attempt += 1
+            metrics.increment(self.function_name, "retries")
+
+    async def _timed_async(self, func: Callable[[], Awaitable[R]]) -> R:
+        started = time.monotonic()
+        result = await func()
+        self.latencies.record(time.monotonic() - started)
+        return result
+
+    async def _attempt_async(self, func: Callable[[], Awaitable[R]]) -> R:
+        import asyncio
+
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._timed_async(func)
+        tasks = {asyncio.ensure_future(self._timed_async(func))}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                metrics.increment(self.function_name, "hedges")
+                tasks.add(asyncio.ensure_future(self._timed_async(func)))
+            error: BaseException | None = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            # The slower attempt is no longer needed
+            for task in tasks:
+                task.cancel()
+
+
+def _first_result(futures: set[Future[Any]]) -> Any:
+    """The result of the first future to succeed, or the last error if none do."""
+    error: BaseException | None = None
+    pending = futures
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                # Running attempts can't be cancelled; their results are dropped
+                return future.result()
+            error = future.exception()
+    assert error is not None
+    raise error
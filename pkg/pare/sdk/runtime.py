@@ -0,0 +1,229 @@
+"""A Lambda runtime which can stream responses, used by deployed streaming endpoints.
+
+The managed Python runtime buffers whatever a handler returns, so generator
+endpoints could only send their chunks once they had all been produced. This
+runtime talks to the Lambda Runtime API itself: handler responses which are a
+`ResponseStream` are sent with Lambda's streaming response mode as they are
+produced, and anything else is sent as JSON, as the managed runtime would.
+
+    python -m pare.sdk.runtime lambda_function.lambda_handler
+"""
+
+from __future__ import annotations
+
+import base64
+import http.client
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+from typing import Any, Callable, Iterable, Mapping
+
+from pare.sdk.streaming import ResponseStream
+
+RUNTIME_API_VERSION = "2018-06-01"
+STREAMING_HEADERS = {
+    "Lambda-Runtime-Function-Response-Mode": "streaming",
+    "Transfer-Encoding": "chunked",
+    # Errors raised after the response has started are reported in trailers
+    "Trailer": "Lambda-Runtime-Function-Error-Type, Lambda-Runtime-Function-Error-Body",
+}
+
+
+class CognitoIdentity:
+    def __init__(self, identity: Mapping[str, Any]) -> None:
+        self.cognito_identity_id = identity.get("cognitoIdentityId")
+        self.cognito_identity_pool_id = identity.get("cognitoIdentityPoolId")
+
+
+class Client:
+    def __init__(self, client: Mapping[str, Any]) -> None:
+        self.installation_id = client.get("installation_id")
+        self.app_title = client.get("app_title")
+        self.app_version_name = client.get("app_version_name")
+        self.app_version_code = client.get("app_version_code")
+        self.app_package_name = client.get("app_package_name")
+
+
+class ClientContext:
+    def __init__(self, context: Mapping[str, Any]) -> None:
+        client = context.get("client")
+        self.client = Client(client) if client else None
+        self.custom = context.get("custom")
+        self.env = context.get("env")
+
+
+class LambdaContext:
+    """The `context` argument of handlers, as the managed runtime provides it."""
+
+    # Tells Pare handlers that they may return a `ResponseStream`
+    supports_streaming = True
+
+    def __init__(self, request_id: str, headers: Mapping[str, str]) -> None:
+        self.aws_request_id = request_id
+        self.invoked_function_arn = headers.get("Lambda-Runtime-Invoked-Function-Arn")
+        self.function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
+        self.function_version = os.environ.get("AWS_LAMBDA_FUNCTION_VERSION")
+        self.memory_limit_in_mb = os.environ.get("AWS_LAMBDA_FUNCTION_MEMORY_SIZE")
+        self.log_group_name = os.environ.get("AWS_LAMBDA_LOG_GROUP_NAME")
+        self.log_stream_name = os.environ.get("AWS_LAMBDA_LOG_STREAM_NAME")
+        # Set for invocations from the AWS Mobile SDK, as JSON headers
+        client_context = headers.get("Lambda-Runtime-Client-Context")
+        self.client_context = (
+            ClientContext(json.loads(client_context)) if client_context else None
+        )
+        identity = headers.get("Lambda-Runtime-Cognito-Identity")
+        self.identity = CognitoIdentity(json.loads(identity) if identity else {})
+        self._deadline_ms = int(headers.get("Lambda-Runtime-Deadline-Ms", 0))
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(self._deadline_ms - int(time.time() * 1000), 0)
+
+
+def error_body(error: BaseException) -> bytes:
+    return json.dumps(
+        {
+            "errorMessage": str(error),
+            "errorType": type(error).__name__,
+            "stackTrace": traceback.format_tb(error.__traceback__),
+        }
+    ).encode()
+
+
+class RuntimeClient:
+    """Fetches invocations from the Lambda Runtime API and posts their responses."""
+
+    def __init__(self, address: str) -> None:
+        self.address = address
+        self._connection: http.client.HTTPConnection | None = None
+
+    @property
+    def connection(self) -> http.client.HTTPConnection:
+        if self._connection is None:
+            # No timeout: waiting for the next invocation blocks until there is one
+            self._connection = http.client.HTTPConnection(self.address)
+        return self._connection
+
+    def _path(self, path: str) -> str:
+        return f"/{RUNTIME_API_VERSION}/runtime{path}"
+
+    def _finish(self) -> bytes:
+        try:
+            return self.connection.getresponse().read()
+        except Exception:
+            self.close()
+            raise
+
+    def _post(self, path: str, body: bytes, headers: Mapping[str, str]) -> None:
+        self.connection.request("POST", self._path(path), body=body, headers=headers)
+        self._finish()
+
+    def next_invocation(self) -> tuple[str, Mapping[str, str], bytes]:
+        """Wait for the next invocation, returning its request ID, headers and event."""
+        self.connection.request("GET", self._path("/invocation/next"))
+        response = self.connection.getresponse()
+        event = response.read()
+        return (
+            response.headers["Lambda-Runtime-Aws-Request-Id"],
+            response.headers,
+            event,
+        )
+
+    def send_response(self, request_id: str, body: bytes) -> None:
+        self._post(
+            f"/invocation/{request_id}/response",
+            body,
+            {"Content-Type": "application/json"},
+        )
+
+    def stream_response(
+        self, request_id: str, chunks: Iterable[bytes], content_type: str
+    ) -> None:
+        """Send each chunk as soon as it is produced."""
+        connection = self.connection
+        connection.putrequest("POST", self._path(f"/invocation/{request_id}/response"))
+        for name, value in {**STREAMING_HEADERS, "Content-Type": content_type}.items():
+            connection.putheader(name, value)
+        connection.endheaders()
+        trailers = b""
+        try:
+            for chunk in chunks:
+                if chunk:
+                    connection.send(b"%X\r\n%s\r\n" % (len(chunk), chunk))
+        except Exception as e:
+            traceback.print_exc()
+            trailers = (
+                b"Lambda-Runtime-Function-Error-Type: %s\r\n"
+                b"Lambda-Runtime-Function-Error-Body: %s\r\n"
+                % (type(e).__name__.encode(), base64.b64encode(error_body(e)))
+            )
+        connection.send(b"0\r\n" + trailers + b"\r\n")
+        self._finish()
+
+    def send_error(self, request_id: str, error: BaseException) -> None:
+        self._post(
+            f"/invocation/{request_id}/error",
+            error_body(error),
+            {"Lambda-Runtime-Function-Error-Type": "Unhandled"},
+        )
+
+    def send_init_error(self, error: BaseException) -> None:
+        self._post(
+            "/init/error",
+            error_body(error),
+            {"Lambda-Runtime-Function-Error-Type": "Runtime.InitError"},
+        )
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def load_handler(name: str) -> Callable[[Any, Any], Any]:
+    """Import a handler named like Lambda's `CMD`, e.g. `lambda_function.lambda_handler`."""
+    module_name, _, attribute = name.rpartition(".")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def handle_next_invocation(
+    client: RuntimeClient, handler: Callable[[Any, Any], Any]
+) -> None:
+    request_id, headers, event = client.next_invocation()
+    trace_id = headers.get("Lambda-Runtime-Trace-Id")
+    if trace_id:
+        os.environ["_X_AMZN_TRACE_ID"] = trace_id
+    try:
+        response = handler(json.loads(event), LambdaContext(request_id, headers))
+        if not isinstance(response, ResponseStream):
+            response = json.dumps(response).encode()
+    except Exception as e:
+        traceback.print_exc()
+        client.send_error(request_id, e)
+        return
+    if isinstance(response, ResponseStream):
+        client.stream_response(request_id, response, response.content_type)
+    else:
+        client.send_response(request_id, response)
+
+
+def main(argv: list[str]) -> None:
+    if len(argv) != 1:
+        sys.exit("usage: python -m pare.sdk.runtime MODULE.HANDLER")
+    # The managed runtime imports handlers from the function's code directory
+    sys.path.insert(0, os.environ.get("LAMBDA_TASK_ROOT", os.getcwd()))
+    client = RuntimeClient(os.environ["AWS_LAMBDA_RUNTIME_API"])
+    try:
+        handler = load_handler(argv[0])
+    except Exception as e:
+        traceback.print_exc()
+        client.send_init_error(e)
+        sys.exit(1)
+    while True:
+        handle_next_invocation(client, handler)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
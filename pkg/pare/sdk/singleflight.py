@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+import weakref
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, TypeVar
+
+from pare import errors
+from pare.sdk.deadline import remaining_time
+
+if TYPE_CHECKING:
+    import asyncio
+
+R = TypeVar("R")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the call; callers arriving while it is in
+    flight wait for, and receive, the same result or exception. Each waits no
+    longer than its own deadline.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[str, Future[Any]] = {}
+        self._tasks: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, asyncio.Task[Any]]
+        ] = weakref.WeakKeyDictionary()
+
+    def do(self, key: str, func: Callable[[], R]) -> R:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                leader = False
+            else:
+                leader = True
+                future = self._calls[key] = Future()
+        if not leader:
+            try:
+                return future.result(timeout=remaining_time())
+            except FutureTimeoutError:
+                if future.done():
+                    # The call itself failed with a timeout
+                    raise
+                raise _deadline_exceeded() from None
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def do_async(self, key: str, func: Callable[[], Awaitable[R]]) -> R:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        tasks = self._tasks.setdefault(loop, {})
+        task = tasks.get(key)
+        if task is None:
+            # Run the call as its own task, so cancelling any one caller
+            # (including the first) doesn't cancel it for everyone else
+            task = tasks[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda done: _finish(tasks, key, done))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), remaining_time())
+        except asyncio.TimeoutError:
+            if task.done():
+                raise
+            raise _deadline_exceeded() from None
+
+
+def _deadline_exceeded() -> errors.PareDeadlineExceededError:
+    return errors.PareDeadlineExceededError(
+        "Deadline exceeded while waiting for a coalesced invocation", status=504
+    )
+
+
+def _finish(tasks: dict[str, asyncio.Task[Any]], key: str, task: asyncio.Task[Any]):
+    if tasks.get(key) is task:
+        del tasks[key]
+    if not task.cancelled():
+        # Mark the exception as retrieved in case every caller was cancelled
+        task.exception()
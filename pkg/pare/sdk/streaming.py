@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import base64
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator
+
+from pare import errors, settings
+from pare.client import get_client
+from pare.sdk.codec import EVENT_BODY_KEY, EVENT_CODEC_KEY, JSONCodec, get_codec
+from pare.sdk.deadline import check_deadline, current_deadline, passed, time_until
+from pare.sdk.transport import (
+    RemoteInvocationArguments,
+    async_request_options,
+    build_invoke_request,
+    get_invoke_result,
+    invoke_errors,
+)
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+# Codec name of the envelope wrapping a stream which was returned all at once
+STREAM_CODEC_NAME = "ndjson"
+
+# Set in the Lambda event when the client wants the result streamed
+EVENT_STREAM_KEY = "pare_stream"
+
+# Each line of a stream holds either a chunk or, last, the final status
+STREAM_CHUNK_KEY = "chunk"
+
+
+def iter_async_generator(agen: AsyncIterator[Any]) -> Iterator[Any]:
+    """Iterate an async generator from synchronous code, one item at a time."""
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def encode_stream_line(message: dict[str, Any]) -> bytes:
+    return JSONCodec().encode(message) + b"\n"
+
+
+def encode_stream(chunks: Iterable[Any]) -> Iterator[bytes]:
+    """Encode each chunk as an NDJSON line, followed by the final status."""
+    try:
+        for chunk in chunks:
+            yield encode_stream_line({STREAM_CHUNK_KEY: chunk})
+    except Exception as e:
+        yield encode_stream_line({"status": 500, "detail": str(e)})
+    else:
+        yield encode_stream_line({"status": 200})
+
+
+class ResponseStream:
+    """A handler response which `pare.sdk.runtime` sends as it is produced."""
+
+    def __init__(
+        self, chunks: Iterable[bytes], content_type: str = NDJSON_CONTENT_TYPE
+    ) -> None:
+        self.chunks = chunks
+        self.content_type = content_type
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.chunks)
+
+
+def supports_streaming(context: Any) -> bool:
+    """Whether the runtime calling a handler can send a `ResponseStream`."""
+    return getattr(context, "supports_streaming", False) is True
+
+
+def encode_stream_response(lines: Iterable[bytes]) -> dict[str, Any]:
+    """Wrap a whole stream as the return value of a Lambda handler.
+
+    Only for runtimes which buffer handler responses anyway, such as the managed
+    Python runtime, which can't send a `ResponseStream`.
+    """
+    return {
+        EVENT_CODEC_KEY: STREAM_CODEC_NAME,
+        EVENT_BODY_KEY: base64.b64encode(b"".join(lines)).decode("ascii"),
+    }
+
+
+class StreamDecoder:
+    """Turns NDJSON lines from the invoke API back into chunks."""
+
+    def __init__(self, function_name: str) -> None:
+        self.function_name = function_name
+        self.finished = False
+        self._codec = JSONCodec()
+
+    def decode(self, line: bytes) -> Iterator[Any]:
+        if not line.strip():
+            return
+        if self.finished:
+            raise errors.PareInvokeError(
+                f"Stream for '{self.function_name}' continued after it finished"
+            )
+        message = self._codec.decode(line)
+        if STREAM_CHUNK_KEY in message:
+            yield message[STREAM_CHUNK_KEY]
+            return
+        self.finished = True
+        get_invoke_result(self.function_name, message)
+
+    def close(self) -> None:
+        if not self.finished:
+            raise errors.PareInvokeError(
+                f"Stream for '{self.function_name}' ended unexpectedly"
+            )
+
+
+async def split_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines, however long they are."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+def _stream_request(
+    arguments: RemoteInvocationArguments,
+) -> tuple[bytes, dict[str, str]]:
+    codec = get_codec(settings.PARE_CODEC)
+    body, headers = build_invoke_request(arguments.encode(codec), codec)
+    headers["Accept"] = NDJSON_CONTENT_TYPE
+    return body, headers
+
+
+def _stream_deadline_exceeded(function_name: str) -> errors.PareDeadlineExceededError:
+    return errors.PareDeadlineExceededError(
+        f"Deadline exceeded while streaming '{function_name}'", status=504
+    )
+
+
+def stream_endpoint(
+    function_name: str, arguments: RemoteInvocationArguments
+) -> Iterator[Any]:
+    """Start a streamed invocation within the current deadline.
+
+    The request is built now, with the deadline of the caller's context, since
+    the stream may be read after that context has been left.
+    """
+    check_deadline(function_name)
+    body, headers = _stream_request(arguments)
+    return _read_stream(function_name, body, headers, current_deadline())
+
+
+def _read_stream(
+    function_name: str, body: bytes, headers: dict[str, str], deadline: float | None
+) -> Iterator[Any]:
+    client = get_client()
+    decoder = StreamDecoder(function_name)
+    with invoke_errors(function_name, deadline):
+        if passed(deadline):
+            raise _stream_deadline_exceeded(function_name)
+        with client.session.post(
+            client.url(f"{settings.PARE_API_STREAM_URL_PATH}{function_name}/"),
+            headers=headers,
+            data=body,
+            stream=True,
+            # Bounds each read; requests has no timeout for the whole response
+            timeout=time_until(deadline),
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if passed(deadline):
+                    raise _stream_deadline_exceeded(function_name)
+                yield from decoder.decode(line)
+        decoder.close()
+
+
+def async_stream_endpoint(
+    function_name: str, arguments: RemoteInvocationArguments
+) -> AsyncIterator[Any]:
+    """Async version of `stream_endpoint`."""
+    check_deadline(function_name)
+    body, headers = _stream_request(arguments)
+    return _read_stream_async(function_name, body, headers, current_deadline())
+
+
+async def _read_stream_async(
+    function_name: str, body: bytes, headers: dict[str, str], deadline: float | None
+) -> AsyncIterator[Any]:
+    client = get_client()
+    decoder = StreamDecoder(function_name)
+    with invoke_errors(function_name, deadline):
+        if passed(deadline):
+            raise _stream_deadline_exceeded(function_name)
+        async with client.async_session.post(
+            client.url(f"{settings.PARE_API_STREAM_URL_PATH}{function_name}/"),
+            headers=headers,
+            data=body,
+            **async_request_options(time_until(deadline)),
+        ) as response:
+            response.raise_for_status()
+            async for line in split_lines(response.content.iter_any()):
+                for chunk in decoder.decode(line):
+                    yield chunk
+        decoder.close()
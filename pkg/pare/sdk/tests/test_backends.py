@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+
+from pare import BatchPolicy, deadline, endpoint, errors, remaining_time
+from pare.sdk.backends import LambdaBackend, LocalBackend, get_backend
+from pare.sdk.transport import RemoteInvocationArguments
+
+local = LocalBackend(max_workers=2)
+
+
+@endpoint(name="scale", backend=local)
+def scale(values: list[float], factor: float = 2.0) -> list[float]:
+    if factor < 0:
+        raise ValueError("factor must be positive")
+    return [value * factor for value in values]
+
+
+@endpoint(name="reverse", backend=local, batch=BatchPolicy(max_size=4))
+def reverse(data: bytes) -> bytes:
+    return data[::-1]
+
+
+@endpoint(name="time_left", backend=local)
+def time_left(sleep: float = 0.0) -> float | None:
+    time.sleep(sleep)
+    return remaining_time()
+
+
+def teardown_module():
+    local.shutdown()
+
+
+@pytest.mark.parametrize("codec", ["json", "msgpack"])
+def test_local_backend(codec):
+    with patch("pare.settings.PARE_CODEC", codec):
+        assert scale.invoke([1.0, 2.5], factor=3) == [3.0, 7.5]
+        assert asyncio.run(scale.invoke_async([1.0])) == [2.0]
+        with pytest.raises(errors.PareFunctionError, match="factor must be positive"):
+            scale.invoke([1.0], factor=-1)
+
+
+def test_local_backend_batches():
+    assert list(reverse.map([b"ab", b"cd", b"ef"])) == [b"ba", b"dc", b"fe"]
+
+
+def test_lambda_backend_sends_handler_event():
+    class FakeLambda:
+        def invoke(self, FunctionName, InvocationType, Payload):
+            assert FunctionName == "team_scale_abc1234"
+            handler = scale.as_lambda_function_url_handler()
+            response = handler(json.loads(Payload), None)
+            return {"Payload": io.BytesIO(json.dumps(response).encode())}
+
+    backend = LambdaBackend(function_name="team_{name}_{git_hash}")
+    with patch("pare.sdk.backends._lambda_client", return_value=FakeLambda()), patch(
+        "pare.settings.PARE_GIT_HASH", "abc1234"
+    ), patch("pare.settings.PARE_CODEC", "msgpack"):
+        assert backend.invoke(scale, RemoteInvocationArguments(args=[[4.0]])) == [8.0]
+
+
+def test_local_backend_applies_deadlines():
+    assert time_left.invoke() is None
+    with deadline(timeout=5):
+        assert 0 < time_left.invoke() <= 5
+        assert 0 < asyncio.run(time_left.invoke_async()) <= 5
+
+    started = time.monotonic()
+    with deadline(timeout=0.2), pytest.raises(errors.PareDeadlineExceededError):
+        time_left.invoke(sleep=1)
+    with deadline(timeout=0.2), pytest.raises(errors.PareDeadlineExceededError):
+        asyncio.run(time_left.invoke_async(sleep=1))
+    assert time.monotonic() - started < 1.5
+
+
+def test_lambda_backend_sends_deadline_from_async_calls():
+    events = []
+
+    class FakeLambda:
+        def invoke(self, FunctionName, InvocationType, Payload):
+            events.append(json.loads(Payload))
+            response = time_left.as_lambda_function_url_handler()(events[-1], None)
+            return {"Payload": io.BytesIO(json.dumps(response).encode())}
+
+    backend = LambdaBackend(function_name="{name}")
+
+    async def call() -> float | None:
+        with deadline(timeout=5):
+            return await backend.invoke_async(time_left, RemoteInvocationArguments())
+
+    with patch("pare.sdk.backends._lambda_client", return_value=FakeLambda()):
+        assert 0 < asyncio.run(call()) <= 5
+    assert 0 < events[0]["pare_deadline_ms"] <= 5000
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown backend"):
+        get_backend("cloud")
+
+
+def test_lambda_backend_uses_deployed_function_names():
+    backend = LambdaBackend(function_name="", username="octocat")
+    with patch("pare.settings.PARE_GIT_HASH", "abc1234"):
+        assert backend.get_function_name(scale) == "octocat_scale_abc1234"
+    with patch("pare.settings.PARE_GIT_HASH", ""), pytest.raises(
+        errors.PareInvokeError, match="PARE_GIT_HASH"
+    ):
+        backend.get_function_name(scale)
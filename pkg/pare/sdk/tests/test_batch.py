@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+import pare
+from pare import BatchPolicy, endpoint, errors
+from pare.sdk.batch import Batcher
+from pare.sdk.deadline import remaining_time
+
+
+def test_submit_flushes_full_batches_and_on_timeout():
+    batches = []
+
+    def send(items: list[int]) -> list[object]:
+        batches.append(items)
+        return [ValueError("odd") if item % 2 else item * 10 for item in items]
+
+    batcher = Batcher(BatchPolicy(max_size=4, max_wait_ms=20), send, send_async=None)  # type: ignore
+    futures = [batcher.submit(item) for item in range(6)]
+
+    assert [future.result() for future in futures[:4:2]] == [0, 20]
+    with pytest.raises(ValueError):
+        futures[1].result()
+    # The last two items are sent once the wait elapses
+    assert futures[4].result(timeout=1) == 40
+    assert batches == [[0, 1, 2, 3], [4, 5]]
+
+
+def test_submit_async_fails_whole_batch_on_send_error():
+    async def send_async(items: list[int]) -> list[int]:
+        raise ConnectionError("unreachable")
+
+    batcher = Batcher(BatchPolicy(max_size=8, max_wait_ms=1), None, send_async)  # type: ignore
+
+    async def run():
+        return await asyncio.gather(
+            *(batcher.submit_async(item) for item in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+def test_timer_flush_keeps_caller_deadline():
+    seen: list[float | None] = []
+    release = threading.Event()
+
+    def send(items: list[int]) -> list[int]:
+        seen.append(remaining_time())
+        release.wait(1)
+        return items
+
+    batcher = Batcher(BatchPolicy(max_size=8, max_wait_ms=1), send, send_async=None)  # type: ignore
+    with pare.deadline(0.2):
+        started = time.monotonic()
+        with pytest.raises(errors.PareDeadlineExceededError):
+            batcher.call(1)
+    release.set()
+    assert time.monotonic() - started < 0.5
+    assert seen[0] is not None and 0 < seen[0] <= 0.2
+
+
+def test_submit_async_honors_deadline():
+    async def send_async(items: list[int]) -> list[int]:
+        await asyncio.sleep(1)
+        return items
+
+    batcher = Batcher(BatchPolicy(max_size=8, max_wait_ms=1), None, send_async)  # type: ignore
+
+    async def run():
+        with pare.deadline(0.05):
+            await batcher.submit_async(1)
+
+    with pytest.raises(errors.PareDeadlineExceededError):
+        asyncio.run(run())
+
+
+@endpoint(name="score", batch=BatchPolicy(max_size=3, max_wait_ms=1000))
+def score(value: int) -> int:
+    if value < 0:
+        raise ValueError("negative")
+    return value * 2
+
+
+def test_handler_runs_batched_event():
+    handler = score.as_lambda_function_url_handler()
+    response = handler({"batch": [{"args": [1]}, {"kwargs": {"value": -1}}, {}]}, None)
+    assert response["status"] == 200
+    assert response["result"] == [
+        {"status": 200, "result": 2},
+        {"status": 500, "detail": "negative"},
+        {
+            "status": 400,
+            "detail": "Incoming JSON should contain 'args' or 'kwargs' to invoke the function.",
+        },
+    ]
+
+
+def test_invoke_resolves_each_caller():
+    calls = []
+
+    def fake_invoke_batch(function_name, batch):
+        calls.append(len(batch))
+        return [
+            arguments.args[0]
+            if arguments.args[0] >= 0
+            else errors.PareInvokeError("negative")
+            for arguments in batch
+        ]
+
+    with patch("pare.sdk.backends.invoke_endpoint_batch", fake_invoke_batch):
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(score.invoke, value) for value in (1, -1, 3)]
+            assert futures[0].result() == 1
+            assert futures[2].result() == 3
+            with pytest.raises(errors.PareInvokeError):
+                futures[1].result()
+    assert calls == [3]
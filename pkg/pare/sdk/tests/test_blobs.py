@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from pare import endpoint, errors
+from pare.sdk import blobs
+from pare.sdk.codec import EVENT_BLOB_KEY, decode_envelope, get_codec, spill_envelope
+from pare.sdk.transport import (
+    RemoteInvocationArguments,
+    build_invoke_request,
+    decode_invoke_response,
+)
+
+
+@pytest.fixture
+def blob_store(tmp_path: Path):
+    with patch("pare.settings.PARE_BLOB_STORE_URL", tmp_path.as_uri()), patch(
+        "pare.settings.PARE_BLOB_THRESHOLD", 1024
+    ):
+        blobs.get_blob_store.cache_clear()
+        yield tmp_path
+    blobs.get_blob_store.cache_clear()
+
+
+def test_spill_and_fetch(blob_store: Path):
+    ref = blobs.spill(b"payload")
+    assert blobs.fetch(ref) == b"payload"
+    assert blobs.spill(b"payload") == ref
+
+    Path(ref["url"][len("file://") :]).write_bytes(b"tampered")
+    with pytest.raises(errors.PareBlobError, match="checksum"):
+        blobs.fetch(ref)
+
+
+def test_small_payloads_are_not_spilled(blob_store: Path):
+    assert not blobs.should_spill(1024)
+    assert blobs.should_spill(1025)
+
+
+@endpoint(name="resize")
+def resize(image: bytes) -> bytes:
+    return image[::2]
+
+
+@pytest.mark.parametrize("name", ["json", "msgpack"])
+def test_large_arguments_and_results_travel_by_reference(blob_store: Path, name):
+    codec = get_codec(name)
+    image = bytes(range(256)) * 32
+    body, headers = build_invoke_request(
+        RemoteInvocationArguments(args=[image]).encode(codec), codec
+    )
+    event = json.loads(body)
+    assert headers["Content-Type"] == "application/json"
+    assert EVENT_BLOB_KEY in event and len(body) < 1024
+
+    response = resize.as_lambda_function_url_handler()(event, None)
+    assert EVENT_BLOB_KEY in response
+
+    content = json.dumps(response).encode()
+    result = decode_invoke_response(content, {"Content-Type": "application/json"})
+    assert result == {"status": 200, "result": image[::2]}
+
+
+def test_spilled_msgpack_is_decoded_as_it_is_read(blob_store: Path):
+    codec = get_codec("msgpack")
+    value = {"data": bytes(range(256)) * 64}
+    envelope = spill_envelope(codec, codec.encode(value))
+    with patch.object(blobs, "CHUNK_SIZE", 1024):
+        assert decode_envelope(envelope) == value
+
+    ref = envelope[EVENT_BLOB_KEY]
+    path = Path(ref["url"][len("file://") :])
+    path.write_bytes(path.read_bytes()[:-1] + b"\x00")
+    with pytest.raises(errors.PareBlobError, match="checksum"):
+        decode_envelope(envelope)
+
+
+@patch("pare.settings.PARE_MAX_PAYLOAD_SIZE", 1024)
+def test_oversize_payloads_without_a_blob_store_name_the_setting():
+    blobs.get_blob_store.cache_clear()
+    codec = get_codec("json")
+    image = bytes(range(256)) * 32
+    with pytest.raises(errors.PareInvokeError, match="PARE_BLOB_STORE_URL") as exc:
+        build_invoke_request(
+            RemoteInvocationArguments(args=[image]).encode(codec), codec
+        )
+    assert exc.value.status == 413
+
+    response = resize.as_lambda_function_url_handler()({"args": [image]}, None)
+    assert response["status"] == 413
+    assert "PARE_BLOB_STORE_URL" in response["detail"]
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import patch
+
+from pare import CachePolicy, endpoint
+from pare.sdk.cache import MISSING, ResultCache
+
+
+def test_key_is_stable_and_order_independent():
+    cache = ResultCache("fn", CachePolicy())
+    assert cache.key((1, "a"), {"x": 1, "y": 2}) == cache.key(
+        (1, "a"), {"y": 2, "x": 1}
+    )
+    assert cache.key((1, "a"), {}) != cache.key((1, "b"), {})
+    assert ResultCache("other", CachePolicy()).key((1, "a"), {}) != cache.key(
+        (1, "a"), {}
+    )
+
+
+def test_lru_eviction_and_stats():
+    cache = ResultCache("fn", CachePolicy(max_entries=2))
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used entry
+    assert cache.get("b") is MISSING
+    assert cache.get("c") == 3
+    assert cache.stats.hits == 2
+    assert cache.stats.misses == 1
+    assert cache.stats.evictions == 1
+
+
+def test_size_bound_and_ttl():
+    cache = ResultCache("fn", CachePolicy(max_bytes=10))
+    cache.set("big", "x" * 100)
+    assert cache.get("big") is MISSING
+
+    expired = ResultCache("fn", CachePolicy(ttl=-1))
+    expired.set("a", 1)
+    assert expired.get("a") is MISSING
+
+
+def test_disk_tier_is_shared(tmp_path):
+    policy = CachePolicy(disk_path=tmp_path)
+    ResultCache("fn", policy).set("key", {"parsed": [1, 2]})
+
+    other_process = ResultCache("fn", policy)
+    assert other_process.get("key") == {"parsed": [1, 2]}
+    assert other_process.stats.disk_hits == 1
+
+
+def test_truncated_disk_entries_are_misses(tmp_path):
+    policy = CachePolicy(disk_path=tmp_path)
+    ResultCache("fn", policy).set("empty", 1)
+    ResultCache("fn", policy).set("short", 2)
+    files = {path.name: path for path in tmp_path.rglob("*") if path.is_file()}
+    assert set(files) == {"empty", "short"}
+    files["empty"].write_bytes(b"")
+    files["short"].write_bytes(b"\x00\x01")
+
+    other_process = ResultCache("fn", policy)
+    assert other_process.get("empty") is MISSING
+    assert other_process.get("short") is MISSING
+    assert not any(path.exists() for path in files.values())
+
+
+@endpoint(name="parse", cache=True)
+def parse(document: str) -> str:
+    return document.upper()
+
+
+@patch("pare.settings.PARE_GIT_HASH", "abc1234")
+def test_invoke_uses_cache():
+    with patch(
+        "pare.sdk.backends.invoke_endpoint", return_value="PARSED"
+    ) as invoke_endpoint:
+        assert parse.invoke("doc") == "PARSED"
+        assert parse.invoke("doc") == "PARSED"
+        assert parse.invoke("other") == "PARSED"
+    assert invoke_endpoint.call_count == 2
+    assert parse.cache_stats.hits == 1
+
+    async def invoke_async() -> str:
+        return await parse.invoke_async("doc")
+
+    with patch("pare.sdk.backends.async_invoke_endpoint") as async_invoke_endpoint:
+        assert asyncio.run(invoke_async()) == "PARSED"
+    async_invoke_endpoint.assert_not_called()
+
+
+@endpoint(name="parse_unversioned", cache=True)
+def parse_unversioned(document: str) -> str:
+    return document.upper()
+
+
+@patch("pare.settings.PARE_GIT_HASH", "")
+@patch("pare.settings.PARE_ATOMIC_DEPLOYMENT_ENABLED", False)
+def test_invoke_skips_cache_without_deploy_version():
+    with patch(
+        "pare.sdk.backends.invoke_endpoint", return_value="PARSED"
+    ) as invoke_endpoint:
+        assert parse_unversioned.invoke("doc") == "PARSED"
+        assert parse_unversioned.invoke("doc") == "PARSED"
+    assert invoke_endpoint.call_count == 2
+    assert parse_unversioned.cache_stats.hits == 0
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from pare import CircuitBreakerPolicy, endpoint, errors
+from pare.sdk.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+POLICY = CircuitBreakerPolicy(min_calls=2, window=4, open_duration=60)
+
+
+def unavailable(name, arguments):
+    raise errors.PareInvokeError("unavailable", status=503)
+
+
+def test_opens_on_failures_and_recovers_after_probe():
+    breaker = CircuitBreaker(POLICY)
+    breaker.record(failed=True)
+    assert breaker.state == CLOSED
+    breaker.record(failed=True)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    with patch("time.monotonic", return_value=breaker._opened_at + 61):
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+        # Only one probe at a time
+        assert not breaker.allow()
+        breaker.record(failed=False)
+    assert breaker.state == CLOSED
+
+
+def test_late_outcomes_do_not_count_after_the_state_changed():
+    breaker = CircuitBreaker(POLICY)
+    in_flight = [breaker._admit() for _ in range(4)]
+    breaker.record(True, in_flight.pop())
+    breaker.record(True, in_flight.pop())
+    assert breaker.state == OPEN
+    opened_at = breaker._opened_at
+
+    # Failures of calls admitted before it opened don't extend the cooldown
+    breaker.record(True, in_flight.pop())
+    assert breaker._opened_at == opened_at
+
+    with patch("time.monotonic", return_value=opened_at + 61):
+        probe = breaker._admit()
+        # Nor do they decide the probe
+        breaker.record(False, in_flight.pop())
+        assert breaker.state == HALF_OPEN
+        breaker.record(False, probe)
+    assert breaker.state == CLOSED
+
+
+def test_function_errors_do_not_open_the_circuit():
+    breaker = CircuitBreaker(POLICY)
+    for _ in range(4):
+        with pytest.raises(errors.PareFunctionError):
+            breaker.call(lambda: (_ for _ in ()).throw(errors.PareFunctionError("bug")))
+    assert breaker.state == CLOSED
+
+
+@endpoint(name="square", idempotent=True, circuit_breaker=POLICY)
+def square(value: int) -> int:
+    return value * value
+
+
+@endpoint(name="notify", circuit_breaker=POLICY)
+def notify(user: str) -> str:
+    return user
+
+
+def test_falls_back_to_local_execution():
+    with patch("pare.sdk.backends.invoke_endpoint", unavailable):
+        # Idempotent calls which fail remotely are re-run locally
+        assert square.invoke(3) == 9
+        assert square.invoke(4) == 16
+    assert square.circuit_breaker.state == OPEN
+
+    with patch("pare.sdk.backends.invoke_endpoint") as invoke_endpoint:
+        assert square.invoke(5) == 25
+
+        async def invoke_async():
+            return await square.invoke_async(6)
+
+        assert asyncio.run(invoke_async()) == 36
+    invoke_endpoint.assert_not_called()
+
+
+def test_non_idempotent_failures_are_raised():
+    with patch("pare.sdk.backends.invoke_endpoint", unavailable):
+        for _ in range(2):
+            with pytest.raises(errors.PareInvokeError):
+                notify.invoke("a")
+        # Once open, calls never reach the remote path, so running locally is safe
+        assert notify.invoke("b") == "b"
+
+
+def test_local_execution_is_bounded():
+    started = threading.Event()
+    release = threading.Event()
+
+    def wait() -> None:
+        started.set()
+        release.wait(5)
+
+    slow = endpoint(
+        name="slow",
+        circuit_breaker=CircuitBreakerPolicy(local_workers=1, local_queue=0),
+    )(wait)
+    slow.circuit_breaker._open()
+
+    first = threading.Thread(target=slow.invoke)
+    first.start()
+    started.wait(5)
+    try:
+        with pytest.raises(errors.PareCircuitOpenError):
+            slow.invoke()
+    finally:
+        release.set()
+        first.join()
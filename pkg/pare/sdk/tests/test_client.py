@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+
+import pytest
+
+from pare.client import PareClient, get_client
+
+
+def test_get_client_is_singleton():
+    assert get_client() is get_client()
+
+
+def test_session_is_reused():
+    client = PareClient(pool_size=4)
+    assert client.session is client.session
+    adapter = client.session.get_adapter("https://api.pare.gauge.sh")
+    assert adapter._pool_maxsize == 4  # type: ignore
+    client.close()
+
+
+def test_async_session_per_event_loop():
+    client = PareClient()
+
+    async def get_sessions():
+        first = client.async_session
+        second = client.async_session
+        await client.aclose()
+        return first, second
+
+    first, second = asyncio.run(get_sessions())
+    assert first is second
+    assert first.closed
+
+    other, _ = asyncio.run(get_sessions())
+    assert other is not first
+
+
+@pytest.mark.filterwarnings("error")
+def test_async_session_closed_with_its_loop():
+    client = PareClient()
+
+    async def get_session():
+        return client.async_session
+
+    sessions = [asyncio.run(get_session()), asyncio.run(get_session())]
+    assert sessions[0] is not sessions[1]
+    assert all(session.closed for session in sessions)
+    del sessions
+    # Unclosed sessions would warn when collected
+    gc.collect()
+    assert not client._async_sessions  # type: ignore
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from pare import endpoint
+from pare.sdk.codec import (
+    EVENT_BODY_KEY,
+    EVENT_CODEC_KEY,
+    codec_for_content_type,
+    get_codec,
+)
+
+VALUE = {
+    "text": "hello",
+    "raw": b"\x00\x01binary",
+    "when": datetime(2024, 8, 19, 22, 55, 51),
+    "nested": [1, 2.5, None, {"flag": True}],
+}
+
+
+@pytest.mark.parametrize("name", ["json", "msgpack"])
+def test_roundtrip_extension_types(name: str):
+    codec = get_codec(name)
+    assert codec.decode(codec.encode(VALUE)) == VALUE
+
+
+@pytest.mark.parametrize("name", ["json", "msgpack"])
+def test_roundtrip_ndarray(name: str):
+    numpy = pytest.importorskip("numpy")
+    codec = get_codec(name)
+    array = numpy.arange(12, dtype=numpy.float32).reshape(3, 4)
+    decoded = codec.decode(codec.encode({"array": array}))["array"]
+    assert decoded.dtype == array.dtype
+    assert (decoded == array).all()
+
+
+def test_codec_for_content_type():
+    assert codec_for_content_type("application/msgpack").name == "msgpack"
+    assert codec_for_content_type("application/json; charset=utf-8").name == "json"
+    assert codec_for_content_type(None).name == "json"
+
+
+def test_json_arguments_are_plain_json_event():
+    codec = get_codec("json")
+    assert json.loads(codec.encode_arguments([1], {"a": "b"})) == {
+        "args": [1],
+        "kwargs": {"a": "b"},
+    }
+    flagged = json.loads(codec.encode_arguments([b"raw"], {}))
+    assert flagged["pare_ext"] is True
+
+
+@endpoint(name="echo")
+def echo(value: object) -> object:
+    return value
+
+
+def test_handler_with_json_extension_types():
+    codec = get_codec("json")
+    # The Lambda runtime hands the handler an already-parsed JSON event
+    event = json.loads(codec.encode_arguments([VALUE], {}))
+    response = echo.as_lambda_function_url_handler()(event, {})
+    assert codec.decode(json.dumps(response).encode()) == {
+        "status": 200,
+        "result": VALUE,
+    }
+
+
+def test_handler_with_msgpack():
+    codec = get_codec("msgpack")
+    event = {
+        EVENT_CODEC_KEY: "msgpack",
+        EVENT_BODY_KEY: base64.b64encode(codec.encode_arguments([VALUE], {})).decode(),
+    }
+    response = echo.as_lambda_function_url_handler()(event, {})
+    assert response[EVENT_CODEC_KEY] == "msgpack"
+    assert codec.decode(base64.b64decode(response[EVENT_BODY_KEY])) == {
+        "status": 200,
+        "result": VALUE,
+    }
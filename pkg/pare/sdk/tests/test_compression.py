@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import base64
+import json
+
+import pytest
+
+from pare import endpoint, settings
+from pare.sdk.codec import (
+    EVENT_ACCEPT_ENCODING_KEY,
+    EVENT_BODY_KEY,
+    EVENT_ENCODING_KEY,
+    get_codec,
+)
+from pare.sdk.compression import (
+    GZIP,
+    IDENTITY,
+    ZSTD,
+    decompress,
+    maybe_compress,
+    negotiate_encoding,
+)
+
+
+@pytest.mark.parametrize("encoding", [GZIP, ZSTD])
+def test_maybe_compress_threshold(encoding: str):
+    if encoding == ZSTD:
+        pytest.importorskip("zstandard")
+    data = b"pare" * 1000
+    assert maybe_compress(data, encoding, threshold=len(data) + 1) == (data, IDENTITY)
+
+    compressed, used = maybe_compress(data, encoding, threshold=10)
+    assert used == encoding
+    assert len(compressed) < len(data)
+    assert decompress(compressed, encoding) == data
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding([GZIP]) == GZIP
+    assert negotiate_encoding(["br"]) == IDENTITY
+    assert negotiate_encoding([]) == IDENTITY
+
+
+@endpoint(name="repeat")
+def repeat(text: str, times: int) -> str:
+    return text * times
+
+
+def test_handler_compresses_large_results(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "PARE_COMPRESSION_THRESHOLD", 1024)
+    handler = repeat.as_lambda_function_url_handler()
+
+    small = handler({"args": ["a", 10], EVENT_ACCEPT_ENCODING_KEY: GZIP}, {})
+    assert small == {"status": 200, "result": "a" * 10}
+
+    large = handler({"args": ["a", 10_000], EVENT_ACCEPT_ENCODING_KEY: GZIP}, {})
+    assert large[EVENT_ENCODING_KEY] == GZIP
+    body = decompress(base64.b64decode(large[EVENT_BODY_KEY]), GZIP)
+    assert get_codec("json").decode(body) == {"status": 200, "result": "a" * 10_000}
+    json.dumps(large)
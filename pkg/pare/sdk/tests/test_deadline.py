@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+import pare
+from pare import RetryPolicy, endpoint, errors, settings
+from pare.sdk.codec import JSONCodec
+from pare.sdk.deadline import EVENT_DEADLINE_KEY
+from pare.sdk.transport import build_invoke_request
+
+
+@endpoint(name="budget")
+def budget() -> float | None:
+    return pare.remaining_time()
+
+
+@endpoint(name="quick", timeout=0.5)
+def quick() -> None: ...
+
+
+@endpoint(
+    name="flaky", idempotent=True, retry=RetryPolicy(max_attempts=5, backoff_base=1.0)
+)
+def flaky() -> None: ...
+
+
+def remaining_at_send(function_name, arguments):
+    return pare.remaining_time()
+
+
+def test_nested_deadlines_only_shorten():
+    assert pare.remaining_time() is None
+    with pare.deadline(1.0):
+        with pare.deadline(10.0):
+            assert 0 < pare.remaining_time() <= 1.0
+        with pare.deadline(at=time.time() + 0.2):
+            assert pare.remaining_time() <= 0.2
+    assert pare.remaining_time() is None
+
+
+def test_deadline_header():
+    _, headers = build_invoke_request(b"{}", JSONCodec())
+    assert settings.PARE_DEADLINE_HEADER not in headers
+    with pare.deadline(2.0):
+        _, headers = build_invoke_request(b"{}", JSONCodec())
+    assert 1900 <= int(headers[settings.PARE_DEADLINE_HEADER]) <= 2000
+
+
+def test_expired_deadline_is_refused_before_sending():
+    send = Mock()
+    with patch("pare.sdk.backends.invoke_endpoint", send), pare.deadline(0):
+        with pytest.raises(errors.PareDeadlineExceededError):
+            budget.invoke()
+    send.assert_not_called()
+
+
+def test_endpoint_timeout():
+    with patch("pare.sdk.backends.invoke_endpoint", side_effect=remaining_at_send):
+        assert 0 < quick.invoke() <= 0.5
+        with pare.deadline(0.1):
+            assert quick.invoke() <= 0.1
+
+
+def test_deadline_applies_to_futures():
+    with patch("pare.sdk.backends.invoke_endpoint", side_effect=remaining_at_send):
+        with pare.deadline(1.0):
+            future = budget.invoke_future()
+        assert 0 < future.result(timeout=1) <= 1.0
+
+
+def test_no_retry_after_deadline():
+    send = Mock(side_effect=errors.PareInvokeError("unavailable", status=503))
+    with patch("pare.sdk.backends.invoke_endpoint", send), pare.deadline(0.2):
+        started = time.monotonic()
+        with pytest.raises(errors.PareInvokeError):
+            flaky.invoke()
+    assert time.monotonic() - started < 0.2
+    assert send.call_count < 5
+
+
+def test_handler_exposes_remaining_time():
+    handler = budget.as_lambda_function_url_handler()
+    response = handler({"args": [], EVENT_DEADLINE_KEY: 500}, None)
+    assert response["status"] == 200
+    assert 0 < response["result"] <= 0.5
+    assert handler({"args": []}, None)["result"] is None
+
+    class Context:
+        def get_remaining_time_in_millis(self) -> int:
+            return 300
+
+    assert handler({"args": [], EVENT_DEADLINE_KEY: 500}, Context())["result"] <= 0.3
+    assert handler({"args": [], EVENT_DEADLINE_KEY: 0}, None)["status"] == 504
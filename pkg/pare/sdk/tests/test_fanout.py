@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from pare import endpoint, errors
+from pare.sdk.main import PareEndpoint
+
+
+@endpoint(name="square")
+def square(value: int) -> int:
+    return value * value
+
+
+@endpoint(name="idempotent_square", idempotent=True)
+def idempotent_square(value: int) -> int:
+    return value * value
+
+
+def fake_invoke(self: PareEndpoint, value: int) -> int:
+    # Later inputs finish first, so completion order differs from input order
+    time.sleep(0.01 * (5 - value))
+    if value == 3:
+        raise errors.PareInvokeError("boom")
+    return value * value
+
+
+async def fake_invoke_async(self: PareEndpoint, value: int) -> int:
+    await asyncio.sleep(0.01 * (5 - value))
+    if value == 3:
+        raise errors.PareInvokeError("boom")
+    return value * value
+
+
+@patch.object(PareEndpoint, "invoke", fake_invoke)
+def test_map_ordered_reports_failures():
+    results: list[int] = []
+    with pytest.raises(errors.PareMapError) as exc:
+        for result in square.map(range(5), concurrency=5):
+            results.append(result)
+    assert results == [0, 1, 4, 16]
+    assert list(exc.value.failures) == [3]
+    assert exc.value.failures[3][0] == 3
+
+
+@patch.object(PareEndpoint, "invoke", fake_invoke)
+def test_map_unordered_return_exceptions():
+    results = list(
+        square.map(range(5), concurrency=5, ordered=False, return_exceptions=True)
+    )
+    assert sorted(r for r in results if isinstance(r, int)) == [0, 1, 4, 16]
+    assert sum(isinstance(r, errors.PareInvokeError) for r in results) == 1
+    assert results[0] == 16
+
+
+def test_map_bounds_concurrency_and_retries():
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+    attempts: dict[int, int] = {}
+
+    def invoke(self: PareEndpoint, value: int) -> int:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+            attempts[value] = attempts.get(value, 0) + 1
+        time.sleep(0.005)
+        with lock:
+            active -= 1
+        if attempts[value] == 1 and value % 2:
+            raise errors.PareInvokeError("flaky", status=503)
+        return value
+
+    with patch.object(PareEndpoint, "invoke", invoke):
+        assert list(idempotent_square.map(range(20), concurrency=3, retries=1)) == list(
+            range(20)
+        )
+    assert peak <= 3
+    assert attempts[1] == 2
+
+
+def test_map_invokes_non_idempotent_endpoints_once():
+    attempts: list[int] = []
+
+    def invoke(self: PareEndpoint, value: int) -> int:
+        attempts.append(value)
+        raise errors.PareInvokeError("unavailable", status=503)
+
+    with patch.object(PareEndpoint, "invoke", invoke):
+        results = list(square.map(range(5), return_exceptions=True))
+    assert all(isinstance(result, errors.PareInvokeError) for result in results)
+    assert sorted(attempts) == list(range(5))
+
+    with pytest.raises(ValueError, match="idempotent"):
+        square.map(range(5), retries=1)
+
+
+def test_map_does_not_retry_function_errors():
+    attempts: list[int] = []
+
+    def invoke(self: PareEndpoint, value: int) -> int:
+        attempts.append(value)
+        raise errors.PareFunctionError("bug", status=503)
+
+    with patch.object(PareEndpoint, "invoke", invoke):
+        results = list(
+            idempotent_square.map(range(3), retries=2, return_exceptions=True)
+        )
+    assert len(results) == 3
+    assert sorted(attempts) == [0, 1, 2]
+
+
+@patch.object(PareEndpoint, "invoke_async", fake_invoke_async)
+def test_map_async():
+    async def collect():
+        return [
+            result
+            async for result in square.map_async(
+                range(5), concurrency=2, return_exceptions=True
+            )
+        ]
+
+    results = asyncio.run(collect())
+    assert results[:3] == [0, 1, 4]
+    assert isinstance(results[3], errors.PareInvokeError)
+    assert results[4] == 16
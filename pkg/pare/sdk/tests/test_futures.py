@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future
+from unittest.mock import patch
+
+import pytest
+
+import pare
+from pare import endpoint, errors
+from pare.sdk import futures
+
+
+@endpoint(name="cube")
+def cube(value: int) -> int:
+    return value**3
+
+
+def fake_invoke_endpoint(function_name, arguments):
+    (value,) = arguments.args
+    # Later inputs finish first, so completion order differs from input order
+    time.sleep(0.01 * (5 - value))
+    if value == 3:
+        raise errors.PareInvokeError("boom")
+    return value**3
+
+
+@pytest.fixture(autouse=True)
+def remote():
+    with patch("pare.sdk.backends.invoke_endpoint", side_effect=fake_invoke_endpoint):
+        yield
+
+
+def test_invoke_future_runs_on_shared_pool():
+    threads: set[str] = set()
+
+    def record_thread(function_name, arguments):
+        threads.add(threading.current_thread().name)
+        return fake_invoke_endpoint(function_name, arguments)
+
+    with patch("pare.sdk.backends.invoke_endpoint", side_effect=record_thread):
+        future = cube.invoke_future(2)
+        assert isinstance(future, Future)
+        assert future.result(timeout=1) == 8
+    assert all(name.startswith("pare-invoke") for name in threads)
+    assert futures.get_executor() is futures.get_executor()
+
+
+def test_wait_for_all():
+    pending = {cube.invoke_future(value): value for value in range(5)}
+    done, not_done = pare.wait(pending, timeout=5)
+    assert len(done) == 5 and not not_done
+    assert {pending[future] for future in pare.as_completed(pending)} == set(range(5))
+
+    failed = next(future for future, value in pending.items() if value == 3)
+    with pytest.raises(errors.PareInvokeError, match="boom"):
+        failed.result()
+
+
+def test_as_completed_yields_in_completion_order():
+    pending = {cube.invoke_future(value): value for value in (0, 4)}
+    assert [pending[future] for future in pare.as_completed(pending, timeout=5)] == [
+        4,
+        0,
+    ]
+
+
+def test_wait_first_completed():
+    pending = [cube.invoke_future(value) for value in (0, 4)]
+    done, _ = pare.wait(pending, timeout=5, return_when=FIRST_COMPLETED)
+    assert [future.result() for future in done] == [64]
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ["aiohttp", "asyncio", "environs", "pydantic", "requests", "rich"]
+
+HANDLER = """
+import json, sys
+import pare
+
+@pare.endpoint(name="double")
+def double(x):
+    return x * 2
+
+response = double.as_lambda_function_url_handler()({"args": [2]}, None)
+assert response["status"] == 200, response
+print(json.dumps([name for name in sys.modules if name.split(".")[0] in HEAVY]))
+"""
+
+
+def test_import_and_handler_skip_heavy_modules(tmp_path):
+    # A fresh interpreter, since this one has already imported everything
+    result = subprocess.run(
+        [sys.executable, "-c", f"HEAVY = {HEAVY_MODULES!r}\n{HANDLER}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=tmp_path,
+    )
+    assert json.loads(result.stdout) == []
+
+
+def test_api_key_is_read_on_first_use(tmp_path, monkeypatch):
+    key_file = tmp_path / "api_key.priv"
+    key_file.write_text("secret")
+    monkeypatch.delenv("PARE_API_KEY", raising=False)
+    monkeypatch.setenv("PARE_API_KEY_FILE", str(key_file))
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from pare import settings; print('PARE_API_KEY' in vars(settings), settings.PARE_API_KEY)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.split() == ["False", "secret"]
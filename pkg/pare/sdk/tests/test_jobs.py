@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from pare import endpoint, errors
+from pare.sdk.jobs import (
+    EXPIRED,
+    LocalJobStore,
+    decode_job_payload,
+    wait_jobs,
+)
+
+release = threading.Event()
+
+
+@endpoint(name="report")
+def report(pages: int) -> str:
+    if pages < 0:
+        raise ValueError("no pages")
+    if pages == 0:
+        release.wait(timeout=5)
+    return f"{pages} pages"
+
+
+@endpoint(name="crash")
+def crash() -> None:
+    raise SystemExit(1)
+
+
+@pytest.fixture(autouse=True)
+def local_store():
+    store = LocalJobStore([report])
+    with patch("pare.sdk.jobs.get_job_store", return_value=store), patch(
+        "pare.settings.PARE_JOB_POLL_INTERVAL", 0.01
+    ):
+        yield store
+    release.set()
+
+
+def test_submit_and_collect_results():
+    jobs = [report.submit(pages) for pages in (1, 2, -1)]
+    done, pending = wait_jobs(jobs, timeout=5)
+    assert len(done) == 3 and not pending
+
+    assert jobs[0].result() == "1 pages"
+    assert jobs[1].result() == "2 pages"
+    with pytest.raises(errors.PareInvokeError, match="no pages"):
+        jobs[2].result()
+
+
+def test_await_job():
+    async def run():
+        return await report.submit(3)
+
+    assert asyncio.run(run()) == "3 pages"
+
+
+def test_result_timeout():
+    release.clear()
+    job = report.submit(0)
+    with pytest.raises(errors.PareTimeoutError):
+        job.result(timeout=0.05)
+    assert not job.done()
+    release.set()
+    assert job.result(timeout=5) == "0 pages"
+
+
+def test_handler_stores_submitted_result(tmp_path):
+    result_path = tmp_path / "job"
+    handler = report.as_lambda_function_url_handler()
+    response = handler(
+        {"args": [4], "pare_job": {"result_url": result_path.as_uri()}}, None
+    )
+    assert json.loads(result_path.read_bytes()) == response
+    assert decode_job_payload(result_path.read_bytes())["result"] == "4 pages"
+
+
+def test_handler_stores_failure_when_function_crashes(tmp_path):
+    result_path = tmp_path / "job"
+    handler = crash.as_lambda_function_url_handler()
+    with pytest.raises(SystemExit):
+        handler({"args": [], "pare_job": {"result_url": result_path.as_uri()}}, None)
+    assert json.loads(result_path.read_bytes())["status"] == 500
+
+
+def test_handler_skips_expired_jobs(tmp_path):
+    result_path = tmp_path / "job"
+    handler = report.as_lambda_function_url_handler()
+    job = {"result_url": result_path.as_uri(), "expires_at": time.time() - 1}
+    response = handler({"args": [4], "pare_job": job}, None)
+    assert response["status"] == 504
+    assert json.loads(result_path.read_bytes()) == response
+
+
+def test_handler_does_not_raise_when_storing_fails(tmp_path):
+    handler = report.as_lambda_function_url_handler()
+    missing = tmp_path / "missing" / "job"
+    response = handler(
+        {"args": [4], "pare_job": {"result_url": missing.as_uri()}}, None
+    )
+    assert response["result"] == "4 pages"
+
+
+def test_expired_job_result(local_store):
+    job = report.submit(5)
+    with patch.object(local_store, "statuses", return_value={job.id: EXPIRED}):
+        with pytest.raises(errors.PareInvokeError, match="expired") as exc:
+            job.result(timeout=1)
+    assert exc.value.status == 504
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from pare import MetricsRegistry, add_hook, remove_hook
+from pare.client import get_client
+from pare.sdk import metrics
+from pare.sdk.codec import JSONCodec
+from pare.sdk.transport import RemoteInvocationArguments, invoke_endpoint
+
+
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry()
+    add_hook(registry)
+    yield registry
+    remove_hook(registry)
+
+
+def make_response(status: int, content: bytes, headers: dict[str, str]):
+    response = requests.Response()
+    response.status_code = status
+    response._content = content
+    response.headers.update(headers)
+    return response
+
+
+def test_disabled_without_hooks():
+    assert not metrics.enabled()
+    assert metrics.timer("echo") is metrics.timer("other")
+
+
+def test_records_phases_and_counters(registry: MetricsRegistry):
+    content = JSONCodec().encode({"status": 200, "result": "hi"})
+    response = make_response(
+        200,
+        content,
+        {"Content-Type": "application/json", "Server-Timing": "lambda;dur=12.5"},
+    )
+    with patch.object(get_client().session, "post", return_value=response):
+        assert invoke_endpoint("echo", RemoteInvocationArguments(args=["hi"])) == "hi"
+
+    for phase in (metrics.ENCODE, metrics.NETWORK, metrics.SERVER, metrics.DECODE):
+        assert registry.histogram("echo", phase).count == 1
+    assert registry.histogram("echo", metrics.SERVER).sum == 0.0125
+    assert registry.counter("echo", "status", status="200") == 1
+    assert registry.counter("echo", "bytes_received") == len(content)
+    assert registry.counter("echo", "bytes_sent") > 0
+
+    rendered = registry.render()
+    assert "# TYPE pare_client_phase_seconds histogram" in rendered
+    assert (
+        'pare_client_phase_seconds_bucket{endpoint="echo",phase="server",le="0.025"} 1'
+        in rendered
+    )
+    assert 'pare_client_status_total{endpoint="echo",status="200"} 1' in rendered
+
+
+def test_opentelemetry_hook():
+    pytest.importorskip("opentelemetry")
+    hook = metrics.OpenTelemetryHook()
+    hook.observe("echo", metrics.ENCODE, 0.1)
+    hook.increment("echo", "status", labels={"status": "200"})
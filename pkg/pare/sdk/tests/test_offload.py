@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from pare import OffloadPolicy, endpoint
+from pare.sdk.offload import LOCAL, REMOTE, CostModel, Offloader, OffloadStats
+
+
+def test_cost_model_fits_duration_to_size():
+    model = CostModel(decay=1.0)
+    for size in range(10):
+        model.record(size, 0.5 + 0.25 * size)
+    assert model.predict(20) == pytest.approx(5.5)
+
+
+def test_routes_by_predicted_duration():
+    offloader = Offloader(OffloadPolicy(min_samples=2, explore_rate=0))
+    for size in (10, 1000):
+        # Local time grows with size, the remote round trip stays flat
+        offloader.record(LOCAL, size, size / 1000)
+        offloader.record(REMOTE, size, 0.1)
+    assert offloader.choose(10) == LOCAL
+    assert offloader.choose(10_000) == REMOTE
+    assert offloader.stats == OffloadStats(local=1, remote=1)
+
+
+def test_unknown_offload_mode():
+    with pytest.raises(ValueError, match="offload mode"):
+        endpoint(name="bad", offload="always")(len)
+
+
+@endpoint(name="checksum", offload=OffloadPolicy(min_samples=1, explore_rate=0))
+def checksum(data: bytes) -> int:
+    return sum(data)
+
+
+def test_measures_both_paths_before_routing():
+    with patch("pare.sdk.backends.invoke_endpoint", return_value=-1) as invoke:
+        assert checksum.invoke(b"ab") == 195
+        assert checksum.invoke(b"ab") == -1
+        asyncio.run(checksum.invoke_async(b"ab"))
+    assert invoke.call_count + checksum.offload_stats.local == 3
+    assert checksum.offloader.local.count == checksum.offload_stats.local
+    assert checksum.offloader.remote.count == invoke.call_count
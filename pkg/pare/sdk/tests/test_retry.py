@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from pare import RetryPolicy, endpoint, errors
+from pare.sdk.retry import Retrier
+
+FAST = RetryPolicy(backoff_base=0.001, backoff_max=0.001)
+
+
+def failing(statuses: list[int | None], result: str = "ok"):
+    calls = []
+
+    def call() -> str:
+        calls.append(None)
+        if statuses:
+            status = statuses.pop(0)
+            raise errors.PareInvokeError("failed", status=status)
+        return result
+
+    return call, calls
+
+
+def test_retries_retryable_statuses():
+    call, calls = failing([503, 429])
+    assert Retrier(FAST).call(call) == "ok"
+    assert len(calls) == 3
+
+
+def test_does_not_retry_other_errors():
+    call, calls = failing([500])
+    with pytest.raises(errors.PareInvokeError):
+        Retrier(FAST).call(call)
+    assert len(calls) == 1
+
+
+def test_gives_up_after_max_attempts_and_deadline():
+    call, calls = failing([503] * 5)
+    with pytest.raises(errors.PareInvokeError):
+        Retrier(FAST).call(call)
+    assert len(calls) == 3
+
+    call, calls = failing([503] * 5)
+    policy = RetryPolicy(max_attempts=5, backoff_base=1, backoff_max=1, deadline=0)
+    with patch("random.uniform", return_value=1):
+        with pytest.raises(errors.PareInvokeError):
+            Retrier(policy).call(call)
+    assert len(calls) == 1
+
+
+def test_hedges_slow_attempts():
+    retrier = Retrier(RetryPolicy(hedge=True, hedge_min_samples=1))
+    retrier.latencies.record(0.01)
+    attempts = []
+
+    def call() -> int:
+        attempts.append(None)
+        if len(attempts) == 1:
+            time.sleep(0.5)
+        return len(attempts)
+
+    started = time.monotonic()
+    assert retrier.call(call) == 2
+    assert time.monotonic() - started < 0.4
+
+    async def call_async() -> int:
+        attempts.append(None)
+        if len(attempts) == 3:
+            await asyncio.sleep(0.5)
+        return len(attempts)
+
+    assert asyncio.run(retrier.call_async(call_async)) == 4
+
+
+def test_hedges_do_not_queue_behind_other_calls():
+    retrier = Retrier(RetryPolicy(hedge=True, hedge_min_samples=1))
+    retrier.latencies.record(0.01)
+    release = threading.Event()
+
+    def hedged_call() -> str:
+        attempts = []
+
+        def call() -> str:
+            attempts.append(None)
+            if len(attempts) == 1:
+                # Primaries stall, occupying their threads
+                release.wait(timeout=5)
+                return "primary"
+            return "hedge"
+
+        return retrier.call(call)
+
+    # More concurrent calls than a default-sized pool has threads
+    with ThreadPoolExecutor(max_workers=64) as executor:
+        results = list(executor.map(lambda _: hedged_call(), range(64)))
+        release.set()
+    assert results == ["hedge"] * 64
+
+
+def test_retries_require_idempotent_endpoints():
+    with pytest.raises(ValueError):
+        endpoint(name="charge", retry=RetryPolicy())(lambda amount: amount)
+
+    flaky = endpoint(name="lookup", idempotent=True, retry=FAST)(lambda key: key)
+    call, calls = failing([502], result="value")
+    with patch("pare.sdk.backends.invoke_endpoint", lambda name, arguments: call()):
+        assert flaky.invoke("key") == "value"
+    assert len(calls) == 2
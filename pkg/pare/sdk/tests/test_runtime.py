@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import base64
+import json
+import os
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import pytest
+
+from pare import endpoint
+from pare.handler import (
+    ENTRYPOINT_FILENAME,
+    RUNTIME_CHECK,
+    RUNTIME_MARKER_FILENAME,
+    build_lambda_entrypoint,
+    build_lambda_handler,
+)
+from pare.sdk.runtime import RuntimeClient, handle_next_invocation
+from pare.sdk.streaming import StreamDecoder
+
+first_chunk_received = threading.Event()
+
+
+@endpoint(name="ticks")
+def ticks(count: int) -> Iterator[int]:
+    yield 0
+    # Only continues once the first chunk has reached the Runtime API
+    assert first_chunk_received.wait(timeout=5)
+    yield from range(1, count)
+
+
+class FakeRuntimeAPI(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    event: dict[str, object] = {}
+    posts: list[tuple[str, dict[str, str], list[bytes]]] = []
+
+    def do_GET(self) -> None:
+        body = json.dumps(self.event).encode()
+        self.send_response(200)
+        self.send_header("Lambda-Runtime-Aws-Request-Id", "request-1")
+        self.send_header("Lambda-Runtime-Deadline-Ms", "9999999999999")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_chunks(self) -> Iterator[bytes]:
+        while True:
+            size = int(self.rfile.readline().split(b";")[0], 16)
+            if not size:
+                while self.rfile.readline() not in (b"\r\n", b""):
+                    pass
+                return
+            yield self.rfile.read(size)
+            self.rfile.readline()
+            first_chunk_received.set()
+
+    def do_POST(self) -> None:
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            chunks = list(self._read_chunks())
+        else:
+            chunks = [self.rfile.read(int(self.headers["Content-Length"]))]
+        self.posts.append((self.path, dict(self.headers), chunks))
+        self.send_response(202)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def runtime_api():
+    FakeRuntimeAPI.posts = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeRuntimeAPI)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = RuntimeClient(f"127.0.0.1:{server.server_address[1]}")
+    yield client
+    client.close()
+    server.shutdown()
+
+
+def test_streams_chunks_as_they_are_produced(runtime_api):
+    first_chunk_received.clear()
+    FakeRuntimeAPI.event = {"args": [3], "pare_stream": True}
+    handle_next_invocation(runtime_api, ticks.as_lambda_function_url_handler())
+
+    [(path, headers, chunks)] = FakeRuntimeAPI.posts
+    assert path == "/2018-06-01/runtime/invocation/request-1/response"
+    assert headers["Lambda-Runtime-Function-Response-Mode"] == "streaming"
+    # One HTTP chunk per NDJSON line, rather than the whole stream at once
+    assert len(chunks) == 4
+    decoder = StreamDecoder("ticks")
+    assert [value for chunk in chunks for value in decoder.decode(chunk)] == [0, 1, 2]
+    decoder.close()
+
+
+def test_sends_buffered_responses_and_errors(runtime_api):
+    first_chunk_received.set()
+    FakeRuntimeAPI.event = {"args": [2]}
+    handle_next_invocation(runtime_api, ticks.as_lambda_function_url_handler())
+
+    def broken(event, context):
+        raise RuntimeError("broken handler")
+
+    handle_next_invocation(runtime_api, broken)
+
+    (path, _, [body]), (error_path, _, [error]) = FakeRuntimeAPI.posts
+    assert path.endswith("/response")
+    assert json.loads(body) == {"status": 200, "result": [0, 1]}
+    assert error_path.endswith("/request-1/error")
+    assert json.loads(error)["errorMessage"] == "broken handler"
+
+
+def test_images_without_pare_runtime_use_the_base_runtime(tmp_path, monkeypatch):
+    (tmp_path / "streams.py").write_text(
+        "from pare import endpoint\n\n"
+        "@endpoint(name='count')\n"
+        "def count(n):\n"
+        "    yield from range(n)\n"
+    )
+    build_lambda_handler("streams:count", tmp_path / "lambda_function.py")
+    build_lambda_entrypoint(tmp_path / ENTRYPOINT_FILENAME)
+
+    # A pare from before its runtime existed, e.g. pinned in the requirements
+    old_pare = tmp_path / "site-packages" / "pare"
+    (old_pare / "sdk").mkdir(parents=True)
+    (old_pare / "__init__.py").touch()
+    (old_pare / "sdk" / "__init__.py").touch()
+    marker = tmp_path / RUNTIME_MARKER_FILENAME
+    check = [sys.executable, "-c", RUNTIME_CHECK, str(marker)]
+    env = {**os.environ, "PYTHONPATH": str(old_pare.parent)}
+    subprocess.run(check, env=env, check=True)
+    assert not marker.exists()
+
+    result = subprocess.run(
+        ["sh", str(tmp_path / ENTRYPOINT_FILENAME), "lambda_function.lambda_handler"],
+        env={
+            **env,
+            "AWS_LAMBDA_RUNTIME_API": "127.0.0.1:9",
+            "LAMBDA_TASK_ROOT": str(tmp_path),
+        },
+        capture_output=True,
+        text=True,
+    )
+    # Starts the base image's entrypoint (awslambdaric), which isn't here
+    assert "/lambda-entrypoint.sh" in result.stderr
+
+    # The handler still sends streams, whole, through a runtime which buffers them
+    monkeypatch.syspath_prepend(str(tmp_path))
+    from lambda_function import lambda_handler  # type: ignore
+
+    response = lambda_handler({"args": [3], "pare_stream": True}, None)
+    decoder = StreamDecoder("count")
+    lines = base64.b64decode(response["body"]).splitlines()
+    assert [value for line in lines for value in decoder.decode(line)] == [0, 1, 2]
+
+    # With a pare which has the runtime, it is used instead
+    subprocess.run(check, check=True)
+    assert marker.exists()
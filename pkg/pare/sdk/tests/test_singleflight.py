@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from pare import deadline, endpoint, errors
+from pare.sdk.singleflight import SingleFlight
+
+
+def test_do_coalesces_threads():
+    single_flight = SingleFlight()
+    calls = 0
+    started = threading.Event()
+
+    def slow() -> int:
+        nonlocal calls
+        calls += 1
+        started.set()
+        time.sleep(0.05)
+        return 42
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        first = executor.submit(single_flight.do, "key", slow)
+        started.wait()
+        others = [executor.submit(single_flight.do, "key", slow) for _ in range(7)]
+        results = [first.result()] + [future.result() for future in others]
+
+    assert results == [42] * 8
+    assert calls == 1
+    # Once the call has finished, the next one runs again
+    assert single_flight.do("key", slow) == 42
+    assert calls == 2
+
+
+def test_followers_wait_until_their_own_deadline():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow() -> int:
+        started.set()
+        release.wait(timeout=5)
+        return 42
+
+    def follow() -> int:
+        with deadline(timeout=0.1):
+            return single_flight.do("key", slow)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(single_flight.do, "key", slow)
+        started.wait()
+        with pytest.raises(errors.PareDeadlineExceededError):
+            follow()
+        release.set()
+        assert leader.result() == 42
+
+    async def run():
+        leader = asyncio.ensure_future(single_flight.do_async("key", asyncio_slow))
+        await asyncio.sleep(0)
+        with deadline(timeout=0.1), pytest.raises(errors.PareDeadlineExceededError):
+            await single_flight.do_async("key", asyncio_slow)
+        # The call carries on for the callers still waiting
+        return await leader
+
+    async def asyncio_slow() -> int:
+        await asyncio.sleep(0.3)
+        return 42
+
+    assert asyncio.run(run()) == 42
+
+
+def test_do_async_shares_exceptions():
+    single_flight = SingleFlight()
+    calls = 0
+
+    async def failing() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(
+            *(single_flight.do_async("key", failing) for _ in range(5)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_do_async_survives_caller_cancellation():
+    single_flight = SingleFlight()
+
+    async def slow() -> str:
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(single_flight.do_async("key", slow))
+        second = asyncio.ensure_future(single_flight.do_async("key", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+@endpoint(name="render", coalesce=True)
+def render(page: int) -> str:
+    return str(page)
+
+
+def test_invoke_async_coalesces_identical_calls():
+    calls = 0
+
+    async def fake_invoke(function_name, arguments):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return arguments.args[0]
+
+    async def run():
+        return await asyncio.gather(
+            render.invoke_async(1), render.invoke_async(1), render.invoke_async(2)
+        )
+
+    with patch("pare.sdk.backends.async_invoke_endpoint", fake_invoke):
+        assert asyncio.run(run()) == [1, 1, 2]
+    assert calls == 2
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import time
+from typing import AsyncIterator, Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pare import deadline, endpoint, errors, settings
+from pare.sdk.codec import EVENT_BODY_KEY
+from pare.sdk.streaming import StreamDecoder, split_lines
+
+
+@endpoint(name="rows")
+def rows(count: int) -> Iterator[dict[str, int]]:
+    for index in range(count):
+        yield {"row": index}
+    if count > 2:
+        raise ValueError("too many rows")
+
+
+@endpoint(name="async-rows")
+async def async_rows(count: int) -> AsyncIterator[int]:
+    for index in range(count):
+        await asyncio.sleep(0)
+        yield index
+
+
+def stream_lines(handler, event) -> list[bytes]:
+    response = handler({**event, "pare_stream": True}, None)
+    return base64.b64decode(response[EVENT_BODY_KEY]).splitlines()
+
+
+def decode(lines: list[bytes]) -> list[object]:
+    decoder = StreamDecoder("rows")
+    chunks = [chunk for line in lines for chunk in decoder.decode(line)]
+    decoder.close()
+    return chunks
+
+
+def test_handler_streams_chunks():
+    lines = stream_lines(rows.as_lambda_function_url_handler(), {"args": [2]})
+    assert decode(lines) == [{"row": 0}, {"row": 1}]
+
+    lines = stream_lines(async_rows.as_lambda_function_url_handler(), {"args": [3]})
+    assert decode(lines) == [0, 1, 2]
+
+
+def test_stream_error_is_raised_after_earlier_chunks():
+    lines = stream_lines(rows.as_lambda_function_url_handler(), {"args": [3]})
+    decoder = StreamDecoder("rows")
+    chunks = []
+    with pytest.raises(errors.PareInvokeError, match="too many rows"):
+        for line in lines:
+            chunks.extend(decoder.decode(line))
+    assert len(chunks) == 3
+
+
+def test_truncated_stream_raises():
+    with pytest.raises(errors.PareInvokeError, match="ended unexpectedly"):
+        decode([b'{"chunk": 1}'])
+
+
+def test_invoke_returns_all_chunks():
+    handler = async_rows.as_lambda_function_url_handler()
+    assert handler({"args": [2]}, None) == {"status": 200, "result": [0, 1]}
+
+
+def test_stream_yields_chunks_from_response():
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.iter_lines.return_value = [
+        b'{"chunk": "a"}',
+        b'{"chunk": "b"}',
+        b"",
+        b'{"status": 200}',
+    ]
+    client = MagicMock()
+    client.session.post.return_value = response
+
+    with patch("pare.sdk.streaming.get_client", return_value=client):
+        assert list(rows.stream(2)) == ["a", "b"]
+    assert client.session.post.call_args.kwargs["stream"] is True
+
+
+@endpoint(name="slow-rows", timeout=0.2)
+def slow_rows(count: int) -> Iterator[int]:
+    yield from range(count)
+
+
+def test_stream_is_limited_by_the_deadline():
+    def lines():
+        yield b'{"chunk": 0}'
+        time.sleep(0.3)
+        yield b'{"chunk": 1}'
+
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.iter_lines.return_value = lines()
+    client = MagicMock()
+    client.session.post.return_value = response
+
+    with patch("pare.sdk.streaming.get_client", return_value=client):
+        stream = slow_rows.stream(2)
+        # Applies outside the call which started the stream
+        assert next(stream) == 0
+        with pytest.raises(errors.PareDeadlineExceededError):
+            next(stream)
+    kwargs = client.session.post.call_args.kwargs
+    assert 0 < kwargs["timeout"] <= 0.2
+    assert 0 < int(kwargs["headers"][settings.PARE_DEADLINE_HEADER]) <= 200
+
+    with deadline(timeout=0), pytest.raises(errors.PareDeadlineExceededError):
+        rows.stream(2)
+
+
+def test_split_lines():
+    async def chunks():
+        for chunk in (b'{"chunk": 1}\n{"ch', b'unk": 2}\n', b'{"status": 200}'):
+            yield chunk
+
+    async def collect():
+        return [line async for line in split_lines(chunks())]
+
+    assert asyncio.run(collect()) == [
+        b'{"chunk": 1}',
+        b'{"chunk": 2}',
+        b'{"status": 200}',
+    ]
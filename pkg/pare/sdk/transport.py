@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Generator, Mapping
+
+from pare import errors, settings
+from pare.client import get_client, get_client_headers
+from pare.sdk import blobs, metrics
+from pare.sdk.codec import (
+    EVENT_BLOB_KEY,
+    JSON_CONTENT_TYPE,
+    Codec,
+    JSONCodec,
+    codec_for_content_type,
+    decode_envelope,
+    event_size,
+    get_codec,
+    spill_envelope,
+)
+from pare.sdk.compression import (
+    IDENTITY,
+    available_encodings,
+    decompress,
+    maybe_compress,
+    negotiate_encoding,
+)
+from pare.sdk.deadline import (
+    check_deadline,
+    deadline_headers,
+    expired,
+    passed,
+    remaining_time,
+)
+
+
+@dataclass
+class RemoteInvocationArguments:
+    args: list[Any] = field(default_factory=list)
+    kwargs: dict[Any, Any] = field(default_factory=dict)
+
+    def encode(self, codec: Codec) -> bytes:
+        # Encoded directly rather than through `asdict`, which deep-copies every argument
+        return codec.encode_arguments(list(self.args), self.kwargs)
+
+
+def get_request_encoding() -> str:
+    if not settings.PARE_COMPRESSION:
+        return IDENTITY
+    if settings.PARE_COMPRESSION == "auto":
+        return negotiate_encoding(available_encodings())
+    return settings.PARE_COMPRESSION
+
+
+def build_invoke_request(body: bytes, codec: Codec) -> tuple[bytes, dict[str, str]]:
+    headers = {
+        **get_client_headers(),
+        **deadline_headers(),
+        "Content-Type": codec.content_type,
+        "Accept": codec.content_type,
+    }
+    if blobs.should_spill(len(body)):
+        # Send a reference instead, which the handler fetches from the blob store
+        body = JSONCodec().encode(spill_envelope(codec, body))
+        headers["Content-Type"] = JSON_CONTENT_TYPE
+    else:
+        # Fail before sending what Lambda would reject, with a hint to avoid it
+        error = blobs.payload_limit_error(event_size(codec, len(body)), "Arguments")
+        if error is not None:
+            raise errors.PareInvokeError(error, status=413)
+    encoding = get_request_encoding()
+    if encoding != IDENTITY:
+        headers[settings.PARE_ACCEPT_ENCODING_HEADER] = ",".join(available_encodings())
+        body, encoding = maybe_compress(
+            body, encoding, threshold=settings.PARE_COMPRESSION_THRESHOLD
+        )
+        if encoding != IDENTITY:
+            headers[settings.PARE_CONTENT_ENCODING_HEADER] = encoding
+    return body, headers
+
+
+def decode_invoke_response(content: bytes, headers: Mapping[str, str]) -> Any:
+    content = decompress(
+        content, headers.get(settings.PARE_CONTENT_ENCODING_HEADER, IDENTITY)
+    )
+    response = codec_for_content_type(headers.get("Content-Type")).decode(content)
+    if isinstance(response, dict) and EVENT_BLOB_KEY in response:
+        # Large results are passed back by reference, without going through the API
+        return decode_envelope(response)
+    return response
+
+
+def get_invoke_result(function_name: str, response: dict[str, Any]) -> Any:
+    status = response.get("status", 500)
+    if status != 200:
+        raise errors.PareFunctionError(
+            f"Function invocation for '{function_name}' failed with status: {status}. Detail: {response.get('detail', '[No detail provided]')}",
+            status=status,
+        )
+    return response.get("result")
+
+
+def parse_invoke_response(
+    function_name: str, content: bytes, headers: Mapping[str, str]
+) -> Any:
+    return get_invoke_result(function_name, decode_invoke_response(content, headers))
+
+
+def get_error_status(error: Exception) -> int | None:
+    """The HTTP status of a failed request, if `error` comes from a response."""
+    # Any such error was raised by a session which already imported these
+    import aiohttp
+    import requests
+
+    if isinstance(error, requests.HTTPError):
+        return error.response.status_code
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status
+    return None
+
+
+@contextmanager
+def invoke_errors(
+    function_name: str, deadline: float | None = None
+) -> Generator[None, None, None]:
+    """Surface any failure to invoke `function_name` as a `PareInvokeError`.
+
+    `deadline` is checked as well as the current one, for streams which are
+    read outside of the caller's context.
+    """
+    try:
+        yield
+    except errors.PareInvokeError:
+        raise
+    except Exception as e:
+        if expired() or passed(deadline):
+            # e.g. the request timed out, or the API refused it at the deadline
+            raise errors.PareDeadlineExceededError(
+                f"Deadline exceeded while invoking '{function_name}'", status=504
+            ) from e
+        status = get_error_status(e)
+        if status is not None:
+            raise errors.PareInvokeError(
+                f"Function invocation for '{function_name}' failed with status: {status}",
+                status=status,
+            ) from e
+        metrics.increment(function_name, "errors")
+        raise errors.PareInvokeError(
+            f"Could not invoke function: '{function_name}' due to error:\n{e}"
+        ) from e
+
+
+def post_invocation(
+    function_name: str,
+    encode: Callable[[Codec], bytes],
+    path: str = settings.PARE_API_INVOKE_URL_PATH,
+) -> Any:
+    """Send an encoded event to the invoke API and return the decoded response."""
+    check_deadline(function_name)
+    client = get_client()
+    codec = get_codec(settings.PARE_CODEC)
+    timer = metrics.timer(function_name)
+    body, headers = build_invoke_request(encode(codec), codec)
+    timer.lap(metrics.ENCODE)
+    response = client.session.post(
+        client.url(f"{path}{function_name}/"),
+        headers=headers,
+        data=body,
+        timeout=remaining_time(),
+    )
+    timer.response(
+        response.status_code, response.headers, len(body), len(response.content)
+    )
+    response.raise_for_status()
+    result = decode_invoke_response(response.content, response.headers)
+    timer.lap(metrics.DECODE)
+    return result
+
+
+def async_request_options(remaining: float | None) -> dict[str, Any]:
+    if remaining is None:
+        # Keep the session's default timeout
+        return {}
+    import aiohttp
+
+    return {"timeout": aiohttp.ClientTimeout(total=remaining)}
+
+
+async def async_post_invocation(
+    function_name: str, encode: Callable[[Codec], bytes]
+) -> Any:
+    check_deadline(function_name)
+    client = get_client()
+    codec = get_codec(settings.PARE_CODEC)
+    timer = metrics.timer(function_name)
+    body, headers = build_invoke_request(encode(codec), codec)
+    timer.lap(metrics.ENCODE)
+    async with client.async_session.post(
+        client.url(f"{settings.PARE_API_INVOKE_URL_PATH}{function_name}/"),
+        headers=headers,
+        data=body,
+        **async_request_options(remaining_time()),
+    ) as response:
+        content = await response.read()
+        timer.response(response.status, response.headers, len(body), len(content))
+        response.raise_for_status()
+    result = decode_invoke_response(content, response.headers)
+    timer.lap(metrics.DECODE)
+    return result
+
+
+def invoke_endpoint(function_name: str, arguments: RemoteInvocationArguments) -> Any:
+    with invoke_errors(function_name):
+        return get_invoke_result(
+            function_name, post_invocation(function_name, arguments.encode)
+        )
+
+
+async def async_invoke_endpoint(
+    function_name: str, arguments: RemoteInvocationArguments
+) -> Any:
+    with invoke_errors(function_name):
+        return get_invoke_result(
+            function_name, await async_post_invocation(function_name, arguments.encode)
+        )
+
+
+def encode_batch(batch: list[RemoteInvocationArguments], codec: Codec) -> bytes:
+    return codec.encode_event(
+        {
+            "batch": [
+                {"args": list(arguments.args), "kwargs": arguments.kwargs}
+                for arguments in batch
+            ]
+        }
+    )
+
+
+def get_batch_results(function_name: str, response: dict[str, Any]) -> list[Any]:
+    """Per-item results of a batched invocation; failed items become exceptions."""
+    results = get_invoke_result(function_name, response)
+    outcomes: list[Any] = []
+    for item in results:
+        try:
+            outcomes.append(get_invoke_result(function_name, item))
+        except errors.PareInvokeError as e:
+            outcomes.append(e)
+    return outcomes
+
+
+def invoke_endpoint_batch(
+    function_name: str, batch: list[RemoteInvocationArguments]
+) -> list[Any]:
+    with invoke_errors(function_name):
+        response = post_invocation(
+            function_name, lambda codec: encode_batch(batch, codec)
+        )
+        return get_batch_results(function_name, response)
+
+
+async def async_invoke_endpoint_batch(
+    function_name: str, batch: list[RemoteInvocationArguments]
+) -> list[Any]:
+    with invoke_errors(function_name):
+        response = await async_post_invocation(
+            function_name, lambda codec: encode_batch(batch, codec)
+        )
+        return get_batch_results(function_name, response)
+
+
+def submit_invocation(function_name: str, arguments: RemoteInvocationArguments) -> str:
+    """Start an invocation without waiting for it to finish, returning its job id."""
+    with invoke_errors(function_name):
+        response = post_invocation(
+            function_name, arguments.encode, path=settings.PARE_API_SUBMIT_URL_PATH
+        )
+        return response["job_id"]
+
+
+def get_job_statuses(job_ids: list[str]) -> dict[str, str]:
+    client = get_client()
+    response = client.session.post(
+        client.url(settings.PARE_API_JOBS_URL_PATH),
+        headers=get_client_headers(),
+        json={"job_ids": job_ids},
+    )
+    response.raise_for_status()
+    return response.json()["statuses"]
+
+
+def get_job_response(job_id: str) -> Any:
+    client = get_client()
+    response = client.session.get(
+        client.url(f"{settings.PARE_API_JOBS_URL_PATH}{job_id}/"),
+        headers={
+            **get_client_headers(),
+            settings.PARE_ACCEPT_ENCODING_HEADER: ",".join(available_encodings()),
+        },
+    )
+    response.raise_for_status()
+    return decode_invoke_response(response.content, response.headers)
@@ -1,9 +1,36 @@
 # type: ignore
 from __future__ import annotations
 
+import builtins
+import os
 from pathlib import Path
+from typing import Any
+
+_TRUTHY = {"1", "t", "true", "y", "yes", "on"}
+
+
+class Env:
+    """Reads typed settings from environment variables, like `environs.Env`.
+
+    `environs` (and `marshmallow`) take longer to import than the rest of the SDK,
+    which every web worker and Lambda cold start would pay for.
+    """
+
+    def str(self, name: builtins.str, default: builtins.str) -> builtins.str:
+        return os.environ.get(name, default)
+
+    def int(self, name: builtins.str, default: builtins.int) -> builtins.int:
+        value = os.environ.get(name)
+        return builtins.int(value) if value else default
+
+    def float(self, name: builtins.str, default: builtins.float) -> builtins.float:
+        value = os.environ.get(name)
+        return builtins.float(value) if value else default
+
+    def bool(self, name: builtins.str, default: builtins.bool) -> builtins.bool:
+        value = os.environ.get(name)
+        return value.strip().lower() in _TRUTHY if value else default
 
-from environs import Env
 
 env = Env()
 
@@ -13,17 +40,65 @@ PARE_API_DEPLOY_URL_PATH: str = env.str("PARE_API_DEPLOY_URL_PATH", "/deploy/")
 PARE_API_SERVICES_URL_PATH: str = env.str("PARE_API_SERVICES_URL_PATH", "/services/")
 PARE_API_INVOKE_URL_PATH: str = env.str("PARE_API_INVOKE_URL_PATH", "/services/invoke/")
 PARE_API_DELETE_URL_PATH: str = env.str("PARE_API_DELETE_URL_PATH", "/services/delete/")
+PARE_API_STREAM_URL_PATH: str = env.str("PARE_API_STREAM_URL_PATH", "/services/stream/")
+PARE_API_SUBMIT_URL_PATH: str = env.str("PARE_API_SUBMIT_URL_PATH", "/services/submit/")
+PARE_API_JOBS_URL_PATH: str = env.str("PARE_API_JOBS_URL_PATH", "/services/jobs/")
 
-PARE_API_KEY: str = env.str("PARE_API_KEY", "")
 PARE_API_KEY_FILE: str = env.str("PARE_API_KEY_FILE", ".pare/api_key.priv")
 
-if not PARE_API_KEY and PARE_API_KEY_FILE:
-    pare_api_key_path = Path(PARE_API_KEY_FILE)
-    if pare_api_key_path.exists():
-        PARE_API_KEY = pare_api_key_path.read_text()
+
+def read_api_key() -> str:
+    api_key = env.str("PARE_API_KEY", "")
+    if not api_key and PARE_API_KEY_FILE:
+        pare_api_key_path = Path(PARE_API_KEY_FILE)
+        if pare_api_key_path.exists():
+            api_key = pare_api_key_path.read_text()
+    return api_key
+
 
 PARE_API_KEY_HEADER: str = env.str("PARE_API_KEY_HEADER", "X-Pare-API-Key")
 
+PARE_HTTP_POOL_SIZE: int = env.int("PARE_HTTP_POOL_SIZE", 10)
+PARE_HTTP_KEEPALIVE_TIMEOUT: float = env.float("PARE_HTTP_KEEPALIVE_TIMEOUT", 30.0)
+
+PARE_CODEC: str = env.str("PARE_CODEC", "json")
+
+# One of "auto", "zstd" or "gzip" to compress large payloads; disabled when empty
+PARE_COMPRESSION: str = env.str("PARE_COMPRESSION", "")
+PARE_COMPRESSION_THRESHOLD: int = env.int("PARE_COMPRESSION_THRESHOLD", 64 * 1024)
+PARE_CONTENT_ENCODING_HEADER: str = env.str(
+    "PARE_CONTENT_ENCODING_HEADER", "X-Pare-Content-Encoding"
+)
+PARE_ACCEPT_ENCODING_HEADER: str = env.str(
+    "PARE_ACCEPT_ENCODING_HEADER", "X-Pare-Accept-Encoding"
+)
+
+# Where invocations run: "remote" (the Pare API), "lambda" (directly) or "local" (a process pool)
+PARE_BACKEND: str = env.str("PARE_BACKEND", "remote")
+# Formatted with the endpoint's `name` and `git_hash` to get its Lambda function name;
+# by default, the name the Pare API deploys it under for PARE_USERNAME
+PARE_LAMBDA_FUNCTION_NAME: str = env.str("PARE_LAMBDA_FUNCTION_NAME", "")
+# The Pare (GitHub) username which deployed the functions
+PARE_USERNAME: str = env.str("PARE_USERNAME", "")
+
+PARE_MAP_CONCURRENCY: int = env.int("PARE_MAP_CONCURRENCY", 10)
+# Threads shared by `invoke_future` calls; 0 matches the HTTP connection pool size
+PARE_FUTURE_MAX_WORKERS: int = env.int("PARE_FUTURE_MAX_WORKERS", 0)
+# Carries the milliseconds a caller will still wait, which unlike a timestamp needs no synchronized clocks
+PARE_DEADLINE_HEADER: str = env.str("PARE_DEADLINE_HEADER", "X-Pare-Deadline-Ms")
+
+# Payloads over the threshold are uploaded here (e.g. "s3://bucket/blobs/") and sent by reference
+PARE_BLOB_STORE_URL: str = env.str("PARE_BLOB_STORE_URL", "")
+# Set to use an S3-compatible store such as MinIO
+PARE_BLOB_ENDPOINT_URL: str = env.str("PARE_BLOB_ENDPOINT_URL", "")
+PARE_BLOB_THRESHOLD: int = env.int("PARE_BLOB_THRESHOLD", 4 * 1024 * 1024)
+# Lambda rejects larger events and responses, so without a blob store these fail early
+PARE_MAX_PAYLOAD_SIZE: int = env.int("PARE_MAX_PAYLOAD_SIZE", 6 * 1024 * 1024)
+
+# Submitted jobs are polled with exponential backoff between these intervals (seconds)
+PARE_JOB_POLL_INTERVAL: float = env.float("PARE_JOB_POLL_INTERVAL", 0.5)
+PARE_JOB_MAX_POLL_INTERVAL: float = env.float("PARE_JOB_MAX_POLL_INTERVAL", 5.0)
+
 
 PARE_ATOMIC_DEPLOYMENT_ENABLED: bool = env.bool("PARE_ATOMIC_DEPLOYMENT_ENABLED", False)
 PARE_ATOMIC_DEPLOYMENT_HEADER: str = env.str(
@@ -50,3 +125,13 @@ if not PARE_GIT_HASH:
         PARE_GIT_HASH = env.str(env_var, "")
         if PARE_GIT_HASH:
             break
+
+
+def __getattr__(name: str) -> Any:
+    # The API key file is read on first use rather than at import,
+    # since deployed functions and most imports never need it
+    if name == "PARE_API_KEY":
+        global PARE_API_KEY
+        PARE_API_KEY = read_api_key()
+        return PARE_API_KEY
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")